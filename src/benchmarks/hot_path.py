@@ -0,0 +1,304 @@
+"""
+Benchmarks for the message-to-metrics hot path.
+
+Feeds synthetic OKX `books` frames at several depths through the JSON
+backends, the client decode/apply step, the processor and the individual
+cost functions, and
+reports throughput, per-call latency percentiles and allocations. Results
+can be saved as a named baseline and later runs compared against it:
+
+    python -m benchmarks.hot_path --save main
+    python -m benchmarks.hot_path --compare main
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from core.market_impact import AlmgrenChrissModel
+from core.orderbook_processor import OrderbookProcessor
+from core.stub_server import SyntheticBook
+from core.websocket_client import WebSocketClient
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+DEFAULT_DEPTHS = [5, 50, 400, 5000]
+DEFAULT_BURSTS = [1000, 10000]
+PERCENTILES = [50, 90, 99, 99.9]
+
+# Distinct book states kept in memory for the processor benchmarks
+BOOK_POOL_SIZE = 256
+# Calls traced for allocation counts; tracemalloc is too slow for whole bursts
+ALLOC_SAMPLE = 200
+
+
+def make_frames(depth: int, count: int, seed: int = 7) -> List[str]:
+    """A snapshot followed by count - 1 valid incremental updates"""
+    book = SyntheticBook('BENCH-USDT-SWAP', depth=depth, seed=seed)
+    arg = {'channel': 'books', 'instId': book.symbol}
+    frames = [json.dumps({'arg': arg, 'action': 'snapshot', 'data': [book.snapshot()]})]
+    for _ in range(count - 1):
+        frames.append(json.dumps({'arg': arg, 'action': 'update', 'data': [book.step(0.01)]}))
+    return frames
+
+
+def make_books(frames: List[str], pool_size: int = BOOK_POOL_SIZE) -> List[Dict]:
+    """Processed book dicts as the client hands them to callbacks"""
+    client = WebSocketClient('BENCH-USDT-SWAP')
+    books: List[Dict] = []
+
+    async def collect(data):
+        books.append(data)
+
+    async def run():
+        client.add_callback(collect)
+        for frame in frames[:pool_size]:
+            await client.process_message(frame)
+
+    asyncio.run(run())
+    return books
+
+
+def measure(name: str, fn: Callable, args: Iterable, repeat_args: Optional[List] = None) -> Dict:
+    """
+    Time fn over each item of args and trace allocations on a sample
+
+    Args:
+        name: Benchmark name
+        fn: Callable taking one argument
+        args: Arguments for the timed pass, one call each
+        repeat_args: Arguments for the allocation pass, defaults to the first calls of args
+
+    Returns:
+        Dict: Throughput, latency percentiles (us), peak traced memory and
+        memory blocks still held per call
+    """
+    args = list(args)
+    timings = np.empty(len(args), dtype=np.int64)
+    clock = time.perf_counter_ns
+
+    gc.collect()
+    gc.disable()
+    try:
+        start = clock()
+        for i, arg in enumerate(args):
+            t0 = clock()
+            fn(arg)
+            timings[i] = clock() - t0
+        elapsed = clock() - start
+    finally:
+        gc.enable()
+
+    sample = repeat_args if repeat_args is not None else args[:ALLOC_SAMPLE]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    for arg in sample:
+        fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    blocks = sum(max(stat.count_diff, 0) for stat in stats)
+
+    micros = timings / 1000.0
+    result = {
+        'name': name,
+        'calls': len(args),
+        'throughput': len(args) / (elapsed / 1e9) if elapsed else float('inf'),
+        'mean_us': float(micros.mean()),
+        'max_us': float(micros.max()),
+        'alloc_peak_kb': peak / 1024,
+        'alloc_blocks_per_call': blocks / max(len(sample), 1)
+    }
+    for p, value in zip(PERCENTILES, np.percentile(micros, PERCENTILES)):
+        result[f'p{p:g}_us'] = float(value)
+    return result
+
+
+def _drive(coro):
+    """
+    Run a coroutine that never suspends without event loop overhead.
+
+    process_message only suspends on socket I/O and callbacks; with no socket
+    and no callbacks it finishes on the first send.
+    """
+    try:
+        coro.send(None)
+    except StopIteration:
+        return
+    coro.close()
+    raise RuntimeError("Benchmarked coroutine suspended")
+
+
+def bench_decode(depth: int, burst: int) -> List[Dict]:
+    """Frame decoding alone with the stdlib and, when installed, orjson (see core.decoder)"""
+    frames = make_frames(depth, burst)
+    backends = [('json', json.loads)]
+    try:
+        import orjson
+        backends.append(('orjson', orjson.loads))
+    except ImportError:
+        pass
+    return [measure(f'decode[{backend},depth={depth},burst={burst}]', loads, frames)
+            for backend, loads in backends]
+
+
+def bench_process_message(depth: int, burst: int) -> Dict:
+    frames = make_frames(depth, burst)
+    client = WebSocketClient('BENCH-USDT-SWAP')
+    result = measure(
+        f'process_message[depth={depth},burst={burst}]',
+        lambda frame: _drive(client.process_message(frame)),
+        frames,
+        repeat_args=[]
+    )
+
+    # The stream only applies once, so trace allocations on a fresh client
+    alloc_client = WebSocketClient('BENCH-USDT-SWAP')
+    alloc = measure('alloc', lambda frame: _drive(alloc_client.process_message(frame)),
+                    frames[:ALLOC_SAMPLE])
+    result['alloc_peak_kb'] = alloc['alloc_peak_kb']
+    result['alloc_blocks_per_call'] = alloc['alloc_blocks_per_call']
+    return result
+
+
+def _versioned(books: List[Dict], count: int) -> List[Dict]:
+    """Cycle the pool with a unique seq_id per call so no result is served from cache"""
+    return [dict(books[i % len(books)], seq_id=('bench', i)) for i in range(count)]
+
+
+def bench_processor(depth: int, burst: int) -> List[Dict]:
+    books = make_books(make_frames(depth, BOOK_POOL_SIZE))
+    calls = _versioned(books, burst)
+    quantity = float(books[0]['asks'][:, 1].sum()) * 0.1
+    processor = OrderbookProcessor(quantity=quantity, fee_tier=0.0008)
+    results = [measure(f'process_orderbook[depth={depth},burst={burst}]',
+                       processor.process_orderbook, calls)]
+
+    # Standalone cost functions see a new book on every call
+    fresh = [(book['asks'], book['bids']) for book in books]
+    fresh = [fresh[i % len(fresh)] for i in range(burst)]
+    standalone = OrderbookProcessor(quantity=quantity, fee_tier=0.0008)
+    results.append(measure(f'calculate_slippage[depth={depth},burst={burst}]',
+                           lambda book: standalone.calculate_slippage(book[0], quantity), fresh))
+    results.append(measure(f'calculate_maker_taker_proportion[depth={depth},burst={burst}]',
+                           lambda book: standalone.calculate_maker_taker_proportion(*book), fresh))
+    return results
+
+
+def bench_optimize_execution(burst: int) -> Dict:
+    model = AlmgrenChrissModel()
+    rng = np.random.default_rng(7)
+    quantities = rng.uniform(1, 1000, burst).tolist()
+    return measure(f'optimize_execution[burst={burst}]',
+                   lambda q: model.optimize_execution(q, 30000.0, 60.0, 0.02), quantities)
+
+
+def bench_efficient_frontier(burst: int) -> Dict:
+    """Full 50 x 40 frontiers with a new volatility on every call, so nothing is memoized"""
+    model = AlmgrenChrissModel()
+    risk_aversions = np.logspace(-9, -3, 50)
+    horizons = np.linspace(10.0, 600.0, 40)
+    volatilities = np.random.default_rng(7).uniform(0.01, 0.05, max(1, burst // 100)).tolist()
+    return measure(f'efficient_frontier[50x40,calls={len(volatilities)}]',
+                   lambda vol: model.efficient_frontier(100.0, risk_aversions, horizons, vol, price=30000.0),
+                   volatilities)
+
+
+def run(depths: List[int], bursts: List[int]) -> List[Dict]:
+    results = []
+    for burst in bursts:
+        for depth in depths:
+            results.extend(bench_decode(depth, burst))
+            results.append(bench_process_message(depth, burst))
+            results.extend(bench_processor(depth, burst))
+        results.append(bench_optimize_execution(burst))
+        results.append(bench_efficient_frontier(burst))
+    return results
+
+
+def format_results(results: List[Dict], baseline: Optional[Dict[str, Dict]] = None) -> str:
+    header = f"{'benchmark':<58}{'ops/s':>12}{'p50 us':>10}{'p99 us':>10}{'p99.9 us':>10}{'max us':>10}{'blk/call':>10}"
+    if baseline is not None:
+        header += f"{'vs base':>10}"
+    lines = [header, '-' * len(header)]
+    for r in results:
+        line = (f"{r['name']:<58}{r['throughput']:>12,.0f}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}"
+                f"{r['p99.9_us']:>10.1f}{r['max_us']:>10.1f}{r['alloc_blocks_per_call']:>10.1f}")
+        if baseline is not None:
+            base = baseline.get(r['name'])
+            line += f"{r['throughput'] / base['throughput']:>9.2f}x" if base else f"{'new':>10}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def find_regressions(results: List[Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Benchmarks whose throughput or p99 got worse than the baseline by more than tolerance"""
+    regressions = []
+    for r in results:
+        base = baseline.get(r['name'])
+        if not base:
+            continue
+        if r['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(f"{r['name']}: throughput {r['throughput']:,.0f} vs {base['throughput']:,.0f} ops/s")
+        if r['p99_us'] > base['p99_us'] * (1 + tolerance):
+            regressions.append(f"{r['name']}: p99 {r['p99_us']:.1f} vs {base['p99_us']:.1f} us")
+    return regressions
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save_baseline(name: str, results: List[Dict]):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(name), 'w') as f:
+        json.dump({r['name']: r for r in results}, f, indent=2)
+
+
+def load_baseline(name: str) -> Dict[str, Dict]:
+    with open(baseline_path(name)) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot path benchmarks")
+    parser.add_argument('--depths', type=int, nargs='+', default=DEFAULT_DEPTHS)
+    parser.add_argument('--bursts', type=int, nargs='+', default=DEFAULT_BURSTS,
+                        help="Messages per burst, e.g. 1000 10000 100000 1000000")
+    parser.add_argument('--save', metavar='NAME', help="Save results as a named baseline")
+    parser.add_argument('--compare', metavar='NAME', help="Compare against a saved baseline")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="Allowed relative slowdown before a comparison fails")
+    args = parser.parse_args()
+
+    # Keep warnings from thin synthetic books out of the timings
+    logging.disable(logging.WARNING)
+
+    results = run(args.depths, args.bursts)
+    baseline = load_baseline(args.compare) if args.compare else None
+    print(format_results(results, baseline))
+
+    if args.save:
+        save_baseline(args.save, results)
+        print(f"\nSaved baseline to {baseline_path(args.save)}")
+
+    if baseline is not None:
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+pytest inserts the directory of a conftest.py into sys.path, so with this
+file `pytest src/tests` from the repository root imports core just as the
+engine does when run from src.
+"""
@@ -0,0 +1,139 @@
+import numpy as np
+from typing import List, Union
+
+ArrayLike = Union[float, List[float], np.ndarray]
+
+
+class DepthLadder:
+    """
+    Cumulative liquidity of one side of the book, built once per book update.
+
+    Walking the book for any number of order sizes then costs one
+    `searchsorted` over the cumulative arrays instead of a Python loop per size.
+    Sizes that exceed the visible depth price at `inf`.
+    """
+
+    def __init__(self, levels: List[List[float]], side: str = 'buy'):
+        """
+        Args:
+            levels: Best-first [price, size] levels (asks for buy, bids for sell)
+            side: 'buy' walks up the asks, 'sell' walks down the bids
+        """
+        if side not in ('buy', 'sell'):
+            raise ValueError(f"Unknown side: {side}")
+        self.side = side
+
+        book = np.asarray(levels, dtype=np.float64).reshape(-1, 2)
+        self.prices = book[:, 0]
+        self.sizes = book[:, 1]
+        self.cum_size = np.cumsum(self.sizes)
+        self.cum_notional = np.cumsum(self.prices * self.sizes)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @property
+    def best_price(self) -> float:
+        return float(self.prices[0]) if len(self.prices) else float('nan')
+
+    @property
+    def total_size(self) -> float:
+        return float(self.cum_size[-1]) if len(self.cum_size) else 0.0
+
+    @property
+    def total_notional(self) -> float:
+        return float(self.cum_notional[-1]) if len(self.cum_notional) else 0.0
+
+    def notional_for(self, quantities: ArrayLike) -> np.ndarray:
+        """Notional paid (or received) to fill each base quantity, `inf` beyond depth"""
+        q = np.asarray(quantities, dtype=np.float64)
+        if not len(self.prices):
+            return np.full(q.shape, np.inf)
+
+        idx = np.searchsorted(self.cum_size, q, side='left')
+        fillable = idx < len(self.prices)
+        idx = np.minimum(idx, len(self.prices) - 1)
+
+        # Fully consumed levels before idx plus a partial fill at idx
+        size_before = np.where(idx > 0, self.cum_size[idx - 1], 0.0)
+        notional_before = np.where(idx > 0, self.cum_notional[idx - 1], 0.0)
+        notional = notional_before + (q - size_before) * self.prices[idx]
+        return np.where(fillable, notional, np.inf)
+
+    def quantity_for(self, notionals: ArrayLike) -> np.ndarray:
+        """Base quantity filled for each quote notional, `inf` beyond depth"""
+        n = np.asarray(notionals, dtype=np.float64)
+        if not len(self.prices):
+            return np.full(n.shape, np.inf)
+
+        idx = np.searchsorted(self.cum_notional, n, side='left')
+        fillable = idx < len(self.prices)
+        idx = np.minimum(idx, len(self.prices) - 1)
+
+        size_before = np.where(idx > 0, self.cum_size[idx - 1], 0.0)
+        notional_before = np.where(idx > 0, self.cum_notional[idx - 1], 0.0)
+        quantity = size_before + (n - notional_before) / self.prices[idx]
+        return np.where(fillable, quantity, np.inf)
+
+    def _relative_to_best(self, avg_price: np.ndarray) -> np.ndarray:
+        best = self.prices[0]
+        if self.side == 'buy':
+            slippage = (avg_price - best) / best
+        else:
+            slippage = (best - avg_price) / best
+        return np.where(np.isfinite(avg_price), slippage, np.inf)
+
+    def slippage(self, quantities: ArrayLike) -> np.ndarray:
+        """Slippage versus the best price for each base quantity"""
+        q = np.asarray(quantities, dtype=np.float64)
+        if not len(self.prices):
+            return np.full(q.shape, np.inf)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg_price = np.where(q > 0, self.notional_for(q) / q, self.prices[0])
+        return self._relative_to_best(avg_price)
+
+    def slippage_notional(self, notionals: ArrayLike) -> np.ndarray:
+        """Slippage versus the best price for each quote notional (e.g. USD)"""
+        n = np.asarray(notionals, dtype=np.float64)
+        if not len(self.prices):
+            return np.full(n.shape, np.inf)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg_price = np.where(n > 0, n / self.quantity_for(n), self.prices[0])
+        avg_price = np.where(avg_price > 0, avg_price, np.inf)
+        return self._relative_to_best(avg_price)
+
+
+def notional_ladder(low: float = 1e3, high: float = 1e7, steps: int = 200) -> np.ndarray:
+    """Geometrically spaced order sizes for pricing a full ladder in one call"""
+    return np.geomspace(low, high, steps)
+
+
+def walk_books(prices: np.ndarray, sizes: np.ndarray, quantities: np.ndarray):
+    """
+    Fill one quantity against each of many books at once
+
+    Args:
+        prices: (P, D) best-first level prices, one book per row
+        sizes: (P, D) level sizes, zero-padded for shallow books
+        quantities: (P,) base quantity to fill in each book
+
+    Returns:
+        (notional, exhausted): notional paid (or received) per row, and
+        whether the row ran out of depth; the unfilled remainder of an
+        exhausted row is priced at its worst level
+    """
+    quantities = np.asarray(quantities, dtype=np.float64)
+    cum_size = np.cumsum(sizes, axis=1)
+    cum_notional = np.cumsum(prices * sizes, axis=1)
+    depth = prices.shape[1]
+
+    idx = np.count_nonzero(cum_size < quantities[:, None], axis=1)
+    exhausted = idx >= depth
+    idx = np.minimum(idx, depth - 1)
+    rows = np.arange(len(quantities))
+
+    prev = np.maximum(idx - 1, 0)
+    size_before = np.where(idx > 0, cum_size[rows, prev], 0.0)
+    notional_before = np.where(idx > 0, cum_notional[rows, prev], 0.0)
+    notional = notional_before + (quantities - size_before) * prices[rows, idx]
+    return notional, exhausted
@@ -0,0 +1,214 @@
+"""
+Online calibration of the Almgren-Chriss impact coefficients.
+
+Both coefficients are slopes of exponentially weighted regressions whose
+sums are updated in O(1) per observation, so the fit follows the market
+intraday without ever refitting history:
+
+- eta (temporary): relative cost of walking the visible book versus order
+  size, probed at a few fractions of the visible depth on every update.
+- gamma (permanent): relative mid move between updates versus signed trade
+  volume when trades are fed in, otherwise versus order flow imbalance of
+  the best levels (Cont, Kukanov and Stoikov).
+
+Coefficients are per base unit and relative to price, the units
+AlmgrenChrissModel works in.
+"""
+import logging
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .book_walk import DepthLadder
+from .order_flow import order_flow_imbalance
+
+# Probe sizes as fractions of the visible depth on each side
+DEFAULT_PROBE_FRACTIONS = (0.05, 0.1, 0.2, 0.4)
+
+
+class RollingRegression:
+    """
+    Exponentially weighted least squares y = intercept + slope * x.
+
+    Each observation decays by half after `halflife` further observations.
+    """
+
+    def __init__(self, halflife: float = 500.0, fit_intercept: bool = False):
+        self.decay = 0.5 ** (1.0 / halflife)
+        self.fit_intercept = fit_intercept
+        self.count = 0
+        self._w = self._x = self._y = self._xx = self._xy = self._yy = 0.0
+
+    def update(self, x: float, y: float, weight: float = 1.0):
+        d = self.decay
+        self._w = self._w * d + weight
+        self._x = self._x * d + weight * x
+        self._y = self._y * d + weight * y
+        self._xx = self._xx * d + weight * x * x
+        self._xy = self._xy * d + weight * x * y
+        self._yy = self._yy * d + weight * y * y
+        self.count += 1
+
+    def _centered(self):
+        if not self.fit_intercept:
+            return self._xx, self._xy, self._yy
+        w = self._w
+        return (self._xx - self._x * self._x / w,
+                self._xy - self._x * self._y / w,
+                self._yy - self._y * self._y / w)
+
+    @property
+    def slope(self) -> float:
+        if not self._w:
+            return 0.0
+        xx, xy, _ = self._centered()
+        return xy / xx if xx > 0 else 0.0
+
+    @property
+    def intercept(self) -> float:
+        if not self.fit_intercept or not self._w:
+            return 0.0
+        return (self._y - self.slope * self._x) / self._w
+
+    @property
+    def r_squared(self) -> float:
+        if not self._w:
+            return 0.0
+        xx, xy, yy = self._centered()
+        return xy * xy / (xx * yy) if xx > 0 and yy > 0 else 0.0
+
+    def reset(self):
+        self.count = 0
+        self._w = self._x = self._y = self._xx = self._xy = self._yy = 0.0
+
+
+class ImpactCalibrator:
+    """
+    Feeds book updates (and optionally trades) into rolling regressions and
+    pushes the fitted eta/gamma into an AlmgrenChrissModel while streaming.
+    """
+
+    def __init__(self,
+                 model,
+                 halflife: float = 500.0,
+                 min_samples: int = 50,
+                 push_every: int = 10,
+                 depth_every: int = 10,
+                 probe_fractions: Sequence[float] = DEFAULT_PROBE_FRACTIONS):
+        """
+        Args:
+            model: AlmgrenChrissModel receiving the parameters
+            halflife: Book updates after which an old sample weighs half
+            min_samples: Observations before a gamma estimate is trusted
+            push_every: Book updates between parameter pushes
+            depth_every: Book updates between eta probes; book shape changes
+                slowly and probing is the costly part
+            probe_fractions: Order sizes probed for eta, as fractions of visible depth
+        """
+        self.model = model
+        self.min_samples = min_samples
+        self.push_every = push_every
+        self.depth_every = depth_every
+        self.probe_fractions = tuple(probe_fractions)
+        self._probes = np.asarray(self.probe_fractions, dtype=np.float64)
+        self.logger = logging.getLogger(__name__)
+
+        self.temporary = RollingRegression(halflife * len(self.probe_fractions) / depth_every)
+        self.permanent_flow = RollingRegression(halflife)
+        self.permanent_trades = RollingRegression(halflife)
+
+        self.updates = 0
+        self.pushes = 0
+        self._last_top = None           # (bid, bid_size, ask, ask_size)
+        self._trade_flow = 0.0          # Signed trade volume since the last book
+
+    def observe_trade(self, size: float, side: str):
+        """Count a trade; side is the taker side, 'buy' lifting asks"""
+        self._trade_flow += size if side == 'buy' else -size
+
+    def _observe_depth(self, ladder: DepthLadder):
+        if len(ladder) < 2:
+            return
+        cum_size = ladder.cum_size
+        sizes = self._probes * cum_size[-1]
+        # Probes stay inside the visible depth, so this is DepthLadder.notional_for
+        # without its edge-case handling
+        idx = np.searchsorted(cum_size, sizes)
+        before = idx - 1
+        size_before = np.where(idx > 0, cum_size[before], 0.0)
+        notional_before = np.where(idx > 0, ladder.cum_notional[before], 0.0)
+        avg_price = (notional_before + (sizes - size_before) * ladder.prices[idx]) / sizes
+        best = ladder.prices[0]
+        slippage = (avg_price - best) / best if ladder.side == 'buy' else (best - avg_price) / best
+        for size, value in zip(sizes.tolist(), slippage.tolist()):
+            if size > 0:
+                self.temporary.update(size, value)
+
+    def _observe_move(self, bid: float, bid_size: float, ask: float, ask_size: float):
+        top = (bid, bid_size, ask, ask_size)
+        last = self._last_top
+        self._last_top = top
+        if last is None:
+            return
+        last_mid = (last[0] + last[2]) / 2.0
+        move = ((bid + ask) / 2.0 - last_mid) / last_mid
+
+        # Order flow imbalance of the best levels since the previous book
+        flow = order_flow_imbalance(last, top)
+        self.permanent_flow.update(flow, move)
+
+        if self._trade_flow:
+            self.permanent_trades.update(self._trade_flow, move)
+        self._trade_flow = 0.0
+
+    def observe_book(self, ask_ladder: DepthLadder, bid_ladder: DepthLadder):
+        """Add one book update; ladders are the processor's, so nothing is rebuilt"""
+        if not len(ask_ladder) or not len(bid_ladder):
+            return
+        if self.updates % self.depth_every == 0:
+            self._observe_depth(ask_ladder)
+            self._observe_depth(bid_ladder)
+        self._observe_move(bid_ladder.best_price, float(bid_ladder.sizes[0]),
+                           ask_ladder.best_price, float(ask_ladder.sizes[0]))
+
+        self.updates += 1
+        if self.updates == 1 or self.updates % self.push_every == 0:
+            self.push()
+
+    @property
+    def eta(self) -> Optional[float]:
+        slope = self.temporary.slope
+        return slope if slope > 0 else None
+
+    def _permanent(self) -> RollingRegression:
+        """Trade-based regression once it has enough samples, flow-based otherwise"""
+        if self.permanent_trades.count >= self.min_samples:
+            return self.permanent_trades
+        return self.permanent_flow
+
+    @property
+    def gamma(self) -> Optional[float]:
+        regression = self._permanent()
+        if regression.count < self.min_samples:
+            return None
+        return max(regression.slope, 0.0)
+
+    def push(self):
+        """Copy the current estimates into the model"""
+        eta = self.eta
+        if eta is None:
+            return
+        gamma = self.gamma
+        # No evidence of permanent impact until enough moves were seen
+        self.model.update_parameters(eta=eta, gamma=gamma if gamma is not None else 0.0)
+        self.pushes += 1
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'updates': self.updates,
+            'pushes': self.pushes,
+            'eta': self.model.eta,
+            'gamma': self.model.gamma,
+            'eta_r2': self.temporary.r_squared,
+            'gamma_r2': self._permanent().r_squared
+        }
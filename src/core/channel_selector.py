@@ -0,0 +1,137 @@
+"""
+Choice of the cheapest OKX order book channel that covers an order's depth.
+
+OKX offers the book at several depths: `bbo-tbt` (best level, tick by tick),
+`books5` (five levels), `books` (400 levels, incremental) and `books-l2-tbt`
+(400 levels, incremental and tick by tick, login required). The selector
+watches how many levels the configured order size actually walks and picks
+the shallowest channel covering that with some headroom, upgrading at once
+when the book thins out and downgrading only after the need has stayed low
+for a while.
+"""
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+# Book channels from cheapest to most expensive, with the levels they carry
+CHANNEL_DEPTHS = (('bbo-tbt', 1), ('books5', 5), ('books', 400), ('books-l2-tbt', 400))
+CHANNEL_RANK = {channel: rank for rank, (channel, _) in enumerate(CHANNEL_DEPTHS)}
+DEFAULT_CHANNEL = 'books'
+# Levels per side consumers read whatever the order size: the maker/taker
+# depth imbalance and the impact calibrator's depth probes use the best five
+MIN_LEVELS = 5
+
+
+def levels_needed(levels: np.ndarray, notional: float) -> int:
+    """
+    Levels of one side an order of `notional` USD walks
+
+    Same unit as OrderbookProcessor, which walks its USD quantity with
+    DepthLadder.slippage_notional.
+
+    Args:
+        levels: Best-first (n, 2) [price, size] array
+
+    Returns:
+        Number of levels, n + 1 when the side does not cover the order
+    """
+    if not len(levels):
+        return 1
+    cumulative = np.cumsum(levels[:, 0] * levels[:, 1])
+    return int(np.searchsorted(cumulative, notional, side='left')) + 1
+
+
+class ChannelSelector:
+    """
+    Per-instrument channel choice from the recent liquidity profile.
+
+    Each instrument's need is evaluated at most every `interval` seconds as
+    the levels a `quantity * headroom` USD order walks on the thinner side;
+    the peak of the last `hold` seconds decides the channel, never one
+    carrying fewer than `min_levels` levels.
+    """
+
+    def __init__(self,
+                 quantity: float,
+                 headroom: float = 2.0,
+                 tick_by_tick_levels: Optional[int] = None,
+                 hold: float = 30.0,
+                 interval: float = 0.5,
+                 min_levels: int = MIN_LEVELS):
+        """
+        Args:
+            quantity: Order size in USD
+            headroom: Multiple of the order the chosen depth must cover
+            tick_by_tick_levels: Use books-l2-tbt beyond this many levels;
+                None never selects it (the channel needs a logged-in connection)
+            hold: Seconds the need must stay low before downgrading
+            interval: Seconds between evaluations per instrument
+            min_levels: Levels per side the book's consumers need, e.g. the
+                tick store's top_n or the depth chart's
+        """
+        self.quantity = quantity
+        self.headroom = headroom
+        self.tick_by_tick_levels = tick_by_tick_levels
+        self.hold = hold
+        self.interval = interval
+        self.min_levels = min_levels
+        # symbol -> (time, levels needed) of recent evaluations
+        self._needs: Dict[str, Deque[Tuple[float, int]]] = {}
+        # symbol -> time its current channel was selected
+        self._since: Dict[str, float] = {}
+
+    def choose(self, levels: int) -> str:
+        """Cheapest channel carrying `levels` levels per side, and at least min_levels"""
+        levels = max(levels, self.min_levels)
+        if self.tick_by_tick_levels is not None and levels > self.tick_by_tick_levels:
+            return 'books-l2-tbt'
+        for channel, depth in CHANNEL_DEPTHS:
+            if depth >= levels:
+                return channel
+        return DEFAULT_CHANNEL
+
+    def reset(self, symbol: str):
+        """Forget an instrument's history, e.g. once it is unsubscribed"""
+        self._needs.pop(symbol, None)
+        self._since.pop(symbol, None)
+
+    def switched(self, symbol: str, now: Optional[float] = None):
+        """Start the hold period of a newly active channel"""
+        self._since[symbol] = time.monotonic() if now is None else now
+
+    def observe(self,
+                symbol: str,
+                asks: np.ndarray,
+                bids: np.ndarray,
+                current: str,
+                now: Optional[float] = None) -> Optional[str]:
+        """
+        Record the book of an instrument and suggest a channel change
+
+        Args:
+            asks, bids: Best-first (n, 2) levels as carried by `current`
+            current: Channel the book arrived on
+
+        Returns:
+            Channel to switch to, or None to stay
+        """
+        now = time.monotonic() if now is None else now
+        needs = self._needs.setdefault(symbol, deque())
+        if needs and now - needs[-1][0] < self.interval:
+            return None
+        since = self._since.setdefault(symbol, now)
+
+        notional = self.quantity * self.headroom
+        needs.append((now, max(levels_needed(asks, notional), levels_needed(bids, notional))))
+        while needs[0][0] < now - self.hold:
+            needs.popleft()
+
+        target = self.choose(max(need for _, need in needs))
+        if target == current:
+            return None
+        if CHANNEL_RANK[target] > CHANNEL_RANK.get(current, 0):
+            return target
+        # Downgrade only once the current channel has been held long enough
+        return target if now - since >= self.hold else None
@@ -0,0 +1,17 @@
+"""JSON decoding of raw WebSocket frames with the fastest installed backend"""
+import json
+from typing import Any, Union
+
+# Prefer a faster JSON backend when one is installed
+try:
+    import orjson
+
+    def loads(raw: Union[str, bytes]) -> Any:
+        return orjson.loads(raw)
+
+    DecodeError = orjson.JSONDecodeError
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    loads = json.loads
+    DecodeError = json.JSONDecodeError
+    JSON_BACKEND = 'json'
@@ -0,0 +1,59 @@
+import logging
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .orderbook_processor import OrderbookProcessor
+
+
+class SymbolDispatcher:
+    """
+    Routes processed books to a per-instrument OrderbookProcessor.
+
+    Processors are created on first use from the factory, so instruments
+    can be added to a running connection without any setup here.
+    """
+
+    def __init__(self, processor_factory: Callable[[str], OrderbookProcessor]):
+        self.processor_factory = processor_factory
+        self.processors: Dict[str, OrderbookProcessor] = {}
+        self.callbacks: List[Callable] = []
+        self.logger = logging.getLogger(__name__)
+
+    def add_callback(self, callback: Callable):
+        """Add a callback receiving (symbol, results) for every processed book"""
+        self.callbacks.append(callback)
+
+    def get_processor(self, symbol: str) -> OrderbookProcessor:
+        processor = self.processors.get(symbol)
+        if processor is None:
+            processor = self.processor_factory(symbol)
+            self.processors[symbol] = processor
+        return processor
+
+    def remove(self, symbols: Iterable[str]):
+        """Drop the processors (and their caches) of instruments no longer carried"""
+        for symbol in symbols:
+            self.processors.pop(symbol, None)
+
+    def dispatch(self, data: Dict) -> Optional[Dict]:
+        """Process a book with its instrument's processor and notify callbacks"""
+        symbol = data.get('symbol')
+        if symbol is None:
+            self.logger.warning("Orderbook without symbol, dropping")
+            return None
+
+        results = self.get_processor(symbol).process_orderbook(data)
+        if results:
+            results['symbol'] = symbol
+            for callback in self.callbacks:
+                callback(symbol, results)
+        return results
+
+    def dispatch_trade(self, trade: Dict):
+        """Feed a public trade to its instrument's processor"""
+        processor = self.processors.get(trade['symbol'])
+        if processor is not None:
+            processor.observe_trade(trade['size'], trade['side'])
+
+    async def __call__(self, data: Dict):
+        """Allow direct registration as a WebSocketClient callback"""
+        self.dispatch(data)
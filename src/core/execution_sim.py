@@ -0,0 +1,362 @@
+"""
+Monte Carlo execution simulator for child-order schedules.
+
+A schedule (slice times and quantities, e.g. from
+AlmgrenChrissModel.schedules) is executed slice by slice against book
+states, walking the book for every slice. Book states come either from a
+recorded capture (each path starts at a random point of the recording) or
+from a stochastic model seeded from it: recorded book shapes around a
+geometric Brownian mid with lognormal liquidity shocks.
+
+Paths are simulated in NumPy batches; batches are spread across a process
+pool, and every strategy sees the same random paths, so strategies are
+compared on common random numbers.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .book_walk import walk_books
+
+MODES = ('replay', 'stochastic')
+SUMMARY_PERCENTILES = (5, 50, 95, 99)
+
+
+class BookStates(NamedTuple):
+    """Recorded books of one instrument as padded arrays"""
+    ts: np.ndarray      # (S,) exchange timestamps in ms
+    asks: np.ndarray    # (S, D, 2) best-first [price, size], zero-size padded
+    bids: np.ndarray    # (S, D, 2)
+
+    @property
+    def mids(self) -> np.ndarray:
+        return (self.asks[:, 0, 0] + self.bids[:, 0, 0]) / 2.0
+
+
+def _pad(levels: np.ndarray, depth: int) -> np.ndarray:
+    """Cut or pad levels to depth; padding repeats the worst price with zero size"""
+    out = np.zeros((depth, 2), dtype=np.float64)
+    n = min(len(levels), depth)
+    out[:n] = levels[:n]
+    if n < depth:
+        out[n:, 0] = levels[n - 1, 0] if n else np.nan
+    return out
+
+
+def load_book_states(path: str, symbol: str, depth: int = 50, min_interval_ms: int = 0) -> BookStates:
+    """
+    Rebuild the books of one instrument from a FrameRecorder capture
+
+    Args:
+        path: Capture file
+        symbol: Instrument to extract
+        depth: Levels per side kept for each state
+        min_interval_ms: Skip states closer than this to the previous kept one
+    """
+    from .websocket_client import WebSocketClient
+
+    client = WebSocketClient([symbol], depth=depth)
+    ts: List[int] = []
+    asks: List[np.ndarray] = []
+    bids: List[np.ndarray] = []
+
+    async def collect(data):
+        book_ts = client.books[symbol].ts
+        if ts and book_ts - ts[-1] < max(min_interval_ms, 1):
+            # Same exchange timestamp: keep the latest state only
+            if book_ts == ts[-1]:
+                asks[-1] = _pad(data['asks'], depth)
+                bids[-1] = _pad(data['bids'], depth)
+            return
+        if not len(data['asks']) or not len(data['bids']):
+            return
+        ts.append(book_ts)
+        asks.append(_pad(data['asks'], depth))
+        bids.append(_pad(data['bids'], depth))
+
+    client.add_callback(collect)
+    asyncio.run(client.replay(path, speed=None))
+    if not ts:
+        raise ValueError(f"No {symbol} books in {path}")
+    return BookStates(np.asarray(ts, dtype=np.int64), np.stack(asks), np.stack(bids))
+
+
+def estimate_volatility(states: BookStates) -> float:
+    """Relative mid volatility per sqrt(second) from the recorded states"""
+    mids = states.mids
+    dt = np.diff(states.ts) / 1000.0
+    valid = dt > 0
+    if valid.sum() < 2:
+        return 0.0
+    returns = np.diff(np.log(mids))[valid]
+    return float(np.sqrt(np.sum(returns ** 2) / np.sum(dt[valid])))
+
+
+def summarize(costs: np.ndarray, notional: float) -> Dict[str, float]:
+    """Distribution of implementation shortfall over paths, in quote currency and bps"""
+    bps = costs / notional * 1e4 if notional else np.zeros_like(costs)
+    summary = {
+        'paths': int(len(costs)),
+        'mean': float(costs.mean()),
+        'std': float(costs.std()),
+        'mean_bps': float(bps.mean()),
+        'std_bps': float(bps.std())
+    }
+    for p in SUMMARY_PERCENTILES:
+        summary[f'p{p}_bps'] = float(np.percentile(bps, p))
+    # Expected shortfall beyond the 95th percentile
+    tail = bps[bps >= summary['p95_bps']]
+    summary['cvar95_bps'] = float(tail.mean()) if len(tail) else summary['p95_bps']
+    return summary
+
+
+# Book states shipped once to each pool worker by _init_worker
+_STATES: Optional[BookStates] = None
+
+
+def _init_worker(ts: np.ndarray, asks: np.ndarray, bids: np.ndarray):
+    global _STATES
+    _STATES = BookStates(ts, asks, bids)
+
+
+def _simulate_batch(states: BookStates,
+                    times: np.ndarray,
+                    trades: np.ndarray,
+                    n_paths: int,
+                    seed: np.random.SeedSequence,
+                    side: str,
+                    mode: str,
+                    volatility: float,
+                    liquidity_vol: float,
+                    permanent_impact: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Execute one schedule on n_paths paths
+
+    Returns:
+        (shortfall (n_paths,), exhausted (n_paths,)): cost versus the arrival
+        mid in quote currency, and whether any slice ran out of visible depth
+    """
+    rng = np.random.default_rng(seed)
+    levels = states.asks if side == 'buy' else states.bids
+    sign = 1.0 if side == 'buy' else -1.0
+    mids = states.mids
+    horizon_ms = (times[-1] - times[0]) * 1000.0
+
+    if mode == 'replay':
+        # Start anywhere the whole horizon still fits in the recording
+        last_start = np.searchsorted(states.ts, states.ts[-1] - horizon_ms, side='right')
+        starts = rng.integers(0, max(int(last_start), 1), n_paths)
+        arrival = mids[starts]
+    else:
+        templates = rng.integers(0, len(states.ts), n_paths)
+        arrival = mids[templates]
+        shape = levels[templates, :, 0] / arrival[:, None]
+        dt = np.diff(times, prepend=times[0])
+        # Brownian mid from the arrival time, one increment per slice
+        log_mid = np.cumsum(volatility * np.sqrt(dt) * rng.standard_normal((n_paths, len(times))), axis=1)
+        log_mid -= 0.5 * volatility ** 2 * (times - times[0])
+
+    shortfall = np.zeros(n_paths)
+    exhausted = np.zeros(n_paths, dtype=bool)
+    executed = 0.0
+    quantities = np.empty(n_paths)
+    for j, quantity in enumerate(trades):
+        if quantity <= 0:
+            continue
+        if mode == 'replay':
+            target = states.ts[starts] + (times[j] - times[0]) * 1000.0
+            idx = np.searchsorted(states.ts, target, side='right') - 1
+            prices = levels[idx, :, 0]
+            sizes = levels[idx, :, 1]
+        else:
+            mid = arrival * np.exp(log_mid[:, j])
+            prices = shape * mid[:, None]
+            liquidity = np.exp(liquidity_vol * rng.standard_normal(n_paths) - 0.5 * liquidity_vol ** 2)
+            sizes = levels[templates, :, 1] * liquidity[:, None]
+
+        if permanent_impact:
+            # Earlier slices have moved the price against us
+            prices = prices * (1.0 + sign * permanent_impact * executed)
+
+        quantities.fill(quantity)
+        notional, out_of_depth = walk_books(prices, sizes, quantities)
+        shortfall += sign * (notional - quantity * arrival)
+        exhausted |= out_of_depth
+        executed += quantity
+
+    return shortfall, exhausted
+
+
+def _run_task(task: Tuple) -> Tuple[int, int, np.ndarray, np.ndarray]:
+    """Pool entry point: (strategy, offset, batch args) -> (strategy, offset, results)"""
+    strategy, offset, args = task
+    shortfall, exhausted = _simulate_batch(_STATES, *args)
+    return strategy, offset, shortfall, exhausted
+
+
+class ExecutionSimulator:
+    """
+    Cost distributions of execution schedules over many simulated paths.
+
+    Quantities are in base units; costs are implementation shortfall versus
+    the arrival mid in quote currency (positive = cost).
+    """
+
+    def __init__(self,
+                 states: BookStates,
+                 side: str = 'buy',
+                 mode: str = 'replay',
+                 volatility: Optional[float] = None,
+                 liquidity_vol: float = 0.2,
+                 permanent_impact: float = 0.0,
+                 workers: Optional[int] = None,
+                 batch_size: int = 2000):
+        """
+        Args:
+            states: Recorded books (see load_book_states)
+            side: 'buy' walks the asks, 'sell' the bids
+            mode: 'replay' executes against the recorded books, 'stochastic'
+                against simulated books seeded from them
+            volatility: Relative mid volatility per sqrt(second) for the
+                stochastic mode, estimated from the states if omitted
+            liquidity_vol: Lognormal volatility of level sizes per slice (stochastic mode)
+            permanent_impact: Relative price move per unit executed
+            workers: Pool processes, one per core by default, 0 to run inline
+            batch_size: Paths simulated per task
+        """
+        if side not in ('buy', 'sell'):
+            raise ValueError(f"Unknown side: {side}")
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        self.states = states
+        self.side = side
+        self.mode = mode
+        self.volatility = estimate_volatility(states) if volatility is None else volatility
+        self.liquidity_vol = liquidity_vol
+        self.permanent_impact = permanent_impact
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.batch_size = batch_size
+        self.logger = logging.getLogger(__name__)
+
+    def _check_horizon(self, times: np.ndarray):
+        if self.mode == 'replay':
+            recorded = (self.states.ts[-1] - self.states.ts[0]) / 1000.0
+            if times[-1] - times[0] > recorded:
+                raise ValueError(f"Schedule horizon {times[-1] - times[0]:.1f}s exceeds "
+                                 f"the {recorded:.1f}s recording")
+
+    def simulate(self,
+                 strategies: Sequence[Tuple[np.ndarray, np.ndarray]],
+                 n_paths: int = 10000,
+                 seed: Optional[int] = None) -> List[Dict[str, np.ndarray]]:
+        """
+        Execute every strategy on the same n_paths paths
+
+        Args:
+            strategies: (times (N+1,), trades (N,)) per strategy, times in seconds
+            n_paths: Paths per strategy
+            seed: Seed for reproducible paths
+
+        Returns:
+            Per strategy: 'shortfall' (n_paths,) and 'exhausted' (n_paths,) arrays
+        """
+        strategies = [(np.asarray(t, dtype=np.float64), np.asarray(q, dtype=np.float64)) for t, q in strategies]
+        for times, trades in strategies:
+            if len(times) != len(trades) + 1:
+                raise ValueError("times must have one more entry than trades")
+            self._check_horizon(times)
+
+        offsets = list(range(0, n_paths, self.batch_size))
+        seeds = np.random.SeedSequence(seed).spawn(len(offsets))
+        tasks = []
+        for k, (times, trades) in enumerate(strategies):
+            for offset, batch_seed in zip(offsets, seeds):
+                n = min(self.batch_size, n_paths - offset)
+                tasks.append((k, offset, (times, trades, n, batch_seed, self.side, self.mode,
+                                          self.volatility, self.liquidity_vol, self.permanent_impact)))
+
+        results = [{'shortfall': np.empty(n_paths), 'exhausted': np.empty(n_paths, dtype=bool)}
+                   for _ in strategies]
+        started = time.perf_counter()
+        for k, offset, shortfall, exhausted in self._map(tasks):
+            results[k]['shortfall'][offset:offset + len(shortfall)] = shortfall
+            results[k]['exhausted'][offset:offset + len(exhausted)] = exhausted
+        self.logger.info(f"Simulated {len(strategies)} strategies x {n_paths} paths "
+                         f"in {time.perf_counter() - started:.2f}s")
+        return results
+
+    def _map(self, tasks: List[Tuple]):
+        if self.workers <= 1 or len(tasks) == 1:
+            _init_worker(*self.states)
+            return map(_run_task, tasks)
+        executor = ProcessPoolExecutor(
+            max_workers=min(self.workers, len(tasks)),
+            mp_context=mp.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=tuple(self.states)
+        )
+        with executor:
+            return list(executor.map(_run_task, tasks))
+
+    def evaluate(self,
+                 strategies: Sequence[Tuple[np.ndarray, np.ndarray]],
+                 n_paths: int = 10000,
+                 seed: Optional[int] = None) -> List[Dict[str, float]]:
+        """Summary statistics of each strategy's shortfall distribution"""
+        arrival = float(np.median(self.states.mids))
+        summaries = []
+        for (times, trades), result in zip(strategies, self.simulate(strategies, n_paths, seed)):
+            summary = summarize(result['shortfall'], float(np.sum(trades)) * arrival)
+            summary['exhausted_share'] = float(result['exhausted'].mean())
+            summaries.append(summary)
+        return summaries
+
+
+def main():
+    from .market_impact import AlmgrenChrissModel
+
+    parser = argparse.ArgumentParser(description="Monte Carlo evaluation of Almgren-Chriss schedules")
+    parser.add_argument('capture', help="FrameRecorder capture file")
+    parser.add_argument('--symbol', required=True)
+    parser.add_argument('--quantity', type=float, required=True, help="Parent order size in base units")
+    parser.add_argument('--side', choices=('buy', 'sell'), default='buy')
+    parser.add_argument('--horizons', type=float, nargs='+', default=[60.0], help="Seconds")
+    parser.add_argument('--risk-aversions', type=float, nargs='+', default=[0.0, 1e-6, 1e-4])
+    parser.add_argument('--steps', type=int, default=10)
+    parser.add_argument('--mode', choices=MODES, default='replay')
+    parser.add_argument('--paths', type=int, default=10000)
+    parser.add_argument('--depth', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    states = load_book_states(args.capture, args.symbol, depth=args.depth)
+    simulator = ExecutionSimulator(states, side=args.side, mode=args.mode, workers=args.workers)
+    model = AlmgrenChrissModel()
+    price = float(np.median(states.mids))
+
+    grid = [(horizon, lam) for horizon in args.horizons for lam in args.risk_aversions]
+    strategies = []
+    for horizon, lam in grid:
+        times, trades = model.schedules((args.quantity,), horizon, simulator.volatility, lam, args.steps, price)
+        strategies.append((times, trades[0]))
+
+    print(f"{'horizon s':>10}{'lambda':>10}{'mean bps':>10}{'std bps':>10}{'p95 bps':>10}{'cvar95':>10}")
+    for (horizon, lam), summary in zip(grid, simulator.evaluate(strategies, args.paths, args.seed)):
+        print(f"{horizon:>10g}{lam:>10g}{summary['mean_bps']:>10.2f}{summary['std_bps']:>10.2f}"
+              f"{summary['p95_bps']:>10.2f}{summary['cvar95_bps']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import time
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+# Pipeline stages in the order a book passes through them
+STAGES = ('exchange', 'received', 'decoded', 'processed', 'delivered', 'painted')
+
+# perf_counter_ns() + WALL_OFFSET_NS ~= time.time_ns(); lets exchange
+# timestamps (wall clock) share a timeline with the monotonic stage stamps
+WALL_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+
+def now_ns() -> int:
+    """Monotonic stage timestamp"""
+    return time.perf_counter_ns()
+
+
+def exchange_ns(ts_ms: int) -> int:
+    """Exchange `ts` (epoch ms) on the perf_counter_ns timeline"""
+    return ts_ms * 1_000_000 - WALL_OFFSET_NS
+
+
+class LatencyHistogram:
+    """
+    Log-linear (HDR-style) histogram of nanosecond latencies in fixed memory.
+
+    Values below 2**sub_bucket_bits are counted exactly; above that every
+    power of two is split into 2**(sub_bucket_bits - 1) buckets, so the
+    relative error stays below 2**-(sub_bucket_bits - 1) up to max_value_ns.
+    """
+
+    def __init__(self, max_value_ns: int = 60_000_000_000, sub_bucket_bits: int = 7):
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub_count = 1 << sub_bucket_bits
+        self._half = self._sub_count >> 1
+        self.max_value_ns = max_value_ns
+        self.counts = np.zeros(self._index(max_value_ns) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < self._sub_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return shift * self._half + (value >> shift)
+
+    def _value(self, index: int) -> int:
+        """Midpoint of the values counted in a bucket"""
+        if index < self._sub_count:
+            return index
+        shift = index // self._half - 1
+        return ((index - shift * self._half) << shift) + (1 << shift) // 2
+
+    def record(self, value_ns: int):
+        """Count one latency; values are clamped to [0, max_value_ns]"""
+        value_ns = min(max(int(value_ns), 0), self.max_value_ns)
+        self.counts[self._index(value_ns)] += 1
+        self.count += 1
+        self.total += value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+        if self.min is None or value_ns < self.min:
+            self.min = value_ns
+
+    def percentile(self, p: float) -> int:
+        """Latency at percentile p (0-100) in ns"""
+        if not self.count:
+            return 0
+        rank = max(1, int(np.ceil(p / 100.0 * self.count)))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(self._value(index), self.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Add another histogram with the same layout into this one"""
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+    def reset(self):
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def snapshot(self, percentiles: Iterable[float] = (50, 99, 99.9)) -> Dict[str, float]:
+        """Count, mean, percentiles and max in milliseconds"""
+        if not self.count:
+            return {'count': 0}
+        result = {'count': self.count, 'mean_ms': self.mean / 1e6, 'max_ms': self.max / 1e6}
+        for p in percentiles:
+            result[f'p{p:g}_ms'] = self.percentile(p) / 1e6
+        return result
+
+
+class LatencyTracer:
+    """
+    Per-stage latency histograms fed from stage timestamps carried with each book.
+
+    A trace is a dict of stage name -> perf_counter_ns stamp, filled in the
+    order the book passes through the stages (see STAGES). Every pair of
+    consecutive stamps is recorded under "a->b". Spans measure from a named
+    stage to the last stamp: by default `end_to_end` from the exchange
+    timestamp and `internal` from frame receipt.
+    """
+
+    DEFAULT_SPANS = {'end_to_end': 'exchange', 'internal': 'received'}
+
+    def __init__(self, spans: Optional[Dict[str, str]] = None):
+        self.spans = dict(self.DEFAULT_SPANS if spans is None else spans)
+        self.histograms: Dict[str, LatencyHistogram] = {name: LatencyHistogram() for name in self.spans}
+
+    def _histogram(self, name: str) -> LatencyHistogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+
+    def record(self, trace: Dict[str, int]):
+        stages = iter(trace.items())
+        first = next(stages, None)
+        if first is None:
+            return
+
+        previous_stage, last = first
+        for stage, stamp in stages:
+            self._histogram(f"{previous_stage}->{stage}").record(stamp - last)
+            previous_stage, last = stage, stamp
+
+        for name, start_stage in self.spans.items():
+            start = trace.get(start_stage)
+            if start is not None and start != last:
+                self.histograms[name].record(last - start)
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Percentile summary of every stage pair that has samples"""
+        return {name: h.snapshot() for name, h in self.histograms.items() if h.count}
@@ -0,0 +1,87 @@
+import threading
+from typing import Any, Dict, Hashable, Optional
+
+from .cache import MISSING
+
+
+class LatestValueMailbox:
+    """
+    Thread-safe latest-value slot per key (e.g. per symbol) between pipeline stages.
+
+    A producer never blocks and never queues: putting a value for a key that
+    still holds an unread one replaces it and counts as conflated. A slow
+    consumer therefore only ever sees the newest state of each key.
+    """
+
+    def __init__(self):
+        self._slots: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self.puts = 0
+        self.takes = 0
+        self.conflated = 0
+        self.dropped = 0
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """
+        Store the newest value for key
+
+        Returns:
+            bool: True if the slot was empty, i.e. the consumer may need a wakeup
+        """
+        with self._lock:
+            was_empty = key not in self._slots
+            if not was_empty:
+                self.conflated += 1
+            self._slots[key] = value
+            self.puts += 1
+            self._ready.notify()
+        return was_empty
+
+    def take(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return the pending value for key"""
+        with self._lock:
+            value = self._slots.pop(key, MISSING)
+            if value is MISSING:
+                return default
+            self.takes += 1
+            return value
+
+    def take_all(self) -> Dict[Hashable, Any]:
+        """Remove and return every pending value"""
+        with self._lock:
+            slots = self._slots
+            self._slots = {}
+            self.takes += len(slots)
+            return slots
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until at least one value is pending; False on timeout"""
+        with self._lock:
+            return self._ready.wait_for(lambda: bool(self._slots), timeout)
+
+    def discard(self, key: Hashable):
+        """Drop the pending value of a key nobody will read any more"""
+        with self._lock:
+            if self._slots.pop(key, MISSING) is not MISSING:
+                self.dropped += 1
+
+    def clear(self):
+        with self._lock:
+            self.dropped += len(self._slots)
+            self._slots.clear()
+
+    @property
+    def depth(self) -> int:
+        """Number of keys with an unread value"""
+        return len(self._slots)
+
+    def stats(self) -> Dict[str, int]:
+        """Queue depth and conflation counters"""
+        return {
+            'depth': self.depth,
+            'puts': self.puts,
+            'takes': self.takes,
+            'conflated': self.conflated,
+            'dropped': self.dropped
+        }
@@ -0,0 +1,79 @@
+"""
+Online maker/taker model trained on the public trade tape.
+
+Each trade on OKX's `trades` channel carries the taker side, which labels
+who supplied liquidity: a seller-initiated trade fills resting bids, so a
+passive buy at the touch would have been a maker fill. A logistic
+regression on order-flow features of the book seen just before the trade
+learns the probability of that outcome one stochastic gradient step per
+trade, and predicting on a book update is one dot product.
+
+Features are bounded (imbalances and exponentially weighted signs in
+[-1, 1]) and maintained incrementally from the processor's depth ladders,
+so nothing walks the book on a tick; they and the regression live in
+core.order_flow.
+"""
+from typing import Dict, Optional, Tuple
+
+from .book_walk import DepthLadder
+from .order_flow import FEATURE_NAMES, OrderFlowFeatures, OnlineLogisticRegression
+
+
+def update_from_ladders(features: OrderFlowFeatures, ask_ladder: DepthLadder, bid_ladder: DepthLadder):
+    """Fold a book into the features, reading depths off the processor's cumulative ladders"""
+    if not len(ask_ladder) or not len(bid_ladder):
+        return
+    features.update_top(
+        float(bid_ladder.prices[0]), float(bid_ladder.sizes[0]),
+        float(ask_ladder.prices[0]), float(ask_ladder.sizes[0]),
+        float(bid_ladder.cum_size[min(features.levels, len(bid_ladder)) - 1]),
+        float(ask_ladder.cum_size[min(features.levels, len(ask_ladder)) - 1])
+    )
+
+
+class MakerTakerModel:
+    """
+    Predicts the maker/taker split of a buy order from the order flow.
+
+    The maker proportion is the probability that the next trade is
+    seller-initiated, i.e. that a bid resting at the touch gets filled.
+    Until `min_samples` trades were seen the split falls back to the
+    visible bid share of the book.
+    """
+
+    def __init__(self, levels: int = 5, halflife: float = 50.0, min_samples: int = 100,
+                 learning_rate: float = 0.1):
+        self.features = OrderFlowFeatures(levels, halflife)
+        self.regression = OnlineLogisticRegression(len(FEATURE_NAMES), learning_rate)
+        self.min_samples = min_samples
+        self._prior: Optional[float] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.regression.samples_seen >= self.min_samples
+
+    def observe_book(self, ask_ladder: DepthLadder, bid_ladder: DepthLadder):
+        update_from_ladders(self.features, ask_ladder, bid_ladder)
+        total = ask_ladder.total_size + bid_ladder.total_size
+        self._prior = bid_ladder.total_size / total if total > 0 else None
+
+    def observe_trade(self, side: str):
+        """Train on a public trade against the book it hit; side is the taker side"""
+        if self.features.books:
+            self.regression.partial_fit(self.features.values, (1.0 if side == 'sell' else 0.0,))
+        self.features.update_trade(side)
+
+    def proportion(self) -> Tuple[float, float]:
+        """(maker, taker) proportions for a buy order on the current book"""
+        if self.trained:
+            maker = self.regression.predict_proba(self.features.values)
+        elif self._prior is not None:
+            maker = self._prior
+        else:
+            maker = 0.5
+        return maker, 1.0 - maker
+
+    def stats(self) -> Dict[str, float]:
+        stats = {'trades': self.regression.samples_seen, 'trained': self.trained}
+        stats.update(zip(FEATURE_NAMES, self.regression.weights.tolist()))
+        return stats
@@ -1,88 +1,259 @@
 import numpy as np
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 import logging
 
+from .cache import LRUCache, MISSING
+
+# Below this kappa * T the optimal trajectory is linear to double precision
+_LINEAR_LIMIT = 1e-6
+# Below this kappa * T the variance integral uses its Taylor series, whose
+# closed form loses digits to cancellation
+_SERIES_LIMIT = 1e-3
+
+
+def _read_only(*arrays: np.ndarray):
+    for array in arrays:
+        array.setflags(write=False)
+
+
 class AlmgrenChrissModel:
-    def __init__(self, eta: float = 0.1, gamma: float = 0.1):
+    def __init__(self,
+                 eta: float = 0.1,
+                 gamma: float = 0.1,
+                 risk_aversion: float = 1e-6,
+                 steps: int = 10,
+                 cache_size: int = 256):
         """
         Initialize the Almgren-Chriss model with parameters:
         eta: Temporary market impact parameter
         gamma: Permanent market impact parameter
+        risk_aversion: Default lambda of the mean-variance objective
+        steps: Default number of trading intervals in a schedule
+        cache_size: Parameter sets whose unit-quantity solutions are memoized
+
+        Impact parameters and volatility are relative to price, so costs and
+        variances come out in quote currency when a price is given.
         """
         self.eta = eta
         self.gamma = gamma
+        self.risk_aversion = risk_aversion
+        self.steps = steps
         self.logger = logging.getLogger(__name__)
 
-    def calculate_impact(self, quantity: float, price: float, depth: int) -> float:
+        # Solutions scale with quantity (holdings linearly, cost and variance
+        # quadratically), so only unit-quantity results are cached
+        self._cache = LRUCache(maxsize=cache_size)
+
+    def update_parameters(self, eta: Optional[float] = None, gamma: Optional[float] = None):
+        """Replace the impact coefficients, e.g. from an online calibrator"""
+        if eta is not None:
+            self.eta = eta
+        if gamma is not None:
+            self.gamma = gamma
+
+    def calculate_impact(self, quantity: float, price: float) -> float:
         """
         Calculate market impact using the Almgren-Chriss model
-        
+
         Args:
-            quantity: Order quantity
+            quantity: Order quantity in base units, executed over one time unit
             price: Current market price
-            depth: Order book depth
-            
+
         Returns:
-            float: Estimated market impact
+            float: Estimated market impact in quote currency
         """
         try:
-            # Calculate temporary impact
-            temp_impact = self.eta * (quantity / depth) * price
-            
-            # Calculate permanent impact
-            perm_impact = self.gamma * quantity * price
-            
+            notional = quantity * price
+
+            # Temporary impact: price concession eta * quantity on the whole order
+            temp_impact = self.eta * quantity * notional
+
+            # Permanent impact: the price drifts linearly through the order
+            perm_impact = 0.5 * self.gamma * quantity * notional
+
             # Total impact
             total_impact = temp_impact + perm_impact
-            
+
             return total_impact
-            
+
         except Exception as e:
             self.logger.error(f"Error calculating market impact: {str(e)}")
             return 0.0
 
-    def optimize_execution(self, 
-                         quantity: float, 
-                         price: float, 
+    def _validate(self, time_horizons: np.ndarray, volatility: float, risk_aversions: np.ndarray, steps: int):
+        if self.eta <= 0:
+            raise ValueError("eta must be positive")
+        if steps < 1:
+            raise ValueError("steps must be at least 1")
+        if volatility < 0:
+            raise ValueError("volatility must be non-negative")
+        if np.any(time_horizons <= 0):
+            raise ValueError("time horizons must be positive")
+        if np.any(risk_aversions < 0):
+            raise ValueError("risk aversion must be non-negative")
+
+    def _solve(self,
+               risk_aversions: np.ndarray,
+               time_horizons: np.ndarray,
+               volatility: float,
+               steps: int,
+               price: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Closed-form optimal trajectories for one unit of quantity on a
+        (risk aversion x horizon) grid
+
+        The continuous-time solution x(t) = sinh(k (T - t)) / sinh(k T) with
+        k = sqrt(lambda * sigma^2 / eta) is sampled at steps + 1 equally
+        spaced times; expected cost and variance are its exact integrals.
+
+        Returns:
+            (times (H, N+1), holdings (L, H, N+1), expected_cost (L, H), variance (L, H))
+        """
+        eta = self.eta * price
+        gamma = self.gamma * price
+        sigma = volatility * price
+
+        kappa = np.sqrt(risk_aversions * sigma ** 2 / eta)[:, None]   # (L, 1)
+        horizons = time_horizons[None, :]                              # (1, H)
+        u = kappa * horizons                                           # (L, H)
+        linear = u < _LINEAR_LIMIT
+        u_safe = np.where(linear, 1.0, u)
+        kappa_safe = np.where(linear, 1.0, kappa)
+
+        fractions = np.linspace(0.0, 1.0, steps + 1)
+        times = time_horizons[:, None] * fractions                     # (H, N+1)
+
+        # sinh(k (T - t)) / sinh(k T) in a form that cannot overflow
+        kt = u_safe[..., None] * fractions                             # (L, H, N+1)
+        uu = u_safe[..., None]
+        holdings = np.exp(-kt) * np.expm1(-2.0 * (uu - kt)) / np.expm1(-2.0 * uu)
+        holdings = np.where(linear[..., None], 1.0 - fractions, holdings)
+
+        # 1 / sinh(u) and coth(u), again without overflow
+        decay = np.exp(-u_safe)
+        csch = -2.0 * decay / np.expm1(-2.0 * u_safe)
+        coth = (1.0 + decay ** 2) / -np.expm1(-2.0 * u_safe)
+
+        # Temporary cost eta * int v^2 dt and variance sigma^2 * int x^2 dt
+        speed = kappa_safe * (u_safe * csch ** 2 + coth) / 2.0
+        exposure = np.where(u_safe < _SERIES_LIMIT,
+                            horizons * (1.0 / 3.0 - 2.0 * u_safe ** 2 / 45.0),
+                            (coth - u_safe * csch ** 2) / (2.0 * kappa_safe))
+        speed = np.where(linear, 1.0 / horizons, speed)
+        exposure = np.where(linear, horizons / 3.0, exposure)
+
+        expected_cost = 0.5 * gamma + eta * speed
+        variance = sigma ** 2 * exposure
+        return times, holdings, expected_cost, variance
+
+    def _unit_solution(self,
+                       risk_aversions: Iterable[float],
+                       time_horizons: Iterable[float],
+                       volatility: float,
+                       steps: int,
+                       price: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Memoized _solve for identical parameters"""
+        risk_aversions = tuple(float(r) for r in risk_aversions)
+        time_horizons = tuple(float(t) for t in time_horizons)
+        key = (risk_aversions, time_horizons, float(volatility), int(steps), float(price), self.eta, self.gamma)
+        cached = self._cache.get(key)
+        if cached is not MISSING:
+            return cached
+
+        lambdas = np.asarray(risk_aversions, dtype=np.float64)
+        horizons = np.asarray(time_horizons, dtype=np.float64)
+        self._validate(horizons, volatility, lambdas, steps)
+        solution = self._solve(lambdas, horizons, volatility, steps, price)
+        _read_only(*solution)
+        self._cache.put(key, solution)
+        return solution
+
+    def trajectory(self,
+                   quantity: float,
+                   time_horizon: float,
+                   volatility: float,
+                   risk_aversion: Optional[float] = None,
+                   steps: Optional[int] = None,
+                   price: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Optimal holdings over the trading horizon
+
+        Returns:
+            (times, holdings): steps + 1 points from (0, quantity) to (time_horizon, 0)
+        """
+        risk_aversion = self.risk_aversion if risk_aversion is None else risk_aversion
+        times, holdings, _, _ = self._unit_solution(
+            (risk_aversion,), (time_horizon,), volatility, steps or self.steps, price
+        )
+        return times[0], quantity * holdings[0, 0]
+
+    def schedules(self,
+                  quantities: Iterable[float],
+                  time_horizon: float,
+                  volatility: float,
+                  risk_aversion: Optional[float] = None,
+                  steps: Optional[int] = None,
+                  price: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Trade lists for many parent orders sharing the same market parameters
+
+        Returns:
+            (times (N+1,), trades (n_orders, N)): quantity traded in each interval
+        """
+        times, holdings = self.trajectory(1.0, time_horizon, volatility, risk_aversion, steps, price)
+        trades = -np.diff(holdings)
+        return times, np.outer(np.asarray(quantities, dtype=np.float64), trades)
+
+    def efficient_frontier(self,
+                           quantity: float,
+                           risk_aversions: Iterable[float],
+                           time_horizons: Iterable[float],
+                           volatility: float,
+                           steps: Optional[int] = None,
+                           price: float = 1.0) -> Dict[str, np.ndarray]:
+        """
+        Expected cost and variance of the optimal strategy for every
+        combination of risk aversion and horizon
+
+        Returns:
+            Dict with risk_aversion (L,), time_horizon (H,), times (H, N+1),
+            holdings (L, H, N+1), expected_cost (L, H) and variance (L, H)
+        """
+        risk_aversions = tuple(risk_aversions)
+        time_horizons = tuple(time_horizons)
+        times, holdings, expected_cost, variance = self._unit_solution(
+            risk_aversions, time_horizons, volatility, steps or self.steps, price
+        )
+        scale = quantity ** 2
+        return {
+            'risk_aversion': np.asarray(risk_aversions, dtype=np.float64),
+            'time_horizon': np.asarray(time_horizons, dtype=np.float64),
+            'times': times,
+            'holdings': quantity * holdings,
+            'expected_cost': scale * expected_cost,
+            'variance': scale * variance
+        }
+
+    def optimize_execution(self,
+                         quantity: float,
+                         price: float,
                          time_horizon: float,
-                         volatility: float) -> List[Tuple[float, float]]:
+                         volatility: float,
+                         risk_aversion: Optional[float] = None,
+                         steps: Optional[int] = None) -> List[Tuple[float, float]]:
         """
         Optimize execution schedule using Almgren-Chriss model
-        
+
         Args:
             quantity: Total quantity to execute
             price: Initial price
             time_horizon: Total time for execution
-            volatility: Market volatility
-            
+            volatility: Market volatility, relative to price per sqrt(time unit)
+            risk_aversion: Lambda of the mean-variance objective, model default if omitted
+            steps: Trading intervals, model default if omitted
+
         Returns:
             List of (time, quantity) tuples representing optimal execution schedule
         """
-        try:
-            # Model parameters
-            kappa = np.sqrt(self.gamma / self.eta)  # Risk aversion parameter
-            
-            # Time grid
-            n_steps = 10
-            times = np.linspace(0, time_horizon, n_steps)
-            
-            # Calculate optimal execution schedule
-            schedule = []
-            remaining_qty = quantity
-            
-            for t in times:
-                # Calculate optimal quantity at time t
-                q_t = quantity * (1 - np.exp(-kappa * (time_horizon - t))) / (1 - np.exp(-kappa * time_horizon))
-                
-                # Calculate quantity to execute in this step
-                step_qty = q_t - (quantity - remaining_qty)
-                step_qty = max(0, min(step_qty, remaining_qty))
-                
-                schedule.append((t, step_qty))
-                remaining_qty -= step_qty
-                
-            return schedule
-            
-        except Exception as e:
-            self.logger.error(f"Error optimizing execution schedule: {str(e)}")
-            return [(0, quantity)]  # Return simple immediate execution as fallback 
\ No newline at end of file
+        times, trades = self.schedules((quantity,), time_horizon, volatility, risk_aversion, steps, price)
+        return list(zip(times[:-1].tolist(), trades[0].tolist()))
@@ -0,0 +1,280 @@
+"""
+Prometheus text-format metrics for the live pipeline.
+
+Collectors read counters that the client, processors, mailboxes and tracer
+already keep; nothing is computed on the hot path for the endpoint. The
+optional HTTP server (aiohttp) runs on its own thread and event loop, so a
+scrape never runs on the loop that reads the socket.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .latency import LatencyHistogram
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Quantiles exported for every latency summary
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class MetricFamily(NamedTuple):
+    """One metric name with its type, help text and (suffix, labels, value) samples"""
+    name: str
+    kind: str
+    help: str
+    samples: List[Tuple[str, Dict[str, str], float]]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(families: Iterable[MetricFamily]) -> str:
+    """Serialize metric families in the Prometheus text exposition format"""
+    lines = []
+    for family in families:
+        if not family.samples:
+            continue
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for suffix, labels, value in family.samples:
+            lines.append(f"{family.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+def summary_samples(histogram: LatencyHistogram, labels: Dict[str, str]) -> List[Tuple[str, Dict[str, str], float]]:
+    """Quantiles, sum and count of a nanosecond histogram, in seconds"""
+    samples = []
+    if histogram.count:
+        for q in SUMMARY_QUANTILES:
+            samples.append(('', {**labels, 'quantile': f'{q:g}'}, histogram.percentile(q * 100) / 1e9))
+    samples.append(('_sum', labels, histogram.total / 1e9))
+    samples.append(('_count', labels, histogram.count))
+    return samples
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """Current RSS of this process, peak RSS where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+class MetricsRegistry:
+    """
+    Set of collectors rendered together on every scrape.
+
+    A collector is any callable returning an iterable of MetricFamily; the
+    helpers below build the ones for the pipeline components.
+    """
+
+    def __init__(self):
+        self.collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self.logger = logging.getLogger(__name__)
+
+    def register(self, collector: Callable[[], Iterable[MetricFamily]]):
+        self.collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        families = [MetricFamily(
+            'process_resident_memory_bytes', 'gauge', 'Resident memory size in bytes',
+            [('', {}, value)] if (value := resident_memory_bytes()) is not None else []
+        )]
+        for collector in self.collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                self.logger.error(f"Error collecting metrics: {str(e)}")
+        return families
+
+    def render(self) -> str:
+        return render(self.collect())
+
+
+class ClientCollector:
+    """
+    Message counts, decode latency and book health of a WebSocketClient.
+
+    Takes a getter rather than the client itself because the GUI creates a
+    new client for every start; a None client yields no samples. Message
+    rates are left to the server (rate() over _messages_total): a rate
+    computed here would depend on which scrape came before.
+    """
+
+    def __init__(self, get_client: Callable, prefix: str = 'tradesim'):
+        self.get_client = get_client
+        self.prefix = prefix
+
+    def __call__(self) -> List[MetricFamily]:
+        client = self.get_client()
+        if client is None:
+            return []
+        p = self.prefix
+        return [
+            MetricFamily(f'{p}_messages_total', 'counter', 'Book messages received per instrument',
+                         [('', {'symbol': s}, n) for s, n in dict(client.message_counts).items()]),
+            MetricFamily(f'{p}_decode_latency_seconds', 'summary', 'Frame receipt to decoded book',
+                         summary_samples(client.decode_latency, {})),
+            MetricFamily(f'{p}_book_resyncs_total', 'counter', 'Books dropped out of sync by reason',
+                         [('', {'reason': r}, n) for r, n in dict(client.sync_failures).items()]),
+            MetricFamily(f'{p}_book_gaps_total', 'counter', 'Sequence gaps and checksum mismatches per instrument',
+                         [('', {'symbol': s}, n) for s, n in dict(client.book_gaps).items()]),
+            MetricFamily(f'{p}_book_resync_seconds', 'summary', 'Book out of sync (or reconnect) to next snapshot',
+                         summary_samples(client.resync_latency, {})),
+            MetricFamily(f'{p}_reconnects_total', 'counter', 'WebSocket reconnects',
+                         [('', {}, client.reconnects)]),
+            MetricFamily(f'{p}_book_channel', 'gauge', 'Book channel each instrument is read from',
+                         [('', {'symbol': s, 'channel': c}, 1) for s, c in dict(client.channels).items()]),
+            MetricFamily(f'{p}_channel_switches_total', 'counter', 'Book channel upgrades and downgrades',
+                         [('', {}, client.channel_switches)]),
+        ]
+
+
+def processor_collector(get_processors: Callable[[], Dict], prefix: str = 'tradesim') -> Callable[[], List[MetricFamily]]:
+    """Compute latency, cache counters and impact coefficients of the per-symbol OrderbookProcessors"""
+
+    def collect() -> List[MetricFamily]:
+        processors = get_processors() or {}
+        latency, hits, misses, ratio, eta, gamma = [], [], [], [], [], []
+        for symbol, processor in list(processors.items()):
+            labels = {'symbol': symbol}
+            eta.append(('', labels, processor.market_impact_model.eta))
+            gamma.append(('', labels, processor.market_impact_model.gamma))
+            latency.extend(summary_samples(processor.processing_times, labels))
+            stats = processor.cache_stats
+            hits.append(('', labels, stats['hits']))
+            misses.append(('', labels, stats['misses']))
+            ratio.append(('', labels, stats['hit_rate']))
+        return [
+            MetricFamily(f'{prefix}_compute_latency_seconds', 'summary', 'Metric computation time per book', latency),
+            MetricFamily(f'{prefix}_cache_hits_total', 'counter', 'Calculation cache hits', hits),
+            MetricFamily(f'{prefix}_cache_misses_total', 'counter', 'Calculation cache misses', misses),
+            MetricFamily(f'{prefix}_cache_hit_ratio', 'gauge', 'Calculation cache hit rate', ratio),
+            MetricFamily(f'{prefix}_impact_eta', 'gauge', 'Temporary impact coefficient in use', eta),
+            MetricFamily(f'{prefix}_impact_gamma', 'gauge', 'Permanent impact coefficient in use', gamma),
+        ]
+
+    return collect
+
+
+def mailbox_collector(get_mailboxes: Callable[[], Dict], prefix: str = 'tradesim') -> Callable[[], List[MetricFamily]]:
+    """Conflation counters of named LatestValueMailboxes"""
+
+    def collect() -> List[MetricFamily]:
+        conflated, dropped, depth = [], [], []
+        for name, mailbox in (get_mailboxes() or {}).items():
+            if mailbox is None:
+                continue
+            labels = {'mailbox': name}
+            stats = mailbox.stats()
+            conflated.append(('', labels, stats['conflated']))
+            dropped.append(('', labels, stats['dropped']))
+            depth.append(('', labels, stats['depth']))
+        return [
+            MetricFamily(f'{prefix}_conflated_updates_total', 'counter', 'Unread values replaced by newer ones', conflated),
+            MetricFamily(f'{prefix}_dropped_updates_total', 'counter', 'Unread values discarded', dropped),
+            MetricFamily(f'{prefix}_mailbox_depth', 'gauge', 'Keys with an unread value', depth),
+        ]
+
+    return collect
+
+
+def tracer_collector(tracer, prefix: str = 'tradesim') -> Callable[[], List[MetricFamily]]:
+    """Per-stage and end-to-end latency summaries of a LatencyTracer"""
+
+    def collect() -> List[MetricFamily]:
+        samples = []
+        for stage, histogram in list(tracer.histograms.items()):
+            if histogram.count:
+                samples.extend(summary_samples(histogram, {'stage': stage}))
+        return [MetricFamily(f'{prefix}_stage_latency_seconds', 'summary', 'Pipeline stage latencies', samples)]
+
+    return collect
+
+
+class MetricsServer:
+    """
+    Serves a MetricsRegistry at /metrics from a daemon thread with its own event loop.
+
+    aiohttp is only imported when the server starts.
+    """
+
+    def __init__(self, registry: MetricsRegistry, host: str = '127.0.0.1', port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger(__name__)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._error: Optional[Exception] = None
+
+    async def _handle_metrics(self, request):
+        from aiohttp import web
+        return web.Response(body=self.registry.render().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+    def _run(self):
+        try:
+            from aiohttp import web
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+
+            app = web.Application()
+            app.router.add_get('/metrics', self._handle_metrics)
+            runner = web.AppRunner(app, access_log=None)
+            self.loop.run_until_complete(runner.setup())
+            self.loop.run_until_complete(web.TCPSite(runner, self.host, self.port).start())
+        except Exception as e:
+            self._error = e
+            self._started.set()
+            return
+
+        self.logger.info(f"Serving metrics at http://{self.host}:{self.port}/metrics")
+        self._started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(runner.cleanup())
+            self.loop.close()
+
+    def start(self, timeout: float = 5.0):
+        """Start serving; raises if the server could not bind"""
+        self._thread = threading.Thread(target=self._run, name='metrics-server', daemon=True)
+        self._thread.start()
+        self._started.wait(timeout)
+        if self._error is not None:
+            raise self._error
+
+    def stop(self, timeout: float = 5.0):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
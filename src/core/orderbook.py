@@ -0,0 +1,345 @@
+import zlib
+import numpy as np
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# Number of levels per side that OKX folds into the book checksum
+CHECKSUM_DEPTH = 25
+# Checksum strings kept per side, mostly for the top CHECKSUM_DEPTH levels
+LEVEL_TEXT_CACHE = 4 * CHECKSUM_DEPTH
+# Exact integer scale factors for fixed-point values
+POW10 = tuple(10 ** i for i in range(19))
+
+
+class BookOutOfSyncError(Exception):
+    """Raised when a book update fails its sequence or checksum check"""
+
+    def __init__(self, message: str, reason: str = 'sequence'):
+        super().__init__(message)
+        self.reason = reason  # 'sequence', 'checksum' or 'no_snapshot'
+
+
+def okx_checksum(bids: List[List[str]], asks: List[List[str]]) -> int:
+    """
+    Compute the OKX order book checksum
+
+    Args:
+        bids: Best-first (price, size) strings as sent by the exchange
+        asks: Best-first (price, size) strings as sent by the exchange
+
+    Returns:
+        int: Signed 32-bit CRC32 of the interleaved top levels
+    """
+    return _checksum([f"{price}:{size}" for price, size, *_ in bids[:CHECKSUM_DEPTH]],
+                     [f"{price}:{size}" for price, size, *_ in asks[:CHECKSUM_DEPTH]])
+
+
+def _checksum(bids: List[str], asks: List[str]) -> int:
+    """okx_checksum of best-first 'price:size' level strings"""
+    parts = []
+    for i in range(CHECKSUM_DEPTH):
+        if i < len(bids):
+            parts.append(bids[i])
+        if i < len(asks):
+            parts.append(asks[i])
+    crc = zlib.crc32(":".join(parts).encode())
+    return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+
+def parse_decimal(text: str) -> Tuple[int, int]:
+    """
+    Exact fixed-point value of a plain decimal string
+
+    Returns:
+        (digits, decimals), e.g. '30000.10' -> (3000010, 2)
+    """
+    whole, _, fraction = text.partition('.')
+    return int(whole + fraction), len(fraction)
+
+
+def format_decimal(digits: int, decimals: int) -> str:
+    """Inverse of parse_decimal, reproducing the string as received"""
+    if not decimals:
+        return str(digits)
+    text = str(digits).rjust(decimals + 1, '0')
+    return f"{text[:-decimals]}.{text[-decimals:]}"
+
+
+class BookSide:
+    """
+    One side of an L2 book kept sorted by price and updated in place.
+
+    Prices and sizes are held as int64 fixed-point values in contiguous
+    arrays, scaled to the most decimals seen on the side, so levels compare
+    exactly and take 18 bytes each. Only levels near the top keep their
+    'price:size' checksum string as received; deeper levels are formatted
+    back from the decimals they were sent with when they reach the top.
+    Floats are only produced when levels are read out.
+    """
+
+    __slots__ = ('descending', 'price_decimals', 'size_decimals', '_scales',
+                 '_prices', '_sizes', '_price_sent', '_size_sent', '_texts')
+
+    def __init__(self, descending: bool):
+        self.descending = descending
+        # Fixed-point scales: a stored value v means v / 10**decimals
+        self.price_decimals = 0
+        self.size_decimals = 0
+        self._scales = np.ones(2)
+        # Ascending prices with sizes aligned by index; bids are read back-to-front
+        self._prices = array('q')
+        self._sizes = array('q')
+        # Decimals of each level's price and size strings as received
+        self._price_sent = array('B')
+        self._size_sent = array('B')
+        # Stored price -> 'price:size' as received, for levels near the top
+        self._texts: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def clear(self):
+        for values in (self._prices, self._sizes, self._price_sent, self._size_sent):
+            del values[:]
+        self._texts.clear()
+        self._set_decimals(0, 0)
+
+    def _set_decimals(self, price_decimals: int, size_decimals: int):
+        self.price_decimals = price_decimals
+        self.size_decimals = size_decimals
+        # Powers of ten up to 1e22 are exact, so divided values are correctly rounded
+        self._scales = np.array([10.0 ** price_decimals, 10.0 ** size_decimals])
+
+    def _rescale(self, price_decimals: int, size_decimals: int):
+        """Move stored values to finer scales when a level arrives with more decimals"""
+        for values, old, new in ((self._prices, self.price_decimals, price_decimals),
+                                 (self._sizes, self.size_decimals, size_decimals)):
+            if new > old and len(values):
+                np.frombuffer(values, dtype=np.int64)[:] *= 10 ** (new - old)
+        self._set_decimals(price_decimals, size_decimals)
+        self._texts.clear()
+
+    def load(self, levels: List[List[str]]):
+        """Replace the side with a snapshot of [price, size, ...] string levels"""
+        self.clear()
+        parsed = [(parse_decimal(level[0]), parse_decimal(level[1])) for level in levels]
+        pd = max((price[1] for price, _ in parsed), default=0)
+        sd = max((size[1] for _, size in parsed), default=0)
+        self._set_decimals(pd, sd)
+        rows = sorted((p * POW10[pd - pdec], s * POW10[sd - sdec], pdec, sdec)
+                      for (p, pdec), (s, sdec) in parsed if s > 0)
+        if rows:
+            prices, sizes, price_sent, size_sent = zip(*rows)
+            self._prices.extend(prices)
+            self._sizes.extend(sizes)
+            self._price_sent.extend(price_sent)
+            self._size_sent.extend(size_sent)
+
+    def apply(self, levels: List[List[str]]):
+        """Apply incremental level changes; a zero size deletes the level"""
+        prices, sizes = self._prices, self._sizes
+        price_sent_all, size_sent_all = self._price_sent, self._size_sent
+        texts = self._texts
+        pd, sd = self.price_decimals, self.size_decimals
+        descending = self.descending
+        for level in levels:
+            # parse_decimal, inlined on the hot path
+            whole, _, fraction = level[0].partition('.')
+            price, price_sent = int(whole + fraction), len(fraction)
+            whole, _, fraction = level[1].partition('.')
+            size, size_sent = int(whole + fraction), len(fraction)
+            if price_sent > pd or size_sent > sd:
+                self._rescale(max(pd, price_sent), max(sd, size_sent))
+                pd, sd = self.price_decimals, self.size_decimals
+            price *= POW10[pd - price_sent]
+            i = bisect_left(prices, price)
+            exists = i < len(prices) and prices[i] == price
+            if size > 0:
+                size *= POW10[sd - size_sent]
+                if exists:
+                    sizes[i] = size
+                    price_sent_all[i] = price_sent
+                    size_sent_all[i] = size_sent
+                else:
+                    prices.insert(i, price)
+                    sizes.insert(i, size)
+                    price_sent_all.insert(i, price_sent)
+                    size_sent_all.insert(i, size_sent)
+                if (i >= len(prices) - CHECKSUM_DEPTH) if descending else (i < CHECKSUM_DEPTH):
+                    texts[price] = f"{level[0]}:{level[1]}"
+                elif exists:
+                    texts.pop(price, None)
+            elif exists:
+                del prices[i]
+                del sizes[i]
+                del price_sent_all[i]
+                del size_sent_all[i]
+                texts.pop(price, None)
+
+    def _indices(self, n: Optional[int]) -> range:
+        """Indices of the best n levels, best first"""
+        count = len(self._prices)
+        n = count if n is None else min(n, count)
+        return range(count - 1, count - 1 - n, -1) if self.descending else range(n)
+
+    def top_fixed(self, n: Optional[int] = None) -> np.ndarray:
+        """Best-first levels as a new (n, 2) int64 array of fixed-point price and size"""
+        index = self._indices(n)
+        out = np.empty((len(index), 2), dtype=np.int64)
+        if len(index):
+            rows = slice(index.start, index.stop if index.stop >= 0 else None, index.step)
+            out[:, 0] = np.frombuffer(self._prices, dtype=np.int64)[rows]
+            out[:, 1] = np.frombuffer(self._sizes, dtype=np.int64)[rows]
+        return out
+
+    def top_array(self, n: Optional[int] = None) -> np.ndarray:
+        """Best-first levels as a new (n, 2) float array"""
+        index = self._indices(n)
+        out = np.empty((len(index), 2), dtype=np.float64)
+        if len(index):
+            rows = slice(index.start, index.stop if index.stop >= 0 else None, index.step)
+            out[:, 0] = np.frombuffer(self._prices, dtype=np.int64)[rows]
+            out[:, 1] = np.frombuffer(self._sizes, dtype=np.int64)[rows]
+            out /= self._scales
+        return out
+
+    def top(self, n: Optional[int] = None) -> List[List[float]]:
+        """Best-first [price, size] levels, limited to n when given"""
+        return self.top_array(n).tolist()
+
+    def _text(self, i: int) -> Tuple[str, str]:
+        """Price and size strings of level i as received"""
+        price_sent, size_sent = self._price_sent[i], self._size_sent[i]
+        return (format_decimal(self._prices[i] // POW10[self.price_decimals - price_sent], price_sent),
+                format_decimal(self._sizes[i] // POW10[self.size_decimals - size_sent], size_sent))
+
+    def raw_top(self, n: int) -> List[List[str]]:
+        """Best-first [price, size] strings as they were received"""
+        return [list(self._text(i)) for i in self._indices(n)]
+
+    def level_texts(self, n: int) -> List[str]:
+        """Best-first 'price:size' strings as received"""
+        texts = self._texts
+        if len(texts) > LEVEL_TEXT_CACHE:
+            # Levels that drifted away from the top; the top is rebuilt below
+            texts.clear()
+        prices = self._prices
+        out = []
+        for i in self._indices(n):
+            text = texts.get(prices[i])
+            if text is None:
+                text = texts[prices[i]] = ":".join(self._text(i))
+            out.append(text)
+        return out
+
+    def best(self) -> Optional[float]:
+        if not self._prices:
+            return None
+        price = self._prices[-1] if self.descending else self._prices[0]
+        return price / 10 ** self.price_decimals
+
+
+class OrderBook:
+    """
+    Incrementally maintained L2 book for one instrument of the OKX `books` channel.
+
+    A snapshot seeds the book and every following update is applied in place.
+    Each update is checked against the previous sequence number and the
+    exchange checksum so that a partial book is never handed downstream.
+    """
+
+    __slots__ = ('symbol', 'asks', 'bids', 'seq_id', 'ts', 'is_synced')
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.asks = BookSide(descending=False)
+        self.bids = BookSide(descending=True)
+        self.seq_id: Optional[int] = None
+        self.ts: Optional[int] = None
+        self.is_synced = False
+
+    def reset(self):
+        """Drop all state; the book waits for a new snapshot"""
+        self.asks.clear()
+        self.bids.clear()
+        self.seq_id = None
+        self.ts = None
+        self.is_synced = False
+
+    def apply_snapshot(self, data: Dict):
+        """Seed the book from a `snapshot` message payload"""
+        self.asks.load(data.get('asks', []))
+        self.bids.load(data.get('bids', []))
+        self._finish_update(data)
+
+    def apply_update(self, data: Dict):
+        """
+        Apply an `update` message payload after checking its sequence
+        
+        Args:
+            data: Payload with string levels, seqId, prevSeqId and checksum
+        """
+        if not self.is_synced:
+            raise BookOutOfSyncError(f"{self.symbol}: update received before snapshot", 'no_snapshot')
+
+        prev_seq_id = data.get('prevSeqId')
+        if prev_seq_id is not None and self.seq_id is not None and int(prev_seq_id) != self.seq_id:
+            self.is_synced = False
+            raise BookOutOfSyncError(
+                f"{self.symbol}: sequence gap, expected prevSeqId {self.seq_id} got {prev_seq_id}"
+            )
+
+        self.asks.apply(data.get('asks', []))
+        self.bids.apply(data.get('bids', []))
+        self._finish_update(data)
+
+    def apply(self, action: str, data: Dict):
+        """Dispatch a `books` channel payload by its action"""
+        if action == 'snapshot':
+            self.apply_snapshot(data)
+        else:
+            self.apply_update(data)
+
+    def _finish_update(self, data: Dict):
+        if 'seqId' in data:
+            self.seq_id = int(data['seqId'])
+        if 'ts' in data:
+            self.ts = int(data['ts'])
+
+        expected = data.get('checksum')
+        if expected is not None:
+            actual = self.checksum()
+            if actual != int(expected):
+                self.is_synced = False
+                raise BookOutOfSyncError(
+                    f"{self.symbol}: checksum mismatch, expected {expected} got {actual}",
+                    'checksum'
+                )
+        self.is_synced = True
+
+    def checksum(self) -> int:
+        """Checksum of the current top levels in OKX format"""
+        return _checksum(self.bids.level_texts(CHECKSUM_DEPTH), self.asks.level_texts(CHECKSUM_DEPTH))
+
+    def top_asks(self, n: Optional[int] = None) -> List[List[float]]:
+        """Lowest n asks as [price, size], best first"""
+        return self.asks.top(n)
+
+    def top_bids(self, n: Optional[int] = None) -> List[List[float]]:
+        """Highest n bids as [price, size], best first"""
+        return self.bids.top(n)
+
+    def ask_array(self, n: Optional[int] = None) -> np.ndarray:
+        """Lowest n asks as an (n, 2) float array, best first"""
+        return self.asks.top_array(n)
+
+    def bid_array(self, n: Optional[int] = None) -> np.ndarray:
+        """Highest n bids as an (n, 2) float array, best first"""
+        return self.bids.top_array(n)
+
+    def best_ask(self) -> Optional[float]:
+        return self.asks.best()
+
+    def best_bid(self) -> Optional[float]:
+        return self.bids.best()
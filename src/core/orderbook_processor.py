@@ -1,111 +1,186 @@
 import numpy as np
-from typing import List, Dict, Tuple
-from datetime import datetime
+from typing import List, Dict, Tuple, Hashable, Optional
+import itertools
 import logging
 from .market_impact import AlmgrenChrissModel
+from .calibration import ImpactCalibrator
+from .maker_taker import MakerTakerModel
+from .book_walk import DepthLadder
+from .cache import LRUCache, MISSING
+from .latency import LatencyHistogram, now_ns
 
 class OrderbookProcessor:
-    def __init__(self, quantity: float, fee_tier: float):
+    def __init__(self, quantity: float, fee_tier: float, cache_size: int = 1024, calibrate: bool = True):
+        # Order size in USD (quote notional)
         self.quantity = quantity
         self.fee_tier = fee_tier
         self.logger = logging.getLogger(__name__)
         self.market_impact_model = AlmgrenChrissModel()
         
-        # Performance tracking
-        self.processing_times: List[float] = []
-        self.last_update_time: datetime = None
+        # Fits eta/gamma from the stream and pushes them into the model
+        self.calibrator = ImpactCalibrator(self.market_impact_model) if calibrate else None
         
-        # Cache for calculations
-        self._cache = {}
-        self._cache_timeout = 1.0  # Cache timeout in seconds
+        # Logistic maker/taker split learned from the trade tape
+        self.maker_taker_model = MakerTakerModel()
+        
+        # Performance tracking in fixed memory
+        self.processing_times = LatencyHistogram()
+        
+        # Cache for calculations, keyed by (book version, name, params)
+        self._cache = LRUCache(maxsize=cache_size)
+        
+        # Cumulative depth of the current book, rebuilt once per update
+        self._asks: List[List[float]] = None
+        self._bids: List[List[float]] = None
+        self.ask_ladder: DepthLadder = None
+        self.bid_ladder: DepthLadder = None
+        
+        # Version of the current book; the exchange seqId when available
+        self.book_version: Hashable = None
+        self._local_versions = itertools.count()
+
+    def update_book(self, 
+                    asks: List[List[float]], 
+                    bids: List[List[float]], 
+                    version: Optional[Hashable] = None):
+        """
+        Build the depth ladders for a new book state
+        
+        Args:
+            asks: Best-first ask levels
+            bids: Best-first bid levels
+            version: Book sequence number; books without one are always treated as new
+        """
+        if version is None:
+            version = ('local', next(self._local_versions))
+        
+        self._asks = asks
+        self._bids = bids
+        if version == self.book_version and self.ask_ladder is not None:
+            return
+        
+        self.book_version = version
+        self.ask_ladder = DepthLadder(asks, side='buy')
+        self.bid_ladder = DepthLadder(bids, side='sell')
+        if self.calibrator:
+            self.calibrator.observe_book(self.ask_ladder, self.bid_ladder)
+        self.maker_taker_model.observe_book(self.ask_ladder, self.bid_ladder)
 
-    def _is_cache_valid(self, key: str) -> bool:
-        """Check if cached value is still valid"""
-        if key not in self._cache:
-            return False
-        cache_time, _ = self._cache[key]
-        return (datetime.now() - cache_time).total_seconds() < self._cache_timeout
+    def observe_trade(self, size: float, side: str):
+        """Feed a public trade to the impact calibrator and the maker/taker model"""
+        if self.calibrator:
+            self.calibrator.observe_trade(size, side)
+        self.maker_taker_model.observe_trade(side)
 
-    def _get_cached_value(self, key: str):
-        """Get cached value if valid"""
-        if self._is_cache_valid(key):
-            return self._cache[key][1]
+    def _book_key(self, *levels: List[List[float]]) -> Optional[Hashable]:
+        """Version of the given levels, or None when they are not the current book"""
+        if all(side is self._asks or side is self._bids for side in levels):
+            return self.book_version
         return None
 
-    def _set_cached_value(self, key: str, value):
-        """Set cached value with current timestamp"""
-        self._cache[key] = (datetime.now(), value)
+    def _get_ladder(self, levels: List[List[float]], side: str) -> DepthLadder:
+        """Reuse the current book's ladder when walking the same levels"""
+        if side == 'buy' and levels is self._asks:
+            return self.ask_ladder
+        if side == 'sell' and levels is self._bids:
+            return self.bid_ladder
+        return DepthLadder(levels, side=side)
 
-    def calculate_slippage(self, asks: List[List[float]], quantity: float) -> float:
-        """Calculate expected slippage using weighted average price"""
-        cache_key = f"slippage_{quantity}_{asks[0][0] if asks else 0}"
-        cached_value = self._get_cached_value(cache_key)
-        if cached_value is not None:
-            return cached_value
+    @property
+    def cache_stats(self) -> Dict[str, float]:
+        """Hit/miss/eviction counters of the calculation cache"""
+        return self._cache.stats()
+
+    def calculate_slippage(self, asks: List[List[float]], quantity: float, notional: bool = False) -> float:
+        """
+        Calculate expected slippage using weighted average price
+        
+        Args:
+            asks: Best-first ask levels
+            quantity: Order size, in base units or quote notional
+            notional: Interpret quantity as quote notional (e.g. USD)
+        """
+        version = self._book_key(asks)
+        cache_key = (version, 'slippage', quantity, notional)
+        if version is not None:
+            cached_value = self._cache.get(cache_key)
+            if cached_value is not MISSING:
+                return cached_value
 
         try:
-            # Simple implementation using weighted average price
-            total_cost = 0
-            remaining_quantity = quantity
-            
-            for price, qty in asks:
-                if remaining_quantity <= 0:
-                    break
-                    
-                executed_qty = min(remaining_quantity, qty)
-                total_cost += executed_qty * price
-                remaining_quantity -= executed_qty
-            
-            if remaining_quantity > 0:
+            ladder = self._get_ladder(asks, 'buy')
+            walk = ladder.slippage_notional if notional else ladder.slippage
+            slippage = float(walk(quantity))
+            if slippage == float('inf'):
                 self.logger.warning(f"Not enough liquidity for quantity {quantity}")
-                return float('inf')
-                
-            avg_price = total_cost / quantity
-            slippage = (avg_price - asks[0][0]) / asks[0][0]
             
-            self._set_cached_value(cache_key, slippage)
+            if version is not None:
+                self._cache.put(cache_key, slippage)
             return slippage
             
         except Exception as e:
             self.logger.error(f"Error calculating slippage: {str(e)}")
             return 0.0
 
+    def calculate_slippage_ladder(self, 
+                                  levels: List[List[float]], 
+                                  quantities: np.ndarray,
+                                  side: str = 'buy',
+                                  notional: bool = False) -> np.ndarray:
+        """
+        Calculate slippage for a whole array of order sizes in one pass
+        
+        Args:
+            levels: Best-first book side to walk (asks for buy, bids for sell)
+            quantities: Order sizes, in base units or quote notional
+            side: 'buy' or 'sell'
+            notional: Interpret quantities as quote notional (e.g. USD)
+            
+        Returns:
+            np.ndarray: Slippage per size, `inf` where the book is too thin
+        """
+        ladder = self._get_ladder(levels, side)
+        if notional:
+            return ladder.slippage_notional(quantities)
+        return ladder.slippage(quantities)
+
     def calculate_fees(self, quantity: float, price: float) -> float:
         """Calculate expected fees based on fee tier"""
-        cache_key = f"fees_{quantity}_{price}"
-        cached_value = self._get_cached_value(cache_key)
-        if cached_value is not None:
+        cache_key = (None, 'fees', quantity, price, self.fee_tier)
+        cached_value = self._cache.get(cache_key)
+        if cached_value is not MISSING:
             return cached_value
 
         try:
             fees = quantity * price * self.fee_tier
-            self._set_cached_value(cache_key, fees)
+            self._cache.put(cache_key, fees)
             return fees
         except Exception as e:
             self.logger.error(f"Error calculating fees: {str(e)}")
             return 0.0
 
     def calculate_maker_taker_proportion(self, asks: List[List[float]], bids: List[List[float]]) -> Tuple[float, float]:
-        """Calculate maker/taker proportion using order book imbalance"""
-        cache_key = f"proportion_{len(asks)}_{len(bids)}"
-        cached_value = self._get_cached_value(cache_key)
-        if cached_value is not None:
-            return cached_value
+        """Calculate maker/taker proportion from the online order-flow model"""
+        version = self._book_key(asks, bids)
+        cache_key = (version, 'proportion', self.maker_taker_model.regression.samples_seen)
+        if version is not None:
+            cached_value = self._cache.get(cache_key)
+            if cached_value is not MISSING:
+                return cached_value
 
         try:
-            # Simple implementation using order book imbalance
-            ask_volume = sum(qty for _, qty in asks)
-            bid_volume = sum(qty for _, qty in bids)
-            total_volume = ask_volume + bid_volume
-            
-            if total_volume == 0:
-                return 0.5, 0.5
-                
-            maker_prop = bid_volume / total_volume
-            taker_prop = 1 - maker_prop
-            
-            result = (maker_prop, taker_prop)
-            self._set_cached_value(cache_key, result)
+            if version is None:
+                # Levels other than the current book have no order-flow
+                # history; split by their visible bid share
+                ask_volume = self._get_ladder(asks, 'buy').total_size
+                bid_volume = self._get_ladder(bids, 'sell').total_size
+                total_volume = ask_volume + bid_volume
+                if total_volume == 0:
+                    return 0.5, 0.5
+                return bid_volume / total_volume, ask_volume / total_volume
+
+            result = self.maker_taker_model.proportion()
+            self._cache.put(cache_key, result)
             return result
             
         except Exception as e:
@@ -114,32 +189,37 @@ class OrderbookProcessor:
 
     def process_orderbook(self, data: Dict) -> Dict:
         """Process orderbook data and calculate all metrics"""
-        start_time = datetime.now()
+        start_time = now_ns()
         
         try:
             asks = data['asks']
             bids = data['bids']
+            self.update_book(asks, bids, data.get('seq_id'))
+            best_ask = self.ask_ladder.best_price
+            # The order size is USD; fees and impact are priced per base unit
+            base_quantity = self.quantity / best_ask
             
-            # Calculate metrics
-            slippage = self.calculate_slippage(asks, self.quantity)
-            fees = self.calculate_fees(self.quantity, asks[0][0])
+            # Calculate metrics; slippage walks as a fraction of the best
+            # price, so scale it by the order's notional to quote it in USD
+            slippage = self.calculate_slippage(asks, self.quantity, notional=True) * self.quantity
+            fees = self.calculate_fees(base_quantity, best_ask)
             market_impact = self.market_impact_model.calculate_impact(
-                self.quantity,
-                asks[0][0],
-                len(asks)
+                base_quantity,
+                best_ask
             )
             maker_prop, taker_prop = self.calculate_maker_taker_proportion(asks, bids)
             
-            # Calculate net cost
+            # Calculate net cost, all three in USD
             net_cost = slippage + fees + market_impact
             
             # Calculate processing latency
-            processing_time = (datetime.now() - start_time).total_seconds() * 1000
-            self.processing_times.append(processing_time)
+            finished = now_ns()
+            self.processing_times.record(finished - start_time)
+            processing_time = (finished - start_time) / 1e6
             
-            # Keep only last 100 processing times
-            if len(self.processing_times) > 100:
-                self.processing_times.pop(0)
+            # Carry the stage stamps on to the consumer
+            trace = dict(data.get('trace', ()))
+            trace['processed'] = finished
             
             return {
                 'timestamp': data['timestamp'],
@@ -150,7 +230,8 @@ class OrderbookProcessor:
                 'maker_proportion': maker_prop,
                 'taker_proportion': taker_prop,
                 'processing_latency': processing_time,
-                'avg_processing_latency': np.mean(self.processing_times)
+                'avg_processing_latency': self.processing_times.mean / 1e6,
+                'trace': trace
             }
             
         except Exception as e:
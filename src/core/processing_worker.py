@@ -0,0 +1,141 @@
+import collections
+import logging
+import threading
+from typing import Callable, Deque, Dict, Iterable, Optional
+
+from .dispatcher import SymbolDispatcher
+from .mailbox import LatestValueMailbox
+from .series import RingSeries
+
+# Result fields carried to the GUI as numbers, e.g. for charts
+SNAPSHOT_VALUES = ('slippage', 'fees', 'market_impact', 'net_cost',
+                   'maker_proportion', 'taker_proportion', 'processing_latency')
+
+# Result fields recorded in the chart history of the selected symbol
+HISTORY_FIELDS = ('slippage', 'market_impact', 'net_cost', 'processing_latency')
+
+
+def format_snapshot(symbol: str, results: Dict, data: Optional[Dict] = None) -> Dict:
+    """
+    Compact, display-ready view of one processor result
+
+    Returns:
+        Dict with symbol, label texts keyed by output name, the raw values
+        of SNAPSHOT_VALUES, the stage trace and, given the book, its levels
+    """
+    labels = {
+        'slippage': f"Expected Slippage: {results.get('slippage', 0):.4f}",
+        'fees': f"Expected Fees: {results.get('fees', 0):.4f}",
+        'market_impact': f"Expected Market Impact: {results.get('market_impact', 0):.4f}",
+        'net_cost': f"Net Cost: {results.get('net_cost', 0):.4f}",
+        'maker_taker': (f"Maker/Taker Proportion: {results.get('maker_proportion', 0):.2f}/"
+                        f"{results.get('taker_proportion', 0):.2f}")
+    }
+    return {
+        'symbol': symbol,
+        'labels': labels,
+        'values': {name: float(results.get(name, 0.0)) for name in SNAPSHOT_VALUES},
+        'timestamp': results.get('timestamp'),
+        'trace': results.get('trace', {}),
+        # Fresh arrays per book, so the GUI can keep them without copying
+        'asks': data['asks'] if data else None,
+        'bids': data['bids'] if data else None
+    }
+
+
+class ProcessingWorker(threading.Thread):
+    """
+    Runs the processors off the GUI thread.
+
+    Waits on the book mailbox filled by the WebSocket thread, feeds queued
+    trades and the newest book of every symbol through the dispatcher, and
+    leaves a formatted snapshot of the selected symbol in the results
+    mailbox for the GUI timer to pick up. The GUI never touches the
+    processors; symbol changes are handed over and applied between books.
+    """
+
+    def __init__(self,
+                 books: LatestValueMailbox,
+                 trades: Deque[Dict],
+                 dispatcher: SymbolDispatcher,
+                 results: LatestValueMailbox,
+                 selected_symbol: Optional[str] = None,
+                 on_result: Optional[Callable[[str, Dict, Dict], None]] = None,
+                 history: Optional[RingSeries] = None,
+                 poll_interval: float = 0.1):
+        """
+        Args:
+            books: Latest book per symbol, written by the WebSocket thread
+            trades: Public trades queued by the WebSocket thread
+            dispatcher: Per-symbol processors, owned by this worker from now on
+            results: Mailbox receiving snapshots of the selected symbol
+            selected_symbol: Symbol whose snapshots are published
+            on_result: Optional (symbol, book, results) hook run on this thread, e.g. a tick store
+            history: Optional series of HISTORY_FIELDS appended for the selected symbol
+            poll_interval: Seconds between checks of the stop flag while idle
+        """
+        super().__init__(name='processing-worker', daemon=True)
+        self.books = books
+        self.trades = trades
+        self.dispatcher = dispatcher
+        self.results = results
+        self.selected_symbol = selected_symbol
+        self.on_result = on_result
+        self.history = history
+        self._history_symbol = selected_symbol
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(__name__)
+        self.processed = 0
+        self._removed: Deque[str] = collections.deque()
+        self._running = threading.Event()
+
+    def select(self, symbol: str):
+        """Publish snapshots of another symbol from the next book on"""
+        self.selected_symbol = symbol
+
+    def remove_symbols(self, symbols: Iterable[str]):
+        """Drop processors of instruments no longer carried, from the worker thread"""
+        self._removed.extend(symbols)
+
+    def run(self):
+        self._running.set()
+        while self._running.is_set():
+            if not self.books.wait(self.poll_interval) and not self.trades:
+                continue
+            self.process_pending()
+
+    def process_pending(self):
+        """Apply pending symbol removals, trades and books once"""
+        removed = self._removed
+        while removed:
+            self.dispatcher.remove([removed.popleft()])
+
+        # Trades first, so the models have seen them before the newer books
+        trades = self.trades
+        while trades:
+            self.dispatcher.dispatch_trade(trades.popleft())
+
+        for symbol, data in self.books.take_all().items():
+            try:
+                results = self.dispatcher.dispatch(data)
+                if not results:
+                    continue
+                self.processed += 1
+                if self.on_result:
+                    self.on_result(symbol, data, results)
+                if symbol == self.selected_symbol:
+                    if self.history is not None:
+                        if symbol != self._history_symbol:
+                            # A new instrument starts its own chart
+                            self.history.clear()
+                            self._history_symbol = symbol
+                        self.history.append(data['timestamp'].timestamp(),
+                                            [results.get(name, 0.0) for name in HISTORY_FIELDS])
+                    self.results.put(symbol, format_snapshot(symbol, results, data))
+            except Exception as e:
+                self.logger.error(f"Error processing orderbook: {str(e)}")
+
+    def stop(self, timeout: Optional[float] = 1.0):
+        self._running.clear()
+        if self.is_alive():
+            self.join(timeout)
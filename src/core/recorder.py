@@ -0,0 +1,99 @@
+import asyncio
+import gzip
+import logging
+import struct
+import time
+from typing import Iterator, Optional, Tuple, Union
+
+# Record header: receive time in ns since the epoch, payload length in bytes
+_HEADER = struct.Struct('<qI')
+
+
+class FrameRecorder:
+    """
+    Appends raw WebSocket frames with their receive timestamps to a gzip capture file.
+
+    Every session opens a new gzip member in append mode, so a capture can
+    grow across runs and a crash loses at most the unflushed tail.
+    """
+
+    def __init__(self, path: str, flush_every: int = 1000):
+        self.path = path
+        self.flush_every = flush_every
+        self.frames_written = 0
+        self.logger = logging.getLogger(__name__)
+        self._file = gzip.open(path, 'ab')
+
+    def write(self, frame: Union[str, bytes], recv_ns: Optional[int] = None):
+        """Append one frame, stamped with the current time unless given"""
+        if recv_ns is None:
+            recv_ns = time.time_ns()
+        payload = frame.encode() if isinstance(frame, str) else frame
+        self._file.write(_HEADER.pack(recv_ns, len(payload)))
+        self._file.write(payload)
+
+        self.frames_written += 1
+        if self.frames_written % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+            self.logger.info(f"Recorded {self.frames_written} frames to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_frames(path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (recv_ns, frame) pairs from a capture file in recorded order"""
+    with gzip.open(path, 'rb') as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            recv_ns, length = _HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                # Truncated tail from an interrupted recording
+                return
+            yield recv_ns, payload.decode()
+
+
+class FrameReplayer:
+    """
+    Feeds a capture file through `WebSocketClient.process_message`.
+
+    speed=1.0 replays in real time, speed=N at N times real time and
+    speed=None (or 0) as fast as possible.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0):
+        self.path = path
+        self.speed = speed
+        self.frames_replayed = 0
+        self.logger = logging.getLogger(__name__)
+
+    async def run(self, client):
+        """Replay every frame into the client's processing pipeline"""
+        start_wall = None
+        start_recv = None
+
+        for recv_ns, frame in read_frames(self.path):
+            if self.speed:
+                if start_wall is None:
+                    start_wall = time.perf_counter()
+                    start_recv = recv_ns
+                target = (recv_ns - start_recv) / 1e9 / self.speed
+                delay = target - (time.perf_counter() - start_wall)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            await client.process_message(frame)
+            self.frames_replayed += 1
+
+        self.logger.info(f"Replayed {self.frames_replayed} frames from {self.path}")
@@ -0,0 +1,211 @@
+"""
+Chart data kept in preallocated buffers and reduced to the pixel width.
+
+Plots never receive more points than they have pixels: a time series is cut
+into one bucket per pixel column and drawn as the min/max envelope of each
+bucket (so spikes survive), and the depth curve is sampled on a price grid
+of the chart's width. The cost of a redraw therefore depends on the chart
+size, not on how much history or how many book levels are held.
+"""
+import threading
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def minmax_buckets(t: np.ndarray,
+                   lo: np.ndarray,
+                   hi: np.ndarray,
+                   t0: float,
+                   t1: float,
+                   width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Min of `lo` and max of `hi` per equal-time bucket of [t0, t1)
+
+    Args:
+        t: Ascending sample times
+        lo, hi: (n, k) values whose min and max are taken; the same array
+            for raw samples, block minima and maxima for pre-aggregated ones
+        width: Number of buckets
+
+    Returns:
+        (width, k) minima and maxima, NaN for buckets without samples
+    """
+    k = lo.shape[1]
+    out_lo = np.full((width, k), np.nan)
+    out_hi = np.full((width, k), np.nan)
+    edges = np.linspace(t0, t1, width + 1)
+    starts = np.searchsorted(t, edges[:-1], side='left')
+    ends = np.searchsorted(t, edges[1:], side='left')
+    if width:
+        # The last bucket is closed so samples at t1 are drawn
+        ends[-1] = np.searchsorted(t, t1, side='right')
+    filled = ends > starts
+    if filled.any():
+        index = starts[filled]
+        out_lo[filled] = np.minimum.reduceat(lo, index, axis=0)[:len(index)]
+        out_hi[filled] = np.maximum.reduceat(hi, index, axis=0)[:len(index)]
+        # reduceat runs each bucket to the next start; trim buckets ending early
+        short = np.flatnonzero(filled)[ends[filled] < np.append(index[1:], len(t))]
+        for b in short:
+            out_lo[b] = lo[starts[b]:ends[b]].min(axis=0)
+            out_hi[b] = hi[starts[b]:ends[b]].max(axis=0)
+    return out_lo, out_hi
+
+
+def _segments(count: int, size: int):
+    """Slices of a ring of `size` slots holding `count` items ever written, oldest first"""
+    if count <= size:
+        return [slice(0, count)]
+    head = count % size
+    return [s for s in (slice(head, size), slice(0, head)) if s.stop > s.start]
+
+
+class RingSeries:
+    """
+    Fixed-capacity time series of several fields, appended by one thread
+    and read by another.
+
+    Besides the raw ring, every `block` samples are folded into a block
+    min/max ring, so an envelope over hours of samples reads a few thousand
+    blocks instead of millions of points.
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int = 1 << 20, block: int = 64):
+        self.fields = tuple(fields)
+        k = len(self.fields)
+        self.block = block
+        # Whole blocks only, so a block never wraps around the ring
+        self.capacity = -(-capacity // block) * block
+        self._t = np.zeros(self.capacity)
+        self._y = np.zeros((self.capacity, k))
+        self._count = 0                 # Samples ever appended
+
+        n_blocks = self.capacity // block
+        self._block_t = np.zeros(n_blocks)          # Time of a block's first sample
+        self._block_lo = np.zeros((n_blocks, k))
+        self._block_hi = np.zeros((n_blocks, k))
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    @property
+    def appended(self) -> int:
+        """Samples appended since the last clear, to tell whether a redraw is due"""
+        return self._count
+
+    def clear(self):
+        with self._lock:
+            self._count = 0
+
+    def append(self, t: float, values: Sequence[float]):
+        with self._lock:
+            i = self._count % self.capacity
+            self._t[i] = t
+            self._y[i] = values
+            self._count += 1
+            if self._count % self.block == 0:
+                # Fold the block just completed
+                start = i + 1 - self.block
+                b = start // self.block
+                self._block_t[b] = self._t[start]
+                self._block_lo[b] = self._y[start:i + 1].min(axis=0)
+                self._block_hi[b] = self._y[start:i + 1].max(axis=0)
+
+    def time_range(self) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            n = len(self)
+            if not n:
+                return None
+            first = (self._count - n) % self.capacity
+            return float(self._t[first]), float(self._t[(self._count - 1) % self.capacity])
+
+    def latest(self) -> Optional[np.ndarray]:
+        with self._lock:
+            if not self._count:
+                return None
+            return self._y[(self._count - 1) % self.capacity].copy()
+
+    def envelope(self, width: int, t0: Optional[float] = None, t1: Optional[float] = None):
+        """
+        Per-pixel min/max of every field over [t0, t1], the whole history by default
+
+        Returns:
+            (t0, t1, lo (width, k), hi (width, k)) or None when empty
+        """
+        time_range = self.time_range()
+        if time_range is None or width <= 0:
+            return None
+        t0 = time_range[0] if t0 is None else t0
+        t1 = time_range[1] if t1 is None else t1
+        if t1 <= t0:
+            t1 = t0 + 1e-9
+
+        with self._lock:
+            count = self._count
+            raw = _segments(count, self.capacity)
+            in_view = sum(int(np.searchsorted(self._t[s], t1, side='right') -
+                              np.searchsorted(self._t[s], t0, side='left')) for s in raw)
+            if in_view <= self.block * width:
+                # Few enough samples to scan raw
+                sources = [(self._t[s], self._y[s], self._y[s]) for s in raw]
+            else:
+                # Completed blocks for the bulk, raw samples of the open block
+                sources = [(self._block_t[s], self._block_lo[s], self._block_hi[s])
+                           for s in _segments(count // self.block, len(self._block_t))]
+                open_block = count % self.block
+                if open_block:
+                    start = (count - open_block) % self.capacity
+                    tail = slice(start, start + open_block)
+                    sources.append((self._t[tail], self._y[tail], self._y[tail]))
+
+            lo = hi = None
+            for t, source_lo, source_hi in sources:
+                part_lo, part_hi = minmax_buckets(t, source_lo, source_hi, t0, t1, width)
+                lo = part_lo if lo is None else np.fmin(lo, part_lo)
+                hi = part_hi if hi is None else np.fmax(hi, part_hi)
+        return t0, t1, lo, hi
+
+
+def depth_curve(asks: np.ndarray,
+                bids: np.ndarray,
+                width: int,
+                span: Optional[float] = None) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Cumulative liquidity on a price grid of one point per pixel
+
+    Args:
+        asks, bids: Best-first (n, 2) [price, size] levels
+        width: Grid points across the chart
+        span: Price distance shown either side of the mid, the shallower
+            side's full depth if omitted
+
+    Returns:
+        (prices (width,), cumulative bid size, cumulative ask size); a side
+        is NaN where the grid lies on the other side of the mid
+    """
+    asks = np.asarray(asks, dtype=np.float64).reshape(-1, 2)
+    bids = np.asarray(bids, dtype=np.float64).reshape(-1, 2)
+    if not len(asks) or not len(bids) or width < 2:
+        return None
+    mid = (asks[0, 0] + bids[0, 0]) / 2
+    if span is None:
+        span = min(asks[-1, 0] - mid, mid - bids[-1, 0])
+        if span <= 0:
+            span = max(asks[-1, 0] - mid, mid - bids[-1, 0], 1e-9)
+    prices = np.linspace(mid - span, mid + span, width)
+
+    # Cumulative size is a step function of price, so sampling it at each
+    # pixel is exact at screen resolution
+    ask_cum = np.cumsum(asks[:, 1])
+    n = np.searchsorted(asks[:, 0], prices, side='right')
+    ask_curve = np.where(n > 0, ask_cum[np.maximum(n - 1, 0)], 0.0)
+
+    bid_cum = np.cumsum(bids[:, 1])
+    n = np.searchsorted(-bids[:, 0], -prices, side='right')
+    bid_curve = np.where(n > 0, bid_cum[np.maximum(n - 1, 0)], 0.0)
+
+    ask_curve = np.where(prices >= mid, ask_curve, np.nan)
+    bid_curve = np.where(prices <= mid, bid_curve, np.nan)
+    return prices, bid_curve, ask_curve
@@ -0,0 +1,315 @@
+"""
+Process-pool sharding of instruments across CPU cores.
+
+One ingest process runs the WebSocket client and publishes every book into
+a shared-memory table. Worker processes each own a subset of the
+instruments, pick up the newest book of each, run an OrderbookProcessor on
+it and send back compact result records. Workers only ever see the latest
+state of a book, so a slow shard skips stale versions instead of queueing
+them.
+"""
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import queue
+import time
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Header columns per instrument
+_VERSION, _N_ASKS, _N_BIDS, _SEQ_ID, _TS = range(5)
+_HEADER_COLS = 5
+
+# Fields of the compact result record sent back by workers
+RESULT_FIELDS = (
+    'symbol', 'seq_id', 'ts', 'slippage', 'fees', 'market_impact', 'net_cost',
+    'maker_proportion', 'taker_proportion', 'processing_latency'
+)
+
+
+def result_to_dict(record: Tuple) -> Dict:
+    """Expand a compact result record into the processor's result dict layout"""
+    return dict(zip(RESULT_FIELDS, record))
+
+
+class SharedBookTable:
+    """
+    Fixed-size table of top-of-book levels for many instruments in shared memory.
+
+    Each row is guarded by a sequence lock: the writer makes the version odd
+    while copying and even when done, and readers retry until they copy a
+    row whose version was even and unchanged across the copy.
+    """
+
+    def __init__(self, n_symbols: int, depth: int, name: Optional[str] = None):
+        """
+        Args:
+            n_symbols: Number of instrument rows
+            depth: Levels per side stored for each instrument
+            name: Name of an existing table to attach to; creates a new one when None
+        """
+        self.n_symbols = n_symbols
+        self.depth = depth
+        header_bytes = n_symbols * _HEADER_COLS * 8
+        levels_bytes = n_symbols * 2 * depth * 2 * 8
+
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=header_bytes + levels_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.header = np.ndarray((n_symbols, _HEADER_COLS), dtype=np.int64, buffer=self.shm.buf)
+        self.levels = np.ndarray((n_symbols, 2, depth, 2), dtype=np.float64,
+                                 buffer=self.shm.buf, offset=header_bytes)
+        if self.owner:
+            self.header[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def version(self, idx: int) -> int:
+        return int(self.header[idx, _VERSION])
+
+    def publish(self, idx: int, asks: np.ndarray, bids: np.ndarray, seq_id: int, ts: int):
+        """Write a book into its row; only one process may write a given row"""
+        n_asks = min(len(asks), self.depth)
+        n_bids = min(len(bids), self.depth)
+        row = self.header[idx]
+
+        row[_VERSION] += 1
+        self.levels[idx, 0, :n_asks] = asks[:n_asks]
+        self.levels[idx, 1, :n_bids] = bids[:n_bids]
+        row[_N_ASKS] = n_asks
+        row[_N_BIDS] = n_bids
+        row[_SEQ_ID] = seq_id
+        row[_TS] = ts
+        row[_VERSION] += 1
+
+    def read(self, idx: int, retries: int = 100) -> Optional[Tuple[int, np.ndarray, np.ndarray, int, int]]:
+        """
+        Copy a consistent book out of its row
+
+        Returns:
+            (version, asks, bids, seq_id, ts), or None if the row is empty or
+            kept changing for every retry
+        """
+        row = self.header[idx]
+        for _ in range(retries):
+            version = int(row[_VERSION])
+            if version == 0:
+                return None
+            if version % 2:
+                continue
+            n_asks = int(row[_N_ASKS])
+            n_bids = int(row[_N_BIDS])
+            asks = self.levels[idx, 0, :n_asks].copy()
+            bids = self.levels[idx, 1, :n_bids].copy()
+            seq_id = int(row[_SEQ_ID])
+            ts = int(row[_TS])
+            if int(row[_VERSION]) == version:
+                return version, asks, bids, seq_id, ts
+        return None
+
+    def close(self):
+        # Drop the views before releasing the mapping
+        self.header = None
+        self.levels = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _ingest_main(table_name: str, symbols: List[str], depth: int, url: str, stop_event):
+    """Ingest process: decode frames and publish books into the shared table"""
+    from .websocket_client import WebSocketClient
+
+    logger = logging.getLogger(__name__)
+    table = SharedBookTable(len(symbols), depth, name=table_name)
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    # Workers only see the shared book table, so trades are not subscribed
+    client = WebSocketClient(symbols, depth=depth, url=url, trades=False)
+
+    async def publish(data):
+        seq_id = data['seq_id'] if data['seq_id'] is not None else 0
+        ts = int(data['timestamp'].timestamp() * 1000)
+        table.publish(index[data['symbol']], data['asks'], data['bids'], seq_id, ts)
+
+    async def watch_stop():
+        while not stop_event.is_set():
+            await asyncio.sleep(0.1)
+        client.is_connected = False
+        await client.close()
+
+    async def run():
+        client.add_callback(publish)
+        stopper = asyncio.create_task(watch_stop())
+        await client.start()
+        stopper.cancel()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Ingest process error: {str(e)}")
+    finally:
+        table.close()
+
+
+def _worker_main(table_name: str,
+                 n_symbols: int,
+                 depth: int,
+                 shard: List[Tuple[int, str]],
+                 quantity: float,
+                 fee_tier: float,
+                 results,
+                 stop_event,
+                 poll_interval: float):
+    """Worker process: compute metrics for the newest book of each owned instrument"""
+    from .orderbook_processor import OrderbookProcessor
+
+    logger = logging.getLogger(__name__)
+    table = SharedBookTable(n_symbols, depth, name=table_name)
+    processors = {idx: OrderbookProcessor(quantity=quantity, fee_tier=fee_tier) for idx, _ in shard}
+    seen = {idx: 0 for idx, _ in shard}
+
+    try:
+        while not stop_event.is_set():
+            idle = True
+            for idx, symbol in shard:
+                if table.version(idx) == seen[idx]:
+                    continue
+                book = table.read(idx)
+                if book is None:
+                    continue
+                version, asks, bids, seq_id, ts = book
+                seen[idx] = version
+                idle = False
+
+                out = processors[idx].process_orderbook({
+                    'timestamp': datetime.fromtimestamp(ts / 1000),
+                    'symbol': symbol,
+                    # The processor caches ladders by book version; books5 and
+                    # bbo-tbt pushes carry no seqId and are all published as 0,
+                    # so key them by the row's own version instead
+                    'seq_id': version,
+                    'asks': asks,
+                    'bids': bids
+                })
+                if out:
+                    results.put((symbol, seq_id, ts, out['slippage'], out['fees'],
+                                 out['market_impact'], out['net_cost'], out['maker_proportion'],
+                                 out['taker_proportion'], out['processing_latency']))
+            if idle:
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Worker process error: {str(e)}")
+    finally:
+        table.close()
+
+
+class ShardedEngine:
+    """
+    Runs ingest and metric computation in separate processes.
+
+    Instruments are assigned round-robin to worker processes; results come
+    back on a queue as compact tuples (see RESULT_FIELDS).
+    """
+
+    def __init__(self,
+                 symbols: List[str],
+                 quantity: float,
+                 fee_tier: float,
+                 workers: Optional[int] = None,
+                 depth: int = 400,
+                 url: Optional[str] = None,
+                 poll_interval: float = 0.001):
+        """
+        Args:
+            symbols: Instruments to carry
+            quantity: Order quantity for the processors
+            fee_tier: Fee rate for the processors
+            workers: Worker processes, defaults to one per spare core
+            depth: Levels per side kept in shared memory
+            url: WebSocket endpoint, OKX public by default
+            poll_interval: Worker sleep when none of its books changed
+        """
+        from .websocket_client import OKX_PUBLIC_URL
+
+        self.symbols = list(symbols)
+        self.quantity = quantity
+        self.fee_tier = fee_tier
+        self.workers = max(1, min(workers or (os.cpu_count() or 2) - 1, len(self.symbols)))
+        self.depth = depth
+        self.url = url or OKX_PUBLIC_URL
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._ctx = mp.get_context('spawn')
+        self._processes: List = []
+        self._table: Optional[SharedBookTable] = None
+        self._stop_event = None
+        self.results = None
+
+    def shards(self) -> List[List[Tuple[int, str]]]:
+        """Round-robin assignment of (row, symbol) pairs to workers"""
+        indexed = list(enumerate(self.symbols))
+        return [indexed[i::self.workers] for i in range(self.workers)]
+
+    def start(self):
+        """Create the shared table and start the ingest and worker processes"""
+        self._table = SharedBookTable(len(self.symbols), self.depth)
+        self._stop_event = self._ctx.Event()
+        self.results = self._ctx.Queue()
+
+        for shard in self.shards():
+            self._processes.append(self._ctx.Process(
+                target=_worker_main,
+                args=(self._table.name, len(self.symbols), self.depth, shard, self.quantity,
+                      self.fee_tier, self.results, self._stop_event, self.poll_interval),
+                daemon=True
+            ))
+        self._processes.append(self._ctx.Process(
+            target=_ingest_main,
+            args=(self._table.name, self.symbols, self.depth, self.url, self._stop_event),
+            daemon=True
+        ))
+        for process in self._processes:
+            process.start()
+        self.logger.info(f"Started sharded engine: {len(self.symbols)} instruments, {self.workers} workers")
+
+    def poll(self, timeout: Optional[float] = None) -> Optional[Tuple]:
+        """Next result record, or None when none arrives within timeout"""
+        try:
+            return self.results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def iter_results(self, timeout: float = 0.1) -> Iterator[Tuple]:
+        """Yield result records until the engine is stopped"""
+        while not self._stop_event.is_set():
+            record = self.poll(timeout)
+            if record is not None:
+                yield record
+
+    def stop(self, timeout: float = 5.0):
+        """Signal all processes to stop, wait for them and release shared memory"""
+        if self._stop_event is None:
+            return
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes.clear()
+        if self._table:
+            self._table.close()
+            self._table = None
@@ -0,0 +1,240 @@
+"""
+Output sinks for headless runs.
+
+Every sink receives flat result records (see OUTPUT_FIELDS) and writes them
+somewhere: NDJSON lines to a stream, CSV or Parquet files, or every client
+of a Unix domain socket. Optional dependencies (pyarrow for Parquet) are
+only imported when such a sink is opened.
+"""
+import asyncio
+import csv
+import json
+import logging
+import math
+import os
+import sys
+from datetime import datetime
+from typing import Dict, IO, List, Optional, Set
+
+# Columns of a result record, in output order
+OUTPUT_FIELDS = (
+    'timestamp', 'symbol', 'seq_id', 'slippage', 'fees', 'market_impact', 'net_cost',
+    'maker_proportion', 'taker_proportion', 'processing_latency'
+)
+
+
+def result_record(data: Dict, results: Dict) -> Dict:
+    """
+    Flatten a book and the processor's results for it into plain Python values
+
+    Non-finite numbers (e.g. the infinite slippage of an order deeper than
+    the book) become None, so every sink writes them as a null rather than
+    the Infinity/NaN tokens JSON does not allow.
+    """
+    record = {}
+    for field in OUTPUT_FIELDS:
+        value = results[field] if field in results else data.get(field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif hasattr(value, 'item'):
+            # NumPy scalar
+            value = value.item()
+        if isinstance(value, float) and not math.isfinite(value):
+            value = None
+        record[field] = value
+    return record
+
+
+def _json_line(record: Dict) -> str:
+    """Strict JSON line; raises on non-finite numbers result_record did not map"""
+    return json.dumps(record, separators=(',', ':'), allow_nan=False) + '\n'
+
+
+class Sink:
+    """Base sink; open and close are no-ops unless a sink needs them"""
+
+    async def open(self):
+        pass
+
+    def write(self, record: Dict):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class NDJSONSink(Sink):
+    """One JSON object per line on a text stream, stdout by default"""
+
+    def __init__(self, stream: Optional[IO] = None, path: Optional[str] = None):
+        self.path = path
+        self.stream = stream
+        self._owned = False
+
+    async def open(self):
+        if self.stream is None:
+            if self.path:
+                self.stream = open(self.path, 'a', buffering=1)
+                self._owned = True
+            else:
+                self.stream = sys.stdout
+
+    def write(self, record: Dict):
+        self.stream.write(_json_line(record))
+
+    async def close(self):
+        if self.stream:
+            self.stream.flush()
+            if self._owned:
+                self.stream.close()
+            self.stream = None
+
+
+class CSVSink(Sink):
+    """CSV rows with a header, appended to an existing file of the same layout"""
+
+    def __init__(self, path: str, flush_every: int = 100):
+        self.path = path
+        self.flush_every = flush_every
+        self.rows_written = 0
+        self._file = None
+        self._writer = None
+
+    async def open(self):
+        write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=OUTPUT_FIELDS)
+        if write_header:
+            self._writer.writeheader()
+
+    def write(self, record: Dict):
+        self._writer.writerow(record)
+        self.rows_written += 1
+        if self.rows_written % self.flush_every == 0:
+            self._file.flush()
+
+    async def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class ParquetSink(Sink):
+    """
+    Parquet file written one row group per batch of records.
+
+    Needs pyarrow; a run that is killed loses at most the unwritten batch
+    but leaves a file without footer, so stop daemons with SIGTERM.
+    """
+
+    def __init__(self, path: str, batch_size: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self._rows: List[Dict] = []
+        self._writer = None
+        self._pa = None
+
+    async def open(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow, "
+                               "or write .csv/.ndjson instead") from None
+
+        self._pa = pa
+        schema = pa.schema([
+            ('timestamp', pa.string()),
+            ('symbol', pa.string()),
+            ('seq_id', pa.int64()),
+            *[(field, pa.float64()) for field in OUTPUT_FIELDS[3:]]
+        ])
+        self._writer = pq.ParquetWriter(self.path, schema)
+
+    def _flush(self):
+        if self._rows:
+            table = self._pa.Table.from_pylist(self._rows, schema=self._writer.schema)
+            self._writer.write_table(table)
+            self._rows = []
+
+    def write(self, record: Dict):
+        self._rows.append(record)
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+
+    async def close(self):
+        if self._writer:
+            self._flush()
+            self._writer.close()
+            self._writer = None
+
+
+class UnixSocketSink(Sink):
+    """
+    NDJSON stream to every client connected to a Unix domain socket.
+
+    Clients that stop reading are disconnected once their unsent backlog
+    exceeds max_buffer bytes, so a stuck reader never stalls the engine.
+    """
+
+    def __init__(self, path: str, max_buffer: int = 4 * 1024 * 1024):
+        self.path = path
+        self.max_buffer = max_buffer
+        self.clients: Set[asyncio.StreamWriter] = set()
+        self.logger = logging.getLogger(__name__)
+        self._server = None
+
+    async def _on_connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.clients.add(writer)
+        self.logger.info(f"Sink client connected, {len(self.clients)} total")
+
+    async def open(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._on_connect, path=self.path)
+        self.logger.info(f"Streaming results on unix socket {self.path}")
+
+    def write(self, record: Dict):
+        if not self.clients:
+            return
+        line = _json_line(record).encode()
+        for writer in list(self.clients):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > self.max_buffer:
+                self.logger.warning("Dropping sink client that stopped reading")
+                writer.close()
+                self.clients.discard(writer)
+                continue
+            writer.write(line)
+
+    async def close(self):
+        for writer in self.clients:
+            writer.close()
+        self.clients.clear()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def open_sink(target: str) -> Sink:
+    """
+    Sink for an output target
+
+    Args:
+        target: '-' for stdout, unix:PATH for a socket, or a file path whose
+            extension (.csv, .parquet, .ndjson/.jsonl) picks the format
+    """
+    if target == '-':
+        return NDJSONSink()
+    if target.startswith('unix:'):
+        return UnixSocketSink(target[len('unix:'):])
+    extension = os.path.splitext(target)[1].lower()
+    if extension == '.csv':
+        return CSVSink(target)
+    if extension in ('.parquet', '.pq'):
+        return ParquetSink(target)
+    if extension in ('.ndjson', '.jsonl', '.json'):
+        return NDJSONSink(path=target)
+    raise ValueError(f"Unknown output format for {target}")
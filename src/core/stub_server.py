@@ -0,0 +1,447 @@
+"""
+Local stand-in for the OKX v5 public WebSocket, for load and soak testing.
+
+Speaks the subset of the protocol the client uses: subscribe/unsubscribe
+acks, plain-text ping/pong, `books` and `books-l2-tbt` snapshots followed by
+incremental updates with valid sequence numbers and checksums, `books5` and
+`bbo-tbt` top-of-book snapshots on every update, and `trades` prints at the
+touch. Run with:
+
+    python -m core.stub_server --port 8765 --instruments 50 --rate 200
+
+Add --gap-rate and --drop-every to inject sequence gaps and disconnects.
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import logging
+import random
+import time
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+import websockets
+
+# Snapshot then incremental updates
+BOOK_CHANNELS = ('books', 'books-l2-tbt')
+# A snapshot of the top levels on every push
+TOP_CHANNELS = {'bbo-tbt': 1, 'books5': 5}
+TRADE_CHANNEL = 'trades'
+# Levels per side folded into the OKX book checksum
+CHECKSUM_DEPTH = 25
+
+
+class SyntheticBook:
+    """Random-walk L2 book that emits OKX-style snapshots and deltas"""
+
+    def __init__(self,
+                 symbol: str,
+                 mid: float = 30000.0,
+                 tick_size: float = 0.1,
+                 depth: int = 400,
+                 volatility: float = 0.5,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            symbol: Instrument id
+            mid: Starting mid price
+            tick_size: Price increment
+            depth: Levels kept per side
+            volatility: Annualised volatility of the mid random walk
+            seed: Seed for reproducible streams
+        """
+        self.symbol = symbol
+        self.tick_size = tick_size
+        self.depth = depth
+        self.volatility = volatility
+        self.decimals = max(0, len(f"{tick_size:.10f}".rstrip('0').split('.')[1]))
+        self.rng = random.Random(seed)
+
+        self.mid_ticks = int(round(mid / tick_size))
+        self._mid = float(self.mid_ticks)
+        self.asks: Dict[int, float] = {}
+        self.bids: Dict[int, float] = {}
+        for i in range(1, depth + 1):
+            self.asks[self.mid_ticks + i] = self._random_size()
+            self.bids[self.mid_ticks - i] = self._random_size()
+
+        self.seq_id = self.rng.randint(1, 10 ** 6)
+        self.trade_id = self.rng.randint(1, 10 ** 6)
+        self.last_ts = int(time.time() * 1000)
+
+    def _random_size(self) -> float:
+        return round(self.rng.expovariate(1.0) * 5 + 0.01, 2)
+
+    def _price(self, ticks: int) -> str:
+        return f"{ticks * self.tick_size:.{self.decimals}f}"
+
+    def _level(self, ticks: int, size: float) -> List[str]:
+        return [self._price(ticks), f"{size:g}", "0", str(self.rng.randint(1, 20)) if size else "0"]
+
+    def checksum(self) -> int:
+        """
+        OKX checksum of the current book, computed from its own levels
+
+        CRC32 of the top levels interleaved bid, ask as 'price:size' strings
+        formatted exactly as they are sent, as a signed 32-bit int.
+        """
+        asks = heapq.nsmallest(CHECKSUM_DEPTH, self.asks)
+        bids = heapq.nlargest(CHECKSUM_DEPTH, self.bids)
+        parts = []
+        for i in range(CHECKSUM_DEPTH):
+            if i < len(bids):
+                parts.append(f"{self._price(bids[i])}:{self.bids[bids[i]]:g}")
+            if i < len(asks):
+                parts.append(f"{self._price(asks[i])}:{self.asks[asks[i]]:g}")
+        crc = zlib.crc32(":".join(parts).encode())
+        return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+    def _levels(self, side: Dict[int, float], descending: bool) -> List[List[str]]:
+        return [self._level(t, side[t]) for t in sorted(side, reverse=descending)]
+
+    def _payload(self, asks: List[List[str]], bids: List[List[str]], prev_seq_id: int) -> Dict:
+        return {
+            'asks': asks,
+            'bids': bids,
+            'ts': str(self.last_ts),
+            'seqId': self.seq_id,
+            'prevSeqId': prev_seq_id
+        }
+
+    def snapshot(self) -> Dict:
+        """Full-book payload at the current sequence number"""
+        payload = self._payload(self._levels(self.asks, False), self._levels(self.bids, True), -1)
+        payload['checksum'] = self.checksum()
+        return payload
+
+    def top(self, levels: int) -> Dict:
+        """Snapshot of the best `levels` levels per side, as pushed by books5 and bbo-tbt"""
+        return {
+            'asks': [self._level(t, self.asks[t]) for t in heapq.nsmallest(levels, self.asks)],
+            'bids': [self._level(t, self.bids[t]) for t in heapq.nlargest(levels, self.bids)],
+            'ts': str(self.last_ts),
+            'seqId': self.seq_id
+        }
+
+    def trade(self) -> Dict:
+        """A print at the touch; the heavier best level attracts the aggressor"""
+        ask = min(self.asks)
+        bid = max(self.bids)
+        ask_size, bid_size = self.asks[ask], self.bids[bid]
+        buy = self.rng.random() < bid_size / (bid_size + ask_size)
+        self.trade_id += 1
+        return {
+            'instId': self.symbol,
+            'tradeId': str(self.trade_id),
+            'px': self._price(ask if buy else bid),
+            'sz': f"{round(self.rng.expovariate(1.0) + 0.01, 2):g}",
+            'side': 'buy' if buy else 'sell',
+            'ts': str(self.last_ts),
+            'count': '1'
+        }
+
+    def step(self, dt: float, changes: int = 4) -> Dict:
+        """Advance the book by dt seconds and return the update payload"""
+        # Move the mid with a Gaussian step scaled to the elapsed time
+        sigma_ticks = self.volatility * (dt / 31_536_000) ** 0.5 * self._mid
+        self._mid += self.rng.gauss(0.0, sigma_ticks)
+        self.mid_ticks = int(round(self._mid))
+
+        ask_changes: Dict[int, float] = {}
+        bid_changes: Dict[int, float] = {}
+
+        # Remove levels that now cross the mid
+        for t in [t for t in self.asks if t <= self.mid_ticks]:
+            del self.asks[t]
+            ask_changes[t] = 0.0
+        for t in [t for t in self.bids if t >= self.mid_ticks]:
+            del self.bids[t]
+            bid_changes[t] = 0.0
+
+        # Touch a few levels near the top of each side
+        for side, changed, sign in ((self.asks, ask_changes, 1), (self.bids, bid_changes, -1)):
+            for _ in range(changes):
+                t = self.mid_ticks + sign * (1 + int(self.rng.expovariate(1 / 20)) % self.depth)
+                size = 0.0 if (t in side and self.rng.random() < 0.2) else self._random_size()
+                if size:
+                    side[t] = size
+                else:
+                    side.pop(t, None)
+                changed[t] = size
+
+            # Refill to depth and trim the far end
+            edge = max(side, default=self.mid_ticks) if sign > 0 else min(side, default=self.mid_ticks)
+            while len(side) < self.depth:
+                edge += sign
+                if edge not in side:
+                    side[edge] = self._random_size()
+                    changed[edge] = side[edge]
+            if len(side) > self.depth:
+                for t in sorted(side, reverse=sign > 0)[:len(side) - self.depth]:
+                    del side[t]
+                    changed[t] = 0.0
+
+        prev_seq_id = self.seq_id
+        self.seq_id += 1
+        self.last_ts = int(time.time() * 1000)
+        payload = self._payload(
+            [self._level(t, s) for t, s in sorted(ask_changes.items())],
+            [self._level(t, s) for t, s in sorted(bid_changes.items(), reverse=True)],
+            prev_seq_id
+        )
+        payload['checksum'] = self.checksum()
+        return payload
+
+
+class StubOKXServer:
+    """Asyncio WebSocket server streaming synthetic books to subscribed clients"""
+
+    def __init__(self,
+                 host: str = 'localhost',
+                 port: int = 8765,
+                 depth: int = 400,
+                 update_rate: float = 100.0,
+                 instruments: Optional[List[str]] = None,
+                 volatility: float = 0.5,
+                 trade_probability: float = 0.2,
+                 gap_probability: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind, 0 for any free port
+            depth: Levels per side of each book
+            update_rate: Book updates per second per instrument
+            instruments: Instruments to pre-create; others are created on subscribe
+            volatility: Annualised volatility of each book's mid
+            trade_probability: Chance of a trade print after each book update
+            gap_probability: Chance of an update being dropped, leaving clients a sequence gap
+            seed: Seed for reproducible streams
+        """
+        self.host = host
+        self.port = port
+        self.depth = depth
+        self.update_rate = update_rate
+        self.volatility = volatility
+        self.trade_probability = trade_probability
+        self.gap_probability = gap_probability
+        self.rng = random.Random(seed)
+        self.logger = logging.getLogger(__name__)
+
+        self.books: Dict[str, SyntheticBook] = {}
+        # channel -> instId -> connections
+        self.subscribers: Dict[str, Dict[str, Set]] = {
+            channel: {} for channel in (*BOOK_CHANNELS, *TOP_CHANNELS, TRADE_CHANNEL)
+        }
+        self.messages_sent = 0
+        self.gaps_injected = 0
+        self._connections: Set = set()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._server = None
+
+        for symbol in instruments or []:
+            self._get_book(symbol)
+
+    def _get_book(self, symbol: str) -> SyntheticBook:
+        if symbol not in self.books:
+            self.books[symbol] = SyntheticBook(
+                symbol,
+                mid=self.rng.uniform(10, 50000),
+                depth=self.depth,
+                volatility=self.volatility,
+                seed=self.rng.randint(0, 2 ** 31)
+            )
+            for subscribers in self.subscribers.values():
+                subscribers[symbol] = set()
+        return self.books[symbol]
+
+    async def start(self):
+        """Start listening; returns once the server is bound"""
+        self._server = await websockets.serve(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        for symbol in self.books:
+            self._ensure_stream(symbol)
+        self.logger.info(f"Stub OKX server listening on ws://{self.host}:{self.port}")
+
+    async def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def _ensure_stream(self, symbol: str):
+        if symbol not in self._tasks:
+            self._tasks[symbol] = asyncio.create_task(self._stream(symbol))
+
+    async def _stream(self, symbol: str):
+        """Generate updates for one instrument at the configured rate"""
+        book = self.books[symbol]
+        interval = 1.0 / self.update_rate
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            # Catch up in a burst when the loop wakes late
+            due = max(1, int((now - last) / interval))
+            for _ in range(due):
+                payload = book.step(interval)
+                if self.gap_probability and self.rng.random() < self.gap_probability:
+                    self.gaps_injected += 1
+                else:
+                    for channel in BOOK_CHANNELS:
+                        self._broadcast(channel, symbol, payload, 'update')
+                for channel, levels in TOP_CHANNELS.items():
+                    if self.subscribers[channel][symbol]:
+                        self._broadcast(channel, symbol, book.top(levels))
+                if self.subscribers[TRADE_CHANNEL][symbol] and self.rng.random() < self.trade_probability:
+                    self._broadcast(TRADE_CHANNEL, symbol, book.trade())
+            last = now
+
+    async def drop_connections(self) -> int:
+        """Close every client connection, as a network fault would; returns how many"""
+        connections = list(self._connections)
+        await asyncio.gather(*(websocket.close(1011, 'dropped') for websocket in connections),
+                             return_exceptions=True)
+        return len(connections)
+
+    def _broadcast(self, channel: str, symbol: str, payload: Dict, action: Optional[str] = None):
+        subscribers = self.subscribers[channel][symbol]
+        if not subscribers:
+            return
+        message = {'arg': {'channel': channel, 'instId': symbol}, 'data': [payload]}
+        if action:
+            message['action'] = action
+        websockets.broadcast(subscribers, json.dumps(message))
+        self.messages_sent += len(subscribers)
+
+    async def _handle(self, websocket, path: str = None):
+        """Serve one client connection"""
+        subscribed: Set[Tuple[str, str]] = set()   # (channel, instId)
+        self._connections.add(websocket)
+        try:
+            async for message in websocket:
+                if message == 'ping':
+                    await websocket.send('pong')
+                    continue
+                try:
+                    request = json.loads(message)
+                except json.JSONDecodeError:
+                    await websocket.send(json.dumps({
+                        'event': 'error', 'code': '60012', 'msg': f"Invalid request: {message}"
+                    }))
+                    continue
+
+                op = request.get('op')
+                if op in ('subscribe', 'unsubscribe'):
+                    for arg in request.get('args', []):
+                        await self._handle_subscription(websocket, op, arg, subscribed)
+                else:
+                    await websocket.send(json.dumps({
+                        'event': 'error', 'code': '60012', 'msg': f"Invalid request: {message}"
+                    }))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._connections.discard(websocket)
+            for channel, symbol in subscribed:
+                self.subscribers[channel][symbol].discard(websocket)
+
+    async def _handle_subscription(self, websocket, op: str, arg: Dict, subscribed: Set[Tuple[str, str]]):
+        channel = arg.get('channel')
+        symbol = arg.get('instId')
+        if channel not in self.subscribers or not symbol:
+            await websocket.send(json.dumps({
+                'event': 'error', 'code': '60018', 'msg': f"Wrong URL or channel:{channel}"
+            }))
+            return
+
+        await websocket.send(json.dumps({'event': op, 'arg': arg}))
+        if op == 'unsubscribe':
+            self.subscribers[channel].get(symbol, set()).discard(websocket)
+            subscribed.discard((channel, symbol))
+            return
+
+        book = self._get_book(symbol)
+        self._ensure_stream(symbol)
+        # Take the snapshot, register the subscriber and queue the snapshot
+        # without yielding, so the next broadcast update follows it directly
+        message = None
+        if channel in BOOK_CHANNELS:
+            message = {'arg': {'channel': channel, 'instId': symbol}, 'action': 'snapshot',
+                       'data': [book.snapshot()]}
+        elif channel in TOP_CHANNELS:
+            message = {'arg': {'channel': channel, 'instId': symbol},
+                       'data': [book.top(TOP_CHANNELS[channel])]}
+        self.subscribers[channel][symbol].add(websocket)
+        subscribed.add((channel, symbol))
+        if message:
+            websockets.broadcast((websocket,), json.dumps(message))
+
+
+async def _serve(args):
+    instruments = [f"SIM{i:03d}-USDT-SWAP" for i in range(args.instruments)]
+    server = StubOKXServer(
+        host=args.host,
+        port=args.port,
+        depth=args.depth,
+        update_rate=args.rate,
+        instruments=instruments,
+        volatility=args.volatility,
+        gap_probability=args.gap_rate,
+        seed=args.seed
+    )
+    await server.start()
+
+    async def drop_periodically():
+        while True:
+            await asyncio.sleep(args.drop_every)
+            dropped = await server.drop_connections()
+            server.logger.info(f"Dropped {dropped} client connections")
+
+    dropper = asyncio.create_task(drop_periodically()) if args.drop_every else None
+    try:
+        while True:
+            sent = server.messages_sent
+            await asyncio.sleep(5)
+            server.logger.info(f"{(server.messages_sent - sent) / 5:.0f} msg/s to clients")
+    finally:
+        if dropper:
+            dropper.cancel()
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OKX-compatible WebSocket stand-in")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--depth', type=int, default=400, help="Levels per side")
+    parser.add_argument('--rate', type=float, default=100.0, help="Updates per second per instrument")
+    parser.add_argument('--instruments', type=int, default=1, help="Synthetic instruments to stream")
+    parser.add_argument('--volatility', type=float, default=0.5, help="Annualised mid volatility")
+    parser.add_argument('--gap-rate', type=float, default=0.0,
+                        help="Fraction of updates dropped to exercise client resyncs")
+    parser.add_argument('--drop-every', type=float, default=None,
+                        help="Seconds between forced disconnects of every client")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
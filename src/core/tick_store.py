@@ -0,0 +1,371 @@
+"""
+Columnar, memory-mapped store of processed metrics and top-of-book snapshots.
+
+Each symbol gets one directory per UTC day, holding one fixed-width file per
+column:
+
+    ROOT/BTC-USDT/2025-05-04/ts.i8         exchange time, epoch ms
+                             seq_id.i8
+                             slippage.f8 ...            one per METRIC_COLUMNS
+                             ask_px.f8 ... bid_sz.f8    (rows, top_n) levels
+                             meta.json                  rows, top_n, sorted
+
+Files are preallocated and doubled when full, so appending a row is a few
+stores into mapped pages. The time column is the index: while rows arrive in
+time order (the normal case) a range query is two binary searches, touching
+only the pages it returns. pandas is only needed for DataFrame and Parquet
+export.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+METRIC_COLUMNS = (
+    'slippage', 'fees', 'market_impact', 'net_cost',
+    'maker_proportion', 'taker_proportion', 'processing_latency'
+)
+BOOK_COLUMNS = ('ask_px', 'ask_sz', 'bid_px', 'bid_sz')
+
+_MS_PER_DAY = 86_400_000
+_META = 'meta.json'
+
+TimeLike = Union[int, float, datetime, None]
+
+
+def to_ms(value: TimeLike) -> Optional[int]:
+    """Epoch milliseconds from a datetime or an epoch-ms number"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(round(value.timestamp() * 1000))
+    return int(value)
+
+
+def day_of(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, timezone.utc).strftime('%Y-%m-%d')
+
+
+def column_specs(top_n: int) -> List[Tuple[str, type, Tuple[int, ...]]]:
+    """(name, dtype, per-row shape) of every stored column"""
+    specs = [('ts', np.int64, ()), ('seq_id', np.int64, ())]
+    specs += [(name, np.float64, ()) for name in METRIC_COLUMNS]
+    specs += [(name, np.float64, (top_n,)) for name in BOOK_COLUMNS]
+    return specs
+
+
+class DayPartition:
+    """Memory-mapped columns of one symbol for one UTC day"""
+
+    def __init__(self, path: str, top_n: int = 10, capacity: int = 65536, readonly: bool = False):
+        """
+        Args:
+            path: Partition directory, created when missing (unless readonly)
+            top_n: Book levels per side kept with each row
+            capacity: Rows preallocated for a new partition
+            readonly: Map the existing rows read-only
+        """
+        self.path = path
+        self.readonly = readonly
+        meta_path = os.path.join(path, _META)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.rows = meta['rows']
+            self.top_n = meta['top_n']
+            self.sorted = meta['sorted']
+            self.last_ts = meta.get('last_ts')
+        elif readonly:
+            raise FileNotFoundError(f"No tick store partition at {path}")
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.rows = 0
+            self.top_n = top_n
+            self.sorted = True
+            self.last_ts = None
+
+        self.capacity = self.rows if readonly else max(capacity, self.rows)
+        self.columns: Dict[str, np.ndarray] = {}
+        self._maps: List[np.memmap] = []
+        self._map()
+        if not readonly and not os.path.exists(meta_path):
+            self.flush()
+
+    def _map(self):
+        suffix = {np.int64: 'i8', np.float64: 'f8'}
+        for name, dtype, tail in column_specs(self.top_n):
+            file_path = os.path.join(self.path, f"{name}.{suffix[dtype]}")
+            shape = (self.capacity,) + tail
+            if self.readonly:
+                if not self.capacity:
+                    self.columns[name] = np.empty(shape, dtype=dtype)
+                    continue
+                self.columns[name] = np.memmap(file_path, dtype=dtype, mode='r', shape=shape).view(np.ndarray)
+                continue
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            # Extend (or create) the file, then map it writable
+            with open(file_path, 'ab') as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            mapped = np.memmap(file_path, dtype=dtype, mode='r+', shape=shape)
+            self._maps.append(mapped)
+            # Plain ndarray views skip memmap's per-index overhead on the append path
+            self.columns[name] = mapped.view(np.ndarray)
+
+    def _grow(self):
+        self.flush(sync=True)
+        self.columns.clear()
+        self._maps.clear()
+        self.capacity *= 2
+        self._map()
+
+    def append(self,
+               ts_ms: int,
+               seq_id: Optional[int],
+               metrics: Sequence[float],
+               asks: np.ndarray,
+               bids: np.ndarray):
+        """Write one row; levels beyond the book's depth are stored as NaN"""
+        if self.rows == self.capacity:
+            self._grow()
+        i = self.rows
+        columns = self.columns
+        columns['ts'][i] = ts_ms
+        columns['seq_id'][i] = -1 if seq_id is None else seq_id
+        for name, value in zip(METRIC_COLUMNS, metrics):
+            columns[name][i] = value
+
+        n = self.top_n
+        for side, levels in (('ask', asks), ('bid', bids)):
+            levels = np.asarray(levels, dtype=np.float64).reshape(-1, 2)[:n]
+            k = len(levels)
+            px, sz = columns[f'{side}_px'], columns[f'{side}_sz']
+            px[i, :k] = levels[:, 0]
+            sz[i, :k] = levels[:, 1]
+            if k < n:
+                px[i, k:] = np.nan
+                sz[i, k:] = np.nan
+
+        if self.last_ts is not None and ts_ms < self.last_ts:
+            self.sorted = False
+        self.last_ts = ts_ms if self.last_ts is None else max(self.last_ts, ts_ms)
+        self.rows += 1
+
+    def select(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Union[slice, np.ndarray]:
+        """Rows with start_ms <= ts < end_ms, as a slice while the index is sorted"""
+        ts = self.columns['ts'][:self.rows]
+        if self.sorted:
+            lo = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side='left'))
+            hi = self.rows if end_ms is None else int(np.searchsorted(ts, end_ms, side='left'))
+            return slice(lo, max(lo, hi))
+        mask = np.ones(self.rows, dtype=bool)
+        if start_ms is not None:
+            mask &= ts >= start_ms
+        if end_ms is not None:
+            mask &= ts < end_ms
+        return np.flatnonzero(mask)
+
+    def flush(self, sync: bool = False):
+        """
+        Publish the row count to readers
+
+        Mapped pages are shared through the page cache, so readers see the
+        rows without an msync; `sync` also forces them to disk.
+        """
+        if self.readonly:
+            return
+        if sync:
+            for mapped in self._maps:
+                mapped.flush()
+        meta = {'rows': self.rows, 'top_n': self.top_n, 'sorted': self.sorted, 'last_ts': self.last_ts}
+        tmp_path = os.path.join(self.path, _META + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, _META))
+
+    def close(self):
+        self.flush(sync=True)
+        self.columns.clear()
+        self._maps.clear()
+
+
+class TickStore:
+    """
+    Per-symbol, day-partitioned tick store of process_orderbook results.
+
+    One writer appends; any number of read-only stores may query the same
+    root, seeing rows up to the writer's last flush.
+    """
+
+    def __init__(self,
+                 root: str,
+                 top_n: int = 10,
+                 capacity: int = 65536,
+                 flush_every: int = 1000,
+                 readonly: bool = False):
+        """
+        Args:
+            root: Store directory
+            top_n: Book levels per side kept with each row
+            capacity: Rows preallocated per new day partition
+            flush_every: Appends between flushes of the row count to disk
+            readonly: Open for queries only
+        """
+        self.root = root
+        self.top_n = top_n
+        self.capacity = capacity
+        self.flush_every = flush_every
+        self.readonly = readonly
+        self.logger = logging.getLogger(__name__)
+        self._open: Dict[Tuple[str, str], DayPartition] = {}
+        self._current: Dict[str, Tuple[int, DayPartition]] = {}  # symbol -> (day number, partition)
+        self._pending = 0
+        if not readonly:
+            os.makedirs(root, exist_ok=True)
+
+    def _partition(self, symbol: str, day: str) -> DayPartition:
+        key = (symbol, day)
+        partition = self._open.get(key)
+        if partition is None:
+            partition = DayPartition(os.path.join(self.root, symbol, day), self.top_n,
+                                     self.capacity, readonly=self.readonly)
+            self._open[key] = partition
+        return partition
+
+    def append(self, symbol: str, data: Dict, results: Dict):
+        """
+        Store one processed book
+
+        Args:
+            symbol: Instrument id
+            data: Book dict handed to the processor (timestamp, seq_id, asks, bids)
+            results: The processor's results for it
+        """
+        try:
+            ts_ms = to_ms(data['timestamp'])
+            day_number = ts_ms // _MS_PER_DAY
+            current = self._current.get(symbol)
+            if current is None or current[0] != day_number:
+                if current is not None:
+                    # The previous day is complete
+                    current[1].close()
+                    self._open.pop((symbol, os.path.basename(current[1].path)), None)
+                current = (day_number, self._partition(symbol, day_of(ts_ms)))
+                self._current[symbol] = current
+
+            current[1].append(
+                ts_ms,
+                data.get('seq_id'),
+                [results[name] for name in METRIC_COLUMNS],
+                data['asks'],
+                data['bids']
+            )
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self.flush()
+        except Exception as e:
+            self.logger.error(f"Error appending to tick store: {str(e)}")
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def days(self, symbol: str) -> List[str]:
+        path = os.path.join(self.root, symbol)
+        if not os.path.isdir(path):
+            return []
+        return sorted(day for day in os.listdir(path) if os.path.exists(os.path.join(path, day, _META)))
+
+    def read(self,
+             symbol: str,
+             start: TimeLike = None,
+             end: TimeLike = None,
+             columns: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Rows of one symbol with start <= ts < end
+
+        Args:
+            symbol: Instrument id
+            start, end: datetimes or epoch ms; open-ended when None
+            columns: Columns to return, all when None
+
+        Returns:
+            Dict of column name to array; book columns are (rows, top_n)
+        """
+        start_ms, end_ms = to_ms(start), to_ms(end)
+        first_day = day_of(start_ms) if start_ms is not None else None
+        last_day = day_of(end_ms - 1) if end_ms is not None else None
+
+        parts: Dict[str, List[np.ndarray]] = {}
+        for day in self.days(symbol):
+            # Day names sort like dates, so whole partitions are skipped unopened
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            partition = self._open.get((symbol, day)) or DayPartition(
+                os.path.join(self.root, symbol, day), readonly=True
+            )
+            rows = partition.select(start_ms, end_ms)
+            names = columns or partition.columns.keys()
+            for name in names:
+                parts.setdefault(name, []).append(np.array(partition.columns[name][:partition.rows][rows]))
+
+        if not parts:
+            return {name: np.empty((0,) + tail, dtype=dtype)
+                    for name, dtype, tail in column_specs(self.top_n) if columns is None or name in columns}
+        return {name: np.concatenate(arrays) for name, arrays in parts.items()}
+
+    def to_pandas(self, symbol: str, start: TimeLike = None, end: TimeLike = None):
+        """Metrics and levels as a DataFrame indexed by UTC time; level i of a side is a column"""
+        import pandas as pd
+
+        data = self.read(symbol, start, end)
+        frame = {'seq_id': data['seq_id']}
+        for name in METRIC_COLUMNS:
+            frame[name] = data[name]
+        for name in BOOK_COLUMNS:
+            for level in range(data[name].shape[1]):
+                frame[f'{name}_{level}'] = data[name][:, level]
+        index = pd.to_datetime(data['ts'], unit='ms', utc=True)
+        return pd.DataFrame(frame, index=pd.Index(index, name='timestamp'))
+
+    def export_parquet(self, symbol: str, path: str, start: TimeLike = None, end: TimeLike = None) -> int:
+        """Write a range to a Parquet file via pandas; returns the row count"""
+        frame = self.to_pandas(symbol, start, end)
+        frame.to_parquet(path)
+        return len(frame)
+
+    def flush(self):
+        for partition in self._open.values():
+            partition.flush()
+        self._pending = 0
+
+    def close(self):
+        for partition in self._open.values():
+            partition.close()
+        self._open.clear()
+        self._current.clear()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export a tick store range to Parquet")
+    parser.add_argument('root', help="Tick store directory")
+    parser.add_argument('symbol')
+    parser.add_argument('output', help="Parquet file to write")
+    parser.add_argument('--start', default=None, help="ISO-8601 start time, inclusive")
+    parser.add_argument('--end', default=None, help="ISO-8601 end time, exclusive")
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.start) if args.start else None
+    end = datetime.fromisoformat(args.end) if args.end else None
+    rows = TickStore(args.root, readonly=True).export_parquet(args.symbol, args.output, start, end)
+    print(f"Wrote {rows} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
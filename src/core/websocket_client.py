@@ -1,20 +1,71 @@
 import asyncio
 import json
 import logging
+import random
 import websockets
-from typing import Dict, List, Callable, Optional
+from typing import Dict, List, Callable, Iterable, Optional, Tuple, Union
 from datetime import datetime
+from .orderbook import OrderBook, BookOutOfSyncError
+from .decoder import loads, DecodeError
+from .recorder import FrameRecorder, FrameReplayer
+from .latency import LatencyHistogram, now_ns, exchange_ns
+from .channel_selector import ChannelSelector, DEFAULT_CHANNEL
+
+OKX_PUBLIC_URL = "wss://ws.okx.com:8443/ws/v5/public"
 
 class WebSocketClient:
-    def __init__(self, symbol: str):
-        # OKX WebSocket endpoint
-        self.url = "wss://ws.okx.com:8443/ws/v5/public"
-        self.symbol = symbol
+    def __init__(self, 
+                 symbols: Union[str, Iterable[str]], 
+                 depth: Optional[int] = None, 
+                 record_path: Optional[str] = None,
+                 url: str = OKX_PUBLIC_URL,
+                 trades: bool = True,
+                 reconnect: bool = True,
+                 initial_backoff: float = 0.5,
+                 max_backoff: float = 30.0,
+                 resync_timeout: float = 5.0,
+                 selector: Optional[ChannelSelector] = None):
+        # OKX WebSocket endpoint (or a local stand-in such as core.stub_server)
+        self.url = url
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        self.depth = depth  # Levels per side handed to callbacks, None for the full book
+        # One book per subscribed instrument, messages are routed by arg.instId
+        self.books: Dict[str, OrderBook] = {symbol: OrderBook(symbol) for symbol in symbols}
+        # Book channel each instrument is read from, and switches waiting for their first snapshot
+        self.selector = selector
+        self.channels: Dict[str, str] = {symbol: DEFAULT_CHANNEL for symbol in symbols}
+        self._pending: Dict[str, Tuple[str, int]] = {}   # symbol -> (channel, perf_counter_ns)
         self.websocket: Optional[websockets.WebSocketClientProtocol] = None
         self.callbacks: List[Callable] = []
+        # Public trades (taker side, price, size) label the maker/taker model
+        self.trades = trades
+        self.trade_callbacks: List[Callable] = []
         self.logger = logging.getLogger(__name__)
         self.is_connected = False
         self.heartbeat_task = None
+        
+        # Reconnect with exponential backoff (seconds) until close() is called
+        self.reconnect = reconnect
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._closing = False
+        self._closed: Optional[asyncio.Event] = None    # Wakes a pending backoff on close()
+        # symbol -> perf_counter_ns when its book dropped out of sync, until the next snapshot
+        self.resync_timeout = resync_timeout
+        self._resyncing: Dict[str, int] = {}
+        
+        # Counters read by the metrics endpoint (core.metrics)
+        self.message_counts: Dict[str, int] = {}
+        self.sync_failures: Dict[str, int] = {}
+        self.book_gaps: Dict[str, int] = {}
+        self.reconnects = 0
+        self.channel_switches = 0
+        self.decode_latency = LatencyHistogram()
+        self.resync_latency = LatencyHistogram()
+        
+        # Optional capture of raw frames for offline replay
+        self.recorder = FrameRecorder(record_path) if record_path else None
 
     async def connect(self):
         """Establish WebSocket connection"""
@@ -26,30 +77,122 @@ class WebSocketClient:
             self.logger.error(f"Failed to connect to WebSocket: {str(e)}")
             raise
 
-    async def subscribe(self):
-        """Subscribe to the orderbook channel"""
+    @property
+    def symbols(self) -> List[str]:
+        """Instruments currently carried by this connection"""
+        return list(self.books)
+
+    async def _send_op(self, op: str, symbols: Iterable[str]):
+        """Send one subscribe/unsubscribe request covering several instruments"""
         if not self.websocket:
             raise ConnectionError("WebSocket not connected")
         
+        args = []
+        for symbol in symbols:
+            args.append({"channel": self.channels.get(symbol, DEFAULT_CHANNEL), "instId": symbol})
+            if self.trades:
+                args.append({"channel": "trades", "instId": symbol})
         # OKX subscription message format
-        subscribe_message = {
-            "op": "subscribe",
-            "args": [{
-                "channel": "books",
-                "instId": self.symbol
-            }]
-        }
+        await self.websocket.send(json.dumps({"op": op, "args": args}))
+
+    async def _send_channel(self, op: str, symbol: str, channel: str):
+        """Subscribe or unsubscribe a single channel of one instrument"""
+        message = {"op": op, "args": [{"channel": channel, "instId": symbol}]}
+        await self.websocket.send(json.dumps(message))
+
+    async def subscribe(self, symbols: Optional[Iterable[str]] = None):
+        """Subscribe to the orderbook (and trades) channels, for all instruments unless given"""
+        symbols = list(self.books) if symbols is None else list(symbols)
+        if not symbols:
+            return
+        await self._send_op("subscribe", symbols)
+        self.logger.info(f"Subscribed to {', '.join(symbols)} orderbook")
+
+    async def unsubscribe(self, symbols: Iterable[str]):
+        """Unsubscribe instruments from the orderbook channel"""
+        symbols = list(symbols)
+        if not symbols:
+            return
+        await self._send_op("unsubscribe", symbols)
+        self.logger.info(f"Unsubscribed from {', '.join(symbols)} orderbook")
+
+    async def resubscribe(self, symbol: str):
+        """Re-subscribe one instrument's book to receive a fresh snapshot"""
+        self.books[symbol].reset()
+        self._resyncing[symbol] = now_ns()
+        channel = self.channels[symbol]
+        for op in ("unsubscribe", "subscribe"):
+            await self._send_channel(op, symbol, channel)
+        self.logger.info(f"Resubscribed {symbol} {channel} orderbook")
+
+    async def switch_channel(self, symbol: str, channel: str):
+        """
+        Move an instrument to another book channel without a gap
         
-        await self.websocket.send(json.dumps(subscribe_message))
-        self.logger.info(f"Subscribed to {self.symbol} orderbook")
+        The new channel is subscribed alongside the old one, which keeps
+        feeding the book until the new channel's first snapshot arrives;
+        only then is the old channel unsubscribed.
+        """
+        if channel == self.channels.get(symbol) or symbol in self._pending:
+            return
+        self._pending[symbol] = (channel, now_ns())
+        await self._send_channel("subscribe", symbol, channel)
+        self.logger.info(f"Switching {symbol} from {self.channels[symbol]} to {channel}")
+
+    async def _complete_switch(self, symbol: str, channel: str):
+        """Make the pending channel of an instrument active on its first snapshot"""
+        previous = self.channels[symbol]
+        del self._pending[symbol]
+        self.channels[symbol] = channel
+        self.books[symbol].reset()
+        self.channel_switches += 1
+        if self.selector:
+            self.selector.switched(symbol)
+        if self.websocket:
+            await self._send_channel("unsubscribe", symbol, previous)
+        self.logger.info(f"Switched {symbol} from {previous} to {channel}")
+
+    async def _abandon_switch(self, symbol: str):
+        """Give up a switch whose channel never delivered a snapshot"""
+        channel, _ = self._pending.pop(symbol)
+        if self.selector:
+            self.selector.switched(symbol)
+        if self.websocket:
+            await self._send_channel("unsubscribe", symbol, channel)
+        self.logger.warning(f"No snapshot on {channel} for {symbol}, staying on {self.channels[symbol]}")
+
+    async def add_symbols(self, symbols: Iterable[str]):
+        """Start carrying more instruments, subscribing them if connected"""
+        added = [symbol for symbol in symbols if symbol not in self.books]
+        for symbol in added:
+            self.books[symbol] = OrderBook(symbol)
+            self.channels[symbol] = DEFAULT_CHANNEL
+        if self.websocket and self.is_connected:
+            await self.subscribe(added)
+
+    async def remove_symbols(self, symbols: Iterable[str]):
+        """Stop carrying instruments and drop their books"""
+        removed = [symbol for symbol in symbols if symbol in self.books]
+        pending = [(symbol, self._pending.pop(symbol)[0]) for symbol in removed if symbol in self._pending]
+        for symbol in removed:
+            del self.books[symbol]
+            self._resyncing.pop(symbol, None)
+            if self.selector:
+                self.selector.reset(symbol)
+        if self.websocket and self.is_connected:
+            await self.unsubscribe(removed)
+            for symbol, channel in pending:
+                await self._send_channel("unsubscribe", symbol, channel)
+        for symbol in removed:
+            del self.channels[symbol]
 
     async def send_heartbeat(self):
         """Send heartbeat message every 20 seconds"""
         while self.is_connected:
             try:
                 if self.websocket:
-                    heartbeat_message = {"op": "ping"}
-                    await self.websocket.send(json.dumps(heartbeat_message))
+                    # OKX keepalive is the plain text frame 'ping', answered by 'pong'
+                    await self.websocket.send("ping")
                     self.logger.debug("Heartbeat sent")
                 await asyncio.sleep(20)  # OKX requires heartbeat every 20 seconds
             except Exception as e:
@@ -60,78 +203,245 @@ class WebSocketClient:
         """Add a callback function to process incoming messages"""
         self.callbacks.append(callback)
 
-    async def process_message(self, message: str):
-        """Process incoming WebSocket message"""
+    def add_trade_callback(self, callback: Callable):
+        """Add a callback receiving each public trade as a dict"""
+        self.trade_callbacks.append(callback)
+
+    async def _process_trades(self, symbol: str, trades: List[Dict]):
+        """Hand the trades of one `trades` frame to the trade callbacks"""
+        for trade in trades:
+            processed_trade = {
+                'symbol': symbol,
+                'price': float(trade['px']),
+                'size': float(trade['sz']),
+                'side': trade['side'],  # Taker side
+                'ts': int(trade['ts'])
+            }
+            for callback in self.trade_callbacks:
+                await callback(processed_trade)
+
+    async def process_message(self, message: str, received_ns: Optional[int] = None):
+        """
+        Process incoming WebSocket message
+        
+        Args:
+            message: Raw frame
+            received_ns: perf_counter_ns stamp of when the frame arrived, now if omitted
+        """
+        if received_ns is None:
+            received_ns = now_ns()
         try:
-            data = json.loads(message)
-            
             # Handle heartbeat response
-            if data.get('op') == 'pong':
+            if message == 'pong':
                 self.logger.debug("Received pong response")
                 return
                 
+            data = loads(message)
+            
             # Handle OKX's message format
             if 'data' in data:
+                arg = data.get('arg', {})
+                symbol = arg.get('instId')
+                book = self.books.get(symbol)
+                if book is None:
+                    # Late message for a removed instrument
+                    return
+                channel = arg.get('channel', DEFAULT_CHANNEL)
+                if channel == 'trades':
+                    await self._process_trades(symbol, data['data'])
+                    return
+                # books sends one snapshot followed by incremental updates;
+                # books5 and bbo-tbt frames carry no action and are all snapshots
+                action = data.get('action', 'snapshot')
+                if channel != self.channels[symbol]:
+                    pending = self._pending.get(symbol)
+                    if pending is None or channel != pending[0] or action != 'snapshot':
+                        # Late frames of a channel being left
+                        return
+                    await self._complete_switch(symbol, channel)
                 orderbook_data = data['data'][0]
-                timestamp = datetime.fromtimestamp(float(orderbook_data['ts']) / 1000)
+                self.message_counts[symbol] = self.message_counts.get(symbol, 0) + 1
+                
+                if symbol in self._resyncing and action != 'snapshot':
+                    # Updates still in flight from before the resubscribe
+                    await self._check_resync(symbol)
+                    return
+                try:
+                    book.apply(action, orderbook_data)
+                except BookOutOfSyncError as e:
+                    self.sync_failures[e.reason] = self.sync_failures.get(e.reason, 0) + 1
+                    self.book_gaps[symbol] = self.book_gaps.get(symbol, 0) + 1
+                    self.logger.warning(f"Orderbook out of sync, resubscribing: {str(e)}")
+                    # A replayed capture has no socket; wait for its next snapshot
+                    if self.websocket:
+                        await self.resubscribe(symbol)
+                    else:
+                        self._resyncing[symbol] = now_ns()
+                    return
                 
-                # Convert OKX's orderbook format to our internal format
-                # OKX sends asks and bids as arrays of [price, size, num_orders, ...]
-                asks = [[float(price), float(size)] for price, size, *_ in orderbook_data['asks']]
-                bids = [[float(price), float(size)] for price, size, *_ in orderbook_data['bids']]
+                started = self._resyncing.pop(symbol, None)
+                if started is not None:
+                    elapsed = now_ns() - started
+                    self.resync_latency.record(elapsed)
+                    self.logger.info(f"Resynced {symbol} orderbook in {elapsed / 1e6:.1f} ms")
                 
+                timestamp = datetime.fromtimestamp(book.ts / 1000)
+                decoded_ns = now_ns()
+                self.decode_latency.record(decoded_ns - received_ns)
+                trace = {
+                    'exchange': exchange_ns(book.ts),
+                    'received': received_ns,
+                    'decoded': decoded_ns
+                }
                 processed_data = {
                     'timestamp': timestamp,
                     'exchange': 'OKX',
-                    'symbol': self.symbol,
-                    'asks': asks,
-                    'bids': bids
+                    'symbol': symbol,
+                    'seq_id': book.seq_id,
+                    'asks': book.ask_array(self.depth),
+                    'bids': book.bid_array(self.depth),
+                    'channel': channel,
+                    'trace': trace
                 }
                 
                 # Notify all callbacks
                 for callback in self.callbacks:
                     await callback(processed_data)
                 
-        except json.JSONDecodeError as e:
+                if symbol in self._pending:
+                    if decoded_ns - self._pending[symbol][1] > self.resync_timeout * 1e9:
+                        await self._abandon_switch(symbol)
+                elif self.selector and self.websocket:
+                    target = self.selector.observe(symbol, processed_data['asks'],
+                                                   processed_data['bids'], channel)
+                    if target:
+                        await self.switch_channel(symbol, target)
+                
+        except DecodeError as e:
             self.logger.error(f"Failed to decode message: {str(e)}")
         except Exception as e:
             self.logger.error(f"Error processing message: {str(e)}")
 
+    async def _check_resync(self, symbol: str):
+        """Ask again for a snapshot that has not arrived within resync_timeout"""
+        started = self._resyncing[symbol]
+        if self.websocket and now_ns() - started > self.resync_timeout * 1e9:
+            self.logger.warning(f"No snapshot for {symbol} after {self.resync_timeout:.0f}s, resubscribing")
+            await self.resubscribe(symbol)
+            # Time the resync from the first attempt
+            self._resyncing[symbol] = started
+
+    async def _run_connection(self):
+        """Connect, subscribe every instrument and read frames until the socket drops"""
+        await self.connect()
+        await self.subscribe()
+        
+        # Start heartbeat task
+        self.heartbeat_task = asyncio.create_task(self.send_heartbeat())
+        
+        while self.is_connected:
+            message = await self.websocket.recv()
+            received_ns = now_ns()
+            if self.recorder:
+                self.recorder.write(message)
+            await self.process_message(message, received_ns)
+
+    async def _disconnect(self):
+        """Stop the heartbeat and drop the socket, keeping the client reusable"""
+        self.is_connected = False
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+            try:
+                await self.heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self.heartbeat_task = None
+            
+        if self.websocket:
+            try:
+                await self.websocket.close()
+            except Exception as e:
+                self.logger.debug(f"Error closing WebSocket: {str(e)}")
+            self.websocket = None
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential delay with jitter before reconnect number `attempt` (from 0)"""
+        delay = min(self.max_backoff, self.initial_backoff * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
     async def start(self):
-        """Start the WebSocket client"""
+        """
+        Start the WebSocket client
+        
+        A dropped connection is re-established with exponential backoff and
+        every instrument re-subscribed for a fresh snapshot; the client only
+        stops once close() is called (or on the first drop if reconnect is off).
+        """
+        self._closing = False
+        self._closed = asyncio.Event()
+        attempt = 0
         try:
-            await self.connect()
-            await self.subscribe()
-            
-            # Start heartbeat task
-            self.heartbeat_task = asyncio.create_task(self.send_heartbeat())
-            
-            while self.is_connected:
+            while not self._closing:
+                messages = sum(self.message_counts.values())
                 try:
-                    message = await self.websocket.recv()
-                    await self.process_message(message)
+                    await self._run_connection()
                 except websockets.ConnectionClosed:
                     self.logger.warning("WebSocket connection closed")
-                    break
                 except Exception as e:
-                    self.logger.error(f"Error in WebSocket loop: {str(e)}")
+                    self.logger.error(f"WebSocket client error: {str(e)}")
+                finally:
+                    await self._disconnect()
+                    
+                if self._closing or not self.reconnect:
                     break
+                # A connection that carried data resets the backoff
+                if sum(self.message_counts.values()) > messages:
+                    attempt = 0
+                # Every book is stale until its snapshot on the new connection,
+                # which subscribes the active channels only; switches in flight
+                # are dropped and restart their hold like abandoned ones
+                if self.selector:
+                    for symbol in self._pending:
+                        self.selector.switched(symbol)
+                self._pending.clear()
+                started = now_ns()
+                for symbol, book in self.books.items():
+                    book.reset()
+                    self._resyncing.setdefault(symbol, started)
                     
-        except Exception as e:
-            self.logger.error(f"WebSocket client error: {str(e)}")
+                delay = self._backoff(attempt)
+                attempt += 1
+                self.reconnects += 1
+                self.logger.info(f"Reconnecting in {delay:.1f}s (attempt {attempt})")
+                try:
+                    await asyncio.wait_for(self._closed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
         finally:
             await self.close()
 
+    async def replay(self, path: str, speed: Optional[float] = 1.0):
+        """
+        Feed a recorded capture through the message pipeline instead of the live socket
+        
+        Args:
+            path: Capture file written by FrameRecorder
+            speed: 1.0 for real time, N for N times faster, None for as fast as possible
+        """
+        try:
+            await FrameReplayer(path, speed).run(self)
+        except Exception as e:
+            self.logger.error(f"Replay error: {str(e)}")
+
     async def close(self):
-        """Close the WebSocket connection"""
-        if self.heartbeat_task:
-            self.heartbeat_task.cancel()
-            try:
-                await self.heartbeat_task
-            except asyncio.CancelledError:
-                pass
+        """Close the WebSocket connection and stop reconnecting"""
+        self._closing = True
+        if self._closed:
+            self._closed.set()
+        had_socket = self.websocket is not None
+        await self._disconnect()
+        if had_socket:
+            self.logger.info("WebSocket connection closed")
             
-        if self.websocket:
-            await self.websocket.close()
-            self.is_connected = False
-            self.logger.info("WebSocket connection closed") 
\ No newline at end of file
+        if self.recorder:
+            self.recorder.close() 
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""
+Headless cost engine: streams OKX books through the processors without Qt.
+
+Examples:
+    python headless.py --symbols BTC-USDT ETH-USDT > results.ndjson
+    python headless.py --symbols BTC-USDT --output costs.csv --duration 60
+    python headless.py --replay capture.bin.gz --speed 0 --output costs.parquet
+    python headless.py --symbols BTC-USDT --output unix:/tmp/tradesim.sock
+    python headless.py --symbols BTC-USDT ETH-USDT --store ticks/ --output results.ndjson
+    python headless.py --symbols BTC-USDT --quantity 50000 --adaptive-channel
+    python headless.py --symbols BTC-USDT ETH-USDT SOL-USDT --workers 3 --output results.ndjson
+"""
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+from datetime import datetime
+from typing import List, Optional
+
+from core.websocket_client import WebSocketClient, OKX_PUBLIC_URL
+from core.channel_selector import ChannelSelector, MIN_LEVELS
+from core.orderbook_processor import OrderbookProcessor
+from core.dispatcher import SymbolDispatcher
+from core.sharding import ShardedEngine, result_to_dict
+from core.sinks import open_sink, result_record
+from core.tick_store import TickStore
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the trade cost engine without a GUI")
+    parser.add_argument('--symbols', nargs='+', default=['BTC-USDT-SWAP'], help="Instruments to carry")
+    parser.add_argument('--quantity', type=float, default=100.0, help="Order quantity in USD")
+    parser.add_argument('--fee-tier', type=float, default=0.001, help="Taker fee rate")
+    parser.add_argument('--depth', type=int, default=None, help="Levels per side to process, full book if omitted")
+    parser.add_argument('--url', default=OKX_PUBLIC_URL, help="WebSocket endpoint")
+    parser.add_argument('--adaptive-channel', action='store_true',
+                        help="Read each book from the cheapest channel covering the order size")
+    parser.add_argument('--tick-by-tick-levels', type=int, default=None,
+                        help="With --adaptive-channel, use books-l2-tbt beyond this many levels")
+    parser.add_argument('--output', default='-',
+                        help="'-' for NDJSON on stdout, unix:PATH, or a .csv/.parquet/.ndjson file")
+    parser.add_argument('--replay', default=None, help="Process a recorded capture instead of the live feed")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed, 0 for as fast as possible")
+    parser.add_argument('--record', default=None, help="Capture raw frames to this file")
+    parser.add_argument('--store', default=None, help="Also append results and top-of-book to this tick store")
+    parser.add_argument('--duration', type=float, default=None, help="Stop after this many seconds")
+    parser.add_argument('--metrics-port', type=int, default=None, help="Serve Prometheus metrics on this port")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes; above 1 the instruments are sharded across them")
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args(argv)
+    if args.workers > 1 and (args.replay or args.record or args.store or args.adaptive_channel
+                             or args.metrics_port):
+        parser.error("--workers above 1 runs the live feed only, without --replay, --record, "
+                     "--store, --adaptive-channel or --metrics-port")
+    return args
+
+
+def start_metrics(port: int, client: WebSocketClient, dispatcher: SymbolDispatcher):
+    from core.metrics import MetricsRegistry, MetricsServer, ClientCollector, processor_collector
+
+    registry = MetricsRegistry()
+    registry.register(ClientCollector(lambda: client))
+    registry.register(processor_collector(lambda: dispatcher.processors))
+    server = MetricsServer(registry, port=port)
+    server.start()
+    return server
+
+
+async def run(args: argparse.Namespace) -> int:
+    store = TickStore(args.store) if args.store else None
+    selector = None
+    if args.adaptive_channel:
+        # Never read fewer levels than the tick store keeps per row
+        min_levels = max(MIN_LEVELS, store.top_n) if store else MIN_LEVELS
+        selector = ChannelSelector(args.quantity, tick_by_tick_levels=args.tick_by_tick_levels,
+                                   min_levels=min_levels)
+    client = WebSocketClient(args.symbols, depth=args.depth, record_path=args.record, url=args.url,
+                             selector=selector)
+    dispatcher = SymbolDispatcher(lambda symbol: OrderbookProcessor(
+        quantity=args.quantity,
+        fee_tier=args.fee_tier
+    ))
+    sink = open_sink(args.output)
+    await sink.open()
+
+    async def handle_orderbook(data):
+        results = dispatcher.dispatch(data)
+        if results:
+            sink.write(result_record(data, results))
+            if store:
+                store.append(data['symbol'], data, results)
+
+    async def handle_trade(trade):
+        dispatcher.dispatch_trade(trade)
+
+    client.add_callback(handle_orderbook)
+    client.add_trade_callback(handle_trade)
+
+    metrics_server = None
+    if args.metrics_port:
+        try:
+            metrics_server = start_metrics(args.metrics_port, client, dispatcher)
+        except Exception as e:
+            logger.error(f"Error starting metrics server: {str(e)}")
+
+    if args.replay:
+        task = asyncio.create_task(client.replay(args.replay, args.speed or None))
+    else:
+        task = asyncio.create_task(client.start())
+
+    async def stop():
+        client.is_connected = False
+        await client.close()
+        if args.replay:
+            task.cancel()
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, lambda: asyncio.ensure_future(stop()))
+        except (NotImplementedError, AttributeError):
+            # Windows event loops have no signal handlers; Ctrl+C still raises
+            pass
+    if args.duration:
+        loop.call_later(args.duration, lambda: asyncio.ensure_future(stop()))
+
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        if args.replay:
+            # Live runs close the client when start() returns
+            await client.close()
+        resync = client.resync_latency
+        logger.info(f"Reconnects: {client.reconnects}, book gaps: {client.book_gaps or 0}, "
+                    f"resyncs: {resync.count} (p50 {resync.percentile(50) / 1e6:.1f} ms, "
+                    f"max {resync.max / 1e6:.1f} ms)")
+        await sink.close()
+        if store:
+            store.close()
+        if metrics_server:
+            metrics_server.stop()
+    return 0
+
+
+async def run_sharded(args: argparse.Namespace) -> int:
+    """Ingest in one process and compute the metrics in `args.workers` worker processes"""
+    engine = ShardedEngine(args.symbols, args.quantity, args.fee_tier, workers=args.workers,
+                           depth=args.depth or 400, url=args.url)
+    sink = open_sink(args.output)
+    await sink.open()
+    stopping = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stopping.set)
+        except (NotImplementedError, AttributeError):
+            pass
+    if args.duration:
+        loop.call_later(args.duration, stopping.set)
+
+    engine.start()
+    try:
+        while not stopping.is_set():
+            # The results queue blocks, so wait on it off the event loop
+            record = await loop.run_in_executor(None, engine.poll, 0.1)
+            if record is None:
+                continue
+            results = result_to_dict(record)
+            data = {
+                'timestamp': datetime.fromtimestamp(results['ts'] / 1000),
+                'symbol': results['symbol'],
+                'seq_id': results['seq_id']
+            }
+            sink.write(result_record(data, results))
+    finally:
+        engine.stop()
+        await sink.close()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    # Logs go to stderr so stdout stays clean NDJSON
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper(), logging.INFO),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stderr
+    )
+    try:
+        return asyncio.run(run_sharded(args) if args.workers > 1 else run(args))
+    except KeyboardInterrupt:
+        return 0
+    except RuntimeError as e:
+        # e.g. an output format whose optional dependency is missing
+        logger.error(str(e))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
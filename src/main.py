@@ -1,11 +1,24 @@
+import os
 import sys
 import asyncio
 import logging
+from collections import deque
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import QThread, pyqtSignal, QTimer
 from ui.main_window import MainWindow
+from ui.charts import DEPTH_CHART_LEVELS
 from core.websocket_client import WebSocketClient
 from core.orderbook_processor import OrderbookProcessor
+from core.dispatcher import SymbolDispatcher
+from core.mailbox import LatestValueMailbox
+from core.latency import LatencyTracer, now_ns
+from core.tick_store import TickStore
+from core.processing_worker import ProcessingWorker, HISTORY_FIELDS
+from core.channel_selector import ChannelSelector
+from core.series import RingSeries
+from core.metrics import (MetricsRegistry, MetricsServer, ClientCollector,
+                          processor_collector, mailbox_collector, tracer_collector)
+from typing import List, Optional
 
 # Configure logging
 logging.basicConfig(
@@ -15,74 +28,159 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class WebSocketThread(QThread):
-    orderbook_update = pyqtSignal(dict)
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, symbol: str):
+    def __init__(self, symbols: List[str], selector: Optional[ChannelSelector] = None):
         super().__init__()
-        self.symbol = symbol
+        self.symbols = symbols
+        self.selector = selector
+        # Newest book per symbol; the processing worker only ever sees the latest state
+        self.mailbox = LatestValueMailbox()
+        # Every trade counts as a training label, so trades queue rather than coalesce
+        self.trades = deque(maxlen=10000)
         self.websocket_client = None
+        self.loop = None
         self.is_running = False
         
     def run(self):
         """Run the WebSocket client in a separate thread"""
         try:
-            self.websocket_client = WebSocketClient(self.symbol)
+            # One connection carries every instrument
+            self.websocket_client = WebSocketClient(self.symbols, selector=self.selector)
             self.websocket_client.add_callback(self.handle_orderbook)
+            self.websocket_client.add_trade_callback(self.handle_trade)
             
             # Create new event loop for this thread
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
             
             # Start WebSocket client
             self.is_running = True
-            loop.run_until_complete(self.websocket_client.start())
+            self.loop.run_until_complete(self.websocket_client.start())
             
         except Exception as e:
             self.error_occurred.emit(str(e))
         finally:
             self.is_running = False
             
+    def _call_soon(self, coro):
+        """Schedule a client coroutine on the thread's event loop from another thread"""
+        if self.loop and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+        else:
+            coro.close()
+            
+    def add_symbols(self, symbols: List[str]):
+        """Subscribe more instruments on the running connection"""
+        if self.websocket_client:
+            self._call_soon(self.websocket_client.add_symbols(symbols))
+            
+    def remove_symbols(self, symbols: List[str]):
+        """Unsubscribe instruments from the running connection"""
+        if self.websocket_client:
+            self._call_soon(self.websocket_client.remove_symbols(symbols))
+            
     async def handle_orderbook(self, data):
         """Handle incoming orderbook data"""
-        self.orderbook_update.emit(data)
+        # Wakes the processing worker waiting on the mailbox
+        self.mailbox.put(data['symbol'], data)
+            
+    async def handle_trade(self, trade):
+        """Queue a public trade for the processing worker"""
+        self.trades.append(trade)
         
     def stop(self):
         """Stop the WebSocket client"""
         self.is_running = False
         if self.websocket_client:
-            loop = asyncio.get_event_loop()
-            loop.create_task(self.websocket_client.close())
+            self._call_soon(self.websocket_client.close())
 
 class TradeSimulator:
     def __init__(self):
         self.app = QApplication(sys.argv)
         self.window = MainWindow()
         self.websocket_thread = None
-        self.orderbook_processor = None
+        self.processing_worker = None
+        self.dispatcher = None
+        self.selected_symbol = None
         self.update_timer = QTimer()
         self.update_timer.setInterval(100)  # Update UI every 100ms
         self.update_timer.timeout.connect(self.update_ui)
-        self.pending_updates = []
+        # Latest formatted snapshot per symbol waiting for the next UI refresh
+        self.pending_updates = LatestValueMailbox()
+        # Exchange-to-screen stage latencies of the displayed results
+        self.latency_tracer = LatencyTracer()
+        # Cost history of the selected symbol, appended by the processing worker
+        self.history = RingSeries(HISTORY_FIELDS)
+        self._history_drawn = -1
+        
+        # Optional Prometheus endpoint, enabled by setting METRICS_PORT
+        self.metrics_server = None
+        metrics_port = os.environ.get('METRICS_PORT')
+        if metrics_port:
+            self.start_metrics_server(int(metrics_port))
+        
+        # Optional tick store of every processed book, enabled by setting TICK_STORE_DIR
+        tick_store_dir = os.environ.get('TICK_STORE_DIR')
+        self.tick_store = TickStore(tick_store_dir) if tick_store_dir else None
         
         # Connect UI signals
         self.window.start_button.clicked.connect(self.toggle_simulation)
+        self.window.asset_combo.currentTextChanged.connect(self.change_asset)
         
+    def start_metrics_server(self, port: int):
+        """Serve pipeline metrics on localhost from a background thread"""
+        registry = MetricsRegistry()
+        registry.register(ClientCollector(
+            lambda: self.websocket_thread.websocket_client if self.websocket_thread else None
+        ))
+        registry.register(processor_collector(
+            lambda: self.dispatcher.processors if self.dispatcher else None
+        ))
+        registry.register(mailbox_collector(lambda: {
+            'books': self.websocket_thread.mailbox if self.websocket_thread else None,
+            'results': self.pending_updates
+        }))
+        registry.register(tracer_collector(self.latency_tracer))
+        try:
+            self.metrics_server = MetricsServer(registry, port=port)
+            self.metrics_server.start()
+        except Exception as e:
+            logger.error(f"Error starting metrics server: {str(e)}")
+            self.metrics_server = None
+            
     def setup_components(self):
         """Initialize WebSocket client and orderbook processor"""
         try:
             # Get input parameters
             params = self.window.get_input_parameters()
             
+            self.selected_symbol = params['asset']
+            
+            # Optional depth-adaptive book channel, enabled by setting ADAPTIVE_CHANNEL
+            # The depth chart needs more levels than books5 carries
+            selector = (ChannelSelector(params['quantity'], min_levels=DEPTH_CHART_LEVELS)
+                        if os.environ.get('ADAPTIVE_CHANNEL') else None)
+            
             # Initialize WebSocket thread
-            self.websocket_thread = WebSocketThread(params['asset'])
-            self.websocket_thread.orderbook_update.connect(self.handle_orderbook)
+            self.websocket_thread = WebSocketThread([self.selected_symbol], selector)
             self.websocket_thread.error_occurred.connect(self.handle_error)
             
-            # Initialize orderbook processor
-            self.orderbook_processor = OrderbookProcessor(
+            # Initialize one orderbook processor per instrument
+            self.dispatcher = SymbolDispatcher(lambda symbol: OrderbookProcessor(
                 quantity=params['quantity'],
                 fee_tier=params['fee_tier']
+            ))
+            
+            # Processors run on their own thread; the GUI only paints snapshots
+            self.processing_worker = ProcessingWorker(
+                self.websocket_thread.mailbox,
+                self.websocket_thread.trades,
+                self.dispatcher,
+                self.pending_updates,
+                selected_symbol=self.selected_symbol,
+                on_result=self.tick_store.append if self.tick_store else None,
+                history=self.history
             )
             
         except Exception as e:
@@ -93,41 +191,78 @@ class TradeSimulator:
         """Toggle simulation on/off"""
         if not self.websocket_thread or not self.websocket_thread.is_running:
             self.setup_components()
+            self.processing_worker.start()
             self.websocket_thread.start()
+            self.latency_tracer.reset()
             self.update_timer.start()
             self.window.start_button.setText("Stop Simulation")
         else:
             self.websocket_thread.stop()
+            self.processing_worker.stop()
             self.update_timer.stop()
+            logger.info(f"Book mailbox: {self.websocket_thread.mailbox.stats()}, "
+                        f"result mailbox: {self.pending_updates.stats()}")
             self.window.start_button.setText("Start Simulation")
             
-    def handle_orderbook(self, data):
-        """Handle incoming orderbook data"""
-        try:
-            if self.orderbook_processor:
-                # Process orderbook data
-                results = self.orderbook_processor.process_orderbook(data)
-                self.pending_updates.append(results)
-        except Exception as e:
-            logger.error(f"Error processing orderbook: {str(e)}")
+    def change_asset(self, symbol: str):
+        """Switch the running connection to a newly selected instrument"""
+        if not self.websocket_thread or not self.websocket_thread.is_running:
+            return
+        if symbol == self.selected_symbol:
+            return
+        
+        previous = self.selected_symbol
+        self.selected_symbol = symbol
+        self.processing_worker.select(symbol)
+        self.pending_updates.discard(previous)
+        self.websocket_thread.mailbox.discard(previous)
+        self.websocket_thread.add_symbols([symbol])
+        self.websocket_thread.remove_symbols([previous])
+        self.processing_worker.remove_symbols([previous])
             
     def update_ui(self):
-        """Update UI with latest results"""
-        if self.pending_updates:
-            latest_results = self.pending_updates[-1]
-            self.window.update_outputs(latest_results)
-            self.pending_updates.clear()
+        """Paint the newest snapshot of the selected symbol"""
+        snapshot = self.pending_updates.take(self.selected_symbol)
+        if snapshot:
+            trace = snapshot['trace']
+            trace['delivered'] = now_ns()
+            self.window.update_outputs(snapshot)
+            trace['painted'] = now_ns()
+            self.latency_tracer.record(trace)
+            self.window.update_latency(self.latency_tracer.snapshot())
+            client = self.websocket_thread.websocket_client
+            if client:
+                self.window.update_connection(client.reconnects, sum(client.book_gaps.values()),
+                                              client.resync_latency.percentile(50) / 1e6)
+        # Charts are only recomputed here, at most once per tick
+        appended = self.history.appended
+        if snapshot or appended != self._history_drawn:
+            self._history_drawn = appended
+            self.window.update_charts(snapshot, self.history)
             
     def handle_error(self, error_msg):
-        """Handle WebSocket errors"""
+        """Handle a WebSocket thread that exited with an error"""
+        # Dropped connections are retried inside the client; getting here means
+        # the thread itself has ended, so only the rest of the pipeline is stopped
         logger.error(f"WebSocket error: {error_msg}")
         self.window.show_error(error_msg)
-        self.toggle_simulation()  # Stop simulation on error
+        if self.processing_worker:
+            self.processing_worker.stop()
+        self.update_timer.stop()
+        self.window.start_button.setText("Start Simulation")
             
     def run(self):
         """Run the application"""
         self.window.show()
-        return self.app.exec()
+        try:
+            return self.app.exec()
+        finally:
+            if self.processing_worker:
+                self.processing_worker.stop()
+            if self.metrics_server:
+                self.metrics_server.stop()
+            if self.tick_store:
+                self.tick_store.close()
 
 if __name__ == "__main__":
     simulator = TradeSimulator()
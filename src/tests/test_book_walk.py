@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from core.book_walk import DepthLadder
+
+ASKS = [[100.0, 1.0], [101.0, 2.0], [103.0, 1.0]]
+BIDS = [[99.0, 1.0], [98.0, 2.0], [96.0, 1.0]]
+
+
+class TestDepthLadder(unittest.TestCase):
+
+    def test_buy_walks_up_the_asks(self):
+        ladder = DepthLadder(ASKS, side='buy')
+        self.assertEqual(ladder.best_price, 100.0)
+        self.assertEqual((ladder.total_size, ladder.total_notional), (4.0, 405.0))
+        self.assertAlmostEqual(float(ladder.notional_for(2.0)), 201.0)
+        self.assertAlmostEqual(float(ladder.slippage(2.0)), (100.5 - 100.0) / 100.0)
+
+    def test_sell_walks_down_the_bids(self):
+        ladder = DepthLadder(BIDS, side='sell')
+        # 1 at 99 and 2 at 98, received rather than paid
+        self.assertAlmostEqual(float(ladder.notional_for(3.0)), 295.0)
+        average = 295.0 / 3.0
+        self.assertAlmostEqual(float(ladder.slippage(3.0)), (99.0 - average) / 99.0)
+        self.assertGreater(float(ladder.slippage(3.0)), 0.0)
+        # The same notional walk in quote terms
+        self.assertAlmostEqual(float(ladder.quantity_for(295.0)), 3.0)
+        self.assertAlmostEqual(float(ladder.slippage_notional(295.0)), (99.0 - average) / 99.0)
+
+    def test_arrays_match_scalar_walks(self):
+        for side, levels in (('buy', ASKS), ('sell', BIDS)):
+            ladder = DepthLadder(levels, side=side)
+            quantities = np.array([0.0, 0.5, 1.0, 2.5, 4.0])
+            np.testing.assert_allclose(ladder.slippage(quantities),
+                                       [float(ladder.slippage(q)) for q in quantities])
+            notionals = np.array([[10.0, 150.0], [300.0, ladder.total_notional]])
+            walked = ladder.slippage_notional(notionals)
+            self.assertEqual(walked.shape, (2, 2))
+            np.testing.assert_allclose(walked.ravel(),
+                                       [float(ladder.slippage_notional(n)) for n in notionals.ravel()])
+            # Best level only: no slippage
+            self.assertEqual(walked[0, 0], 0.0)
+
+    def test_beyond_total_depth_is_inf(self):
+        for side, levels in (('buy', ASKS), ('sell', BIDS)):
+            ladder = DepthLadder(levels, side=side)
+            self.assertTrue(np.isfinite(ladder.slippage(ladder.total_size)))
+            self.assertEqual(float(ladder.slippage(ladder.total_size + 1e-9)), np.inf)
+            self.assertEqual(float(ladder.notional_for(10.0)), np.inf)
+            self.assertEqual(float(ladder.quantity_for(1e6)), np.inf)
+            self.assertEqual(ladder.slippage_notional([100.0, 1e6]).tolist()[1], np.inf)
+
+    def test_empty_side(self):
+        ladder = DepthLadder([], side='sell')
+        self.assertTrue(np.isnan(ladder.best_price))
+        self.assertEqual(ladder.total_size, 0.0)
+        self.assertEqual(ladder.slippage([1.0, 2.0]).tolist(), [np.inf, np.inf])
+        self.assertEqual(float(ladder.slippage_notional(1.0)), np.inf)
+
+    def test_unknown_side(self):
+        with self.assertRaises(ValueError):
+            DepthLadder(ASKS, side='short')
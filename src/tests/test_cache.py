@@ -0,0 +1,57 @@
+import unittest
+
+from core.cache import LRUCache, MISSING
+from core.orderbook_processor import OrderbookProcessor
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_hit_miss_and_eviction_counters(self):
+        cache = LRUCache(maxsize=2)
+        self.assertIs(cache.get('a'), MISSING)
+        cache.put('a', 0.0)
+        cache.put('b', None)
+        self.assertEqual(cache.get('a'), 0.0)
+        self.assertIsNone(cache.get('b'))
+        # 'a' was used before 'b', so it is the one evicted
+        cache.put('c', 3)
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertAlmostEqual(cache.hit_rate, 2 / 3)
+
+    def test_rejects_non_positive_size(self):
+        with self.assertRaises(ValueError):
+            LRUCache(maxsize=0)
+
+
+class TestProcessorCache(unittest.TestCase):
+
+    def setUp(self):
+        self.processor = OrderbookProcessor(quantity=1.0, fee_tier=0.001, calibrate=False)
+        self.asks = [[100.0, 1.0], [101.0, 2.0]]
+        self.bids = [[99.0, 1.0], [98.0, 2.0]]
+
+    def test_same_book_version_hits(self):
+        self.processor.update_book(self.asks, self.bids, version=7)
+        first = self.processor.calculate_slippage(self.asks, 2.0)
+        self.processor.update_book(self.asks, self.bids, version=7)
+        second = self.processor.calculate_slippage(self.asks, 2.0)
+        self.assertEqual(first, second)
+        self.assertEqual(self.processor.cache_stats['hits'], 1)
+
+    def test_new_book_version_misses(self):
+        self.processor.update_book(self.asks, self.bids, version=7)
+        self.processor.calculate_slippage(self.asks, 2.0)
+        asks = [[100.0, 2.0], [101.0, 2.0]]
+        self.processor.update_book(asks, self.bids, version=8)
+        self.assertEqual(self.processor.calculate_slippage(asks, 2.0), 0.0)
+        stats = self.processor.cache_stats
+        self.assertEqual((stats['hits'], stats['misses']), (0, 2))
+
+    def test_levels_other_than_the_current_book_are_not_cached(self):
+        self.processor.update_book(self.asks, self.bids, version=7)
+        other = [[100.0, 1.0], [102.0, 2.0]]
+        self.processor.calculate_slippage(other, 2.0)
+        self.processor.calculate_slippage(other, 2.0)
+        self.assertEqual(self.processor.cache_stats['size'], 0)
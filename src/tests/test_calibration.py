@@ -0,0 +1,116 @@
+import unittest
+
+import numpy as np
+
+from core.book_walk import DepthLadder
+from core.calibration import ImpactCalibrator, RollingRegression
+from core.market_impact import AlmgrenChrissModel
+
+# Levels of 0.01 base units, each 1e-6 of the best price further out: walking
+# q units costs q / 0.01 levels at half the step each, so eta = 1e-6 / 0.02
+LEVEL_SIZE = 0.01
+LEVEL_STEP = 1e-6
+ETA = LEVEL_STEP / (2 * LEVEL_SIZE)
+GAMMA = 2e-5
+
+
+def ladders(mid: float, levels: int = 1000):
+    offsets = np.arange(1, levels + 1) * LEVEL_STEP
+    asks = np.column_stack([mid * (1 + offsets), np.full(levels, LEVEL_SIZE)])
+    bids = np.column_stack([mid * (1 - offsets), np.full(levels, LEVEL_SIZE)])
+    return DepthLadder(asks, side='buy'), DepthLadder(bids, side='sell')
+
+
+class TestRollingRegression(unittest.TestCase):
+
+    def test_recovers_slope_and_intercept(self):
+        rng = np.random.default_rng(0)
+        regression = RollingRegression(halflife=2000, fit_intercept=True)
+        for x in rng.normal(0, 1, 5000):
+            regression.update(x, 2.0 + 3.0 * x + rng.normal(0, 0.1))
+        self.assertAlmostEqual(regression.slope, 3.0, delta=0.01)
+        self.assertAlmostEqual(regression.intercept, 2.0, delta=0.01)
+        self.assertGreater(regression.r_squared, 0.99)
+
+    def test_old_samples_fade(self):
+        regression = RollingRegression(halflife=50)
+        for x in range(1, 1000):
+            regression.update(x, 1.0 * x)
+        for x in range(1, 1000):
+            regression.update(x, 5.0 * x)
+        self.assertAlmostEqual(regression.slope, 5.0, places=4)
+
+    def test_degenerate_input(self):
+        empty = RollingRegression()
+        self.assertEqual((empty.slope, empty.intercept, empty.r_squared), (0.0, 0.0, 0.0))
+
+        # Constant x: no slope to fit, the intercept is the mean
+        constant_x = RollingRegression(fit_intercept=True)
+        for y in (1.0, 2.0, 3.0):
+            constant_x.update(4.0, y)
+        self.assertEqual(constant_x.slope, 0.0)
+        self.assertAlmostEqual(constant_x.intercept, 2.0, delta=0.01)
+        self.assertEqual(constant_x.r_squared, 0.0)
+
+        # Zero variance of y
+        constant_y = RollingRegression(fit_intercept=True)
+        for x in (1.0, 2.0, 3.0):
+            constant_y.update(x, 7.0)
+        self.assertAlmostEqual(constant_y.slope, 0.0)
+        self.assertEqual(constant_y.r_squared, 0.0)
+
+        constant_y.reset()
+        self.assertEqual((constant_y.count, constant_y.slope), (0, 0.0))
+
+
+class TestImpactCalibrator(unittest.TestCase):
+
+    def test_recovers_eta_and_gamma(self):
+        rng = np.random.default_rng(1)
+        model = AlmgrenChrissModel()
+        calibrator = ImpactCalibrator(model, min_samples=50)
+        mid = 100.0
+        for _ in range(1000):
+            flow = 0.0
+            for _ in range(rng.integers(1, 4)):
+                size = rng.exponential(1.0)
+                side = 'buy' if rng.random() < 0.5 else 'sell'
+                calibrator.observe_trade(size, side)
+                flow += size if side == 'buy' else -size
+            # Each book's mid moves by gamma per unit of signed volume, plus noise
+            mid *= 1 + GAMMA * flow + rng.normal(0, 1e-6)
+            calibrator.observe_book(*ladders(mid))
+
+        self.assertAlmostEqual(calibrator.eta / ETA, 1.0, delta=0.02)
+        self.assertAlmostEqual(calibrator.gamma / GAMMA, 1.0, delta=0.05)
+        # The last push landed in the model
+        self.assertEqual(model.eta, calibrator.eta)
+        self.assertEqual(model.gamma, calibrator.gamma)
+        self.assertGreater(calibrator.stats()['gamma_r2'], 0.9)
+
+    def test_static_book_has_no_permanent_impact(self):
+        model = AlmgrenChrissModel(gamma=0.1)
+        calibrator = ImpactCalibrator(model, min_samples=50)
+        for _ in range(100):
+            calibrator.observe_book(*ladders(100.0))
+        self.assertAlmostEqual(calibrator.eta / ETA, 1.0, delta=0.02)
+        self.assertEqual(calibrator.gamma, 0.0)
+        self.assertEqual(model.gamma, 0.0)
+
+    def test_gamma_waits_for_min_samples(self):
+        model = AlmgrenChrissModel(eta=0.1, gamma=0.1)
+        calibrator = ImpactCalibrator(model, min_samples=50)
+        for _ in range(10):
+            calibrator.observe_book(*ladders(100.0))
+        self.assertIsNone(calibrator.gamma)
+        # eta is pushed alone, with no permanent impact assumed yet
+        self.assertEqual(model.gamma, 0.0)
+
+    def test_one_level_books_leave_the_model_alone(self):
+        model = AlmgrenChrissModel(eta=0.1, gamma=0.1)
+        calibrator = ImpactCalibrator(model)
+        ask, bid = DepthLadder([[100.1, 1.0]], side='buy'), DepthLadder([[99.9, 1.0]], side='sell')
+        for _ in range(20):
+            calibrator.observe_book(ask, bid)
+        self.assertIsNone(calibrator.eta)
+        self.assertEqual((model.eta, model.gamma, calibrator.pushes), (0.1, 0.1, 0))
@@ -0,0 +1,137 @@
+import asyncio
+import time
+import unittest
+
+import numpy as np
+
+from core.channel_selector import ChannelSelector, MIN_LEVELS, levels_needed
+from core.stub_server import StubOKXServer
+from core.websocket_client import WebSocketClient
+
+SYMBOL = 'SIM-USDT'
+
+
+def ladder(price: float, step: float, size: float, n: int) -> np.ndarray:
+    return np.array([[price + i * step, size] for i in range(n)])
+
+
+class TestLevelsNeeded(unittest.TestCase):
+
+    def test_counts_usd_notional(self):
+        # 1000 USD per level
+        asks = ladder(100.0, 1.0, 10.0, 10)
+        self.assertEqual(levels_needed(asks, 500.0), 1)
+        self.assertEqual(levels_needed(asks, 1000.0), 1)
+        self.assertEqual(levels_needed(asks, 1500.0), 2)
+
+    def test_side_too_thin(self):
+        asks = ladder(100.0, 1.0, 1.0, 3)
+        self.assertEqual(levels_needed(asks, 1e6), 4)
+        self.assertEqual(levels_needed(np.empty((0, 2)), 100.0), 1)
+
+
+class TestChannelSelector(unittest.TestCase):
+
+    def test_choose_respects_min_levels(self):
+        self.assertEqual(ChannelSelector(100.0, min_levels=1).choose(1), 'bbo-tbt')
+        self.assertEqual(ChannelSelector(100.0).choose(1), 'books5')
+        self.assertEqual(ChannelSelector(100.0, min_levels=10).choose(1), 'books')
+        self.assertEqual(ChannelSelector(100.0).choose(6), 'books')
+        self.assertEqual(ChannelSelector(100.0, tick_by_tick_levels=50).choose(60), 'books-l2-tbt')
+        self.assertEqual(MIN_LEVELS, 5)
+
+    def test_upgrade_is_immediate(self):
+        selector = ChannelSelector(10000.0, hold=30.0, interval=0.0)
+        book = ladder(100.0, 1.0, 10.0, 5)
+        # 20000 USD with headroom walks 20 levels, more than books5 carries
+        self.assertEqual(selector.observe(SYMBOL, book, book, 'books5', now=0.0), 'books')
+
+    def test_downgrade_waits_for_hold(self):
+        selector = ChannelSelector(100.0, hold=30.0, interval=0.0)
+        book = ladder(100.0, 1.0, 10.0, 50)
+        self.assertIsNone(selector.observe(SYMBOL, book, book, 'books', now=0.0))
+        self.assertIsNone(selector.observe(SYMBOL, book, book, 'books', now=29.0))
+        self.assertEqual(selector.observe(SYMBOL, book, book, 'books', now=30.0), 'books5')
+
+    def test_switched_restarts_hold(self):
+        selector = ChannelSelector(100.0, hold=30.0, interval=0.0)
+        book = ladder(100.0, 1.0, 10.0, 50)
+        selector.observe(SYMBOL, book, book, 'books', now=0.0)
+        selector.switched(SYMBOL, now=20.0)
+        self.assertIsNone(selector.observe(SYMBOL, book, book, 'books', now=40.0))
+        self.assertEqual(selector.observe(SYMBOL, book, book, 'books', now=50.0), 'books5')
+
+    def test_interval_skips_evaluations(self):
+        selector = ChannelSelector(10000.0, interval=1.0)
+        thin = ladder(100.0, 1.0, 10.0, 5)
+        self.assertIsNone(selector.observe(SYMBOL, thin, thin, 'books', now=0.0))
+        self.assertIsNone(selector.observe(SYMBOL, thin, thin, 'books5', now=0.5))
+        self.assertEqual(selector.observe(SYMBOL, thin, thin, 'books5', now=1.0), 'books')
+
+    def test_reset_forgets_history(self):
+        selector = ChannelSelector(100.0, hold=30.0, interval=0.0)
+        book = ladder(100.0, 1.0, 10.0, 50)
+        selector.observe(SYMBOL, book, book, 'books', now=0.0)
+        selector.reset(SYMBOL)
+        # The hold starts again from the first observation after the reset
+        self.assertIsNone(selector.observe(SYMBOL, book, book, 'books', now=40.0))
+
+
+class TestChannelSwitching(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = StubOKXServer(port=0, depth=50, update_rate=100, instruments=[SYMBOL], seed=7)
+        await self.server.start()
+        self.selector = ChannelSelector(1.0, hold=0.0, interval=0.0)
+        self.client = WebSocketClient(SYMBOL, url=self.server.url, trades=False,
+                                      initial_backoff=0.05, selector=self.selector)
+        self.channels = []
+
+        async def on_book(data):
+            self.channels.append(data['channel'])
+
+        self.client.add_callback(on_book)
+        self.task = asyncio.create_task(self.client.start())
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await asyncio.wait_for(self.task, 5)
+        await self.server.stop()
+
+    async def wait_until(self, condition, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Timed out waiting for the client")
+            await asyncio.sleep(0.01)
+
+    async def test_round_trip_without_gap(self):
+        # A 1 USD order needs the floor of five levels: down to books5 ...
+        await self.wait_until(lambda: self.client.channels[SYMBOL] == 'books5')
+        seen = len(self.channels)
+        await self.wait_until(lambda: len(self.channels) > seen + 5)
+        self.assertFalse(self.server.subscribers['books'][SYMBOL])
+
+        # ... and back to the full book once the order outgrows it
+        self.selector.quantity = 1e9
+        await self.wait_until(lambda: self.client.channels[SYMBOL] == 'books')
+        seen = len(self.channels)
+        await self.wait_until(lambda: len(self.channels) > seen + 5)
+        self.assertFalse(self.server.subscribers['books5'][SYMBOL])
+
+        self.assertEqual(self.client.channel_switches, 2)
+        self.assertEqual(self.client.book_gaps, {})
+        self.assertEqual(self.channels[0], 'books')
+        self.assertEqual(self.channels[-1], 'books')
+        self.assertIn('books5', self.channels)
+
+    async def test_reconnect_restarts_hold_of_pending_switch(self):
+        await self.wait_until(lambda: self.client.channels[SYMBOL] == 'books5')
+        self.selector.hold = 60.0
+        # A switch whose snapshot has not arrived when the connection drops
+        self.client._pending[SYMBOL] = ('books', time.perf_counter_ns())
+        dropped = time.monotonic()
+        await self.server.drop_connections()
+        await self.wait_until(lambda: self.client.reconnects == 1)
+        self.assertEqual(self.client._pending, {})
+        self.assertGreaterEqual(self.selector._since[SYMBOL], dropped)
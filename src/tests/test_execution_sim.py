@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from core.book_walk import DepthLadder, walk_books
+from core.execution_sim import BookStates, ExecutionSimulator, load_book_states
+from core.recorder import FrameRecorder
+from core.stub_server import SyntheticBook
+
+STATES = 61
+
+
+def fixed_states(depth: int = 50) -> BookStates:
+    """The same book once a second for a minute"""
+    asks = np.array([[100.0 + 0.1 * i, 1.0] for i in range(depth)])
+    bids = np.array([[99.9 - 0.1 * i, 1.0] for i in range(depth)])
+    ts = np.arange(STATES, dtype=np.int64) * 1000
+    return BookStates(ts, np.repeat(asks[None], STATES, axis=0), np.repeat(bids[None], STATES, axis=0))
+
+
+def twap(quantity: float, horizon: float, slices: int):
+    return np.linspace(0.0, horizon, slices + 1), np.full(slices, quantity / slices)
+
+
+class TestWalkBooks(unittest.TestCase):
+
+    def test_matches_the_ladder_per_row(self):
+        states = fixed_states()
+        prices, sizes = states.asks[:3, :, 0], states.asks[:3, :, 1]
+        quantities = np.array([0.5, 7.3, 60.0])
+        notional, exhausted = walk_books(prices, sizes, quantities)
+        ladder = DepthLadder(states.asks[0], side='buy')
+        self.assertEqual(exhausted.tolist(), [False, False, True])
+        np.testing.assert_allclose(notional[:2], ladder.notional_for(quantities[:2]))
+        # The unfilled remainder is priced at the worst level
+        self.assertAlmostEqual(notional[2], ladder.total_notional + 10.0 * ladder.prices[-1])
+
+
+class TestExecutionSimulator(unittest.TestCase):
+
+    def test_single_slice_is_the_book_walk(self):
+        states = fixed_states()
+        mid = float(states.mids[0])
+        for side, levels in (('buy', states.asks[0]), ('sell', states.bids[0])):
+            simulator = ExecutionSimulator(states, side=side, workers=0, batch_size=300)
+            result = simulator.simulate([(np.array([0.0, 1.0]), np.array([5.0]))], n_paths=1000, seed=1)[0]
+            walked = float(DepthLadder(levels, side=side).notional_for(5.0))
+            expected = walked - 5.0 * mid if side == 'buy' else 5.0 * mid - walked
+            self.assertAlmostEqual(result['shortfall'].mean(), expected)
+            self.assertAlmostEqual(result['shortfall'].std(), 0.0)
+            self.assertFalse(result['exhausted'].any())
+
+    def test_twap_costs_less_than_an_immediate_fill(self):
+        immediate = (np.array([0.0, 1.0]), np.array([20.0]))
+        for mode in ('replay', 'stochastic'):
+            simulator = ExecutionSimulator(fixed_states(), mode=mode, volatility=1e-4, workers=0)
+            costs = simulator.evaluate([twap(20.0, 60.0, 10), immediate], n_paths=4000, seed=2)
+            self.assertLess(costs[0]['mean'], costs[1]['mean'])
+            self.assertEqual(costs[0]['exhausted_share'], 0.0)
+
+    def test_pool_reproduces_inline_paths(self):
+        strategies = [twap(20.0, 60.0, 10)]
+        inline = ExecutionSimulator(fixed_states(), mode='stochastic', volatility=1e-4,
+                                    workers=0, batch_size=500)
+        pooled = ExecutionSimulator(fixed_states(), mode='stochastic', volatility=1e-4,
+                                    workers=2, batch_size=500)
+        np.testing.assert_array_equal(inline.simulate(strategies, 2000, seed=3)[0]['shortfall'],
+                                      pooled.simulate(strategies, 2000, seed=3)[0]['shortfall'])
+
+    def test_horizon_beyond_the_recording(self):
+        simulator = ExecutionSimulator(fixed_states(), workers=0)
+        with self.assertRaises(ValueError):
+            simulator.simulate([twap(1.0, 120.0, 4)], n_paths=10)
+
+
+class TestLoadBookStates(unittest.TestCase):
+
+    def test_round_trip_through_a_capture(self):
+        book = SyntheticBook('SIM-USDT', depth=30, seed=8)
+        arg = {'channel': 'books', 'instId': 'SIM-USDT'}
+        start = 1700000000000
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'capture.bin.gz')
+            with FrameRecorder(path) as recorder:
+                snapshot = book.snapshot()
+                snapshot['ts'] = str(start)
+                recorder.write(json.dumps({'arg': arg, 'action': 'snapshot', 'data': [snapshot]}))
+                for i in range(1, 20):
+                    update = book.step(0.1)
+                    update['ts'] = str(start + 100 * i)
+                    recorder.write(json.dumps({'arg': arg, 'action': 'update', 'data': [update]}))
+
+            states = load_book_states(path, 'SIM-USDT', depth=10)
+            thinned = load_book_states(path, 'SIM-USDT', depth=10, min_interval_ms=250)
+
+        self.assertEqual(states.ts.tolist(), [start + 100 * i for i in range(20)])
+        self.assertEqual(states.asks.shape, (20, 10, 2))
+        best_asks = sorted(book.asks)[:10]
+        np.testing.assert_allclose(states.asks[-1, :, 0], [t * book.tick_size for t in best_asks])
+        np.testing.assert_allclose(states.asks[-1, :, 1], [book.asks[t] for t in best_asks])
+        self.assertEqual(thinned.ts.tolist(), [start + 300 * i for i in range(7)])
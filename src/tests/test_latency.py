@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+
+from core.latency import LatencyHistogram, LatencyTracer
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 101):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(50), 50)
+        self.assertEqual(histogram.percentile(99), 99)
+        self.assertEqual(histogram.percentile(100), 100)
+        self.assertEqual((histogram.min, histogram.max), (1, 100))
+        self.assertAlmostEqual(histogram.mean, 50.5)
+
+    def test_percentiles_within_bucket_error(self):
+        values = np.random.default_rng(0).lognormal(np.log(2e5), 1.0, 20000).astype(np.int64)
+        histogram = LatencyHistogram(sub_bucket_bits=7)
+        for value in values:
+            histogram.record(value)
+        for p in (50, 90, 99, 99.9):
+            expected = np.percentile(values, p, method='inverted_cdf')
+            self.assertAlmostEqual(histogram.percentile(p) / expected, 1.0, delta=2 ** -6)
+
+    def test_values_are_clamped(self):
+        histogram = LatencyHistogram(max_value_ns=1000)
+        histogram.record(-5)
+        histogram.record(10 ** 9)
+        self.assertEqual((histogram.min, histogram.max), (0, 1000))
+        self.assertEqual(histogram.percentile(100), 1000)
+
+    def test_merge_and_snapshot(self):
+        first, second = LatencyHistogram(), LatencyHistogram()
+        first.record(1_000_000)
+        second.record(3_000_000)
+        first.merge(second)
+        snapshot = first.snapshot()
+        self.assertEqual(snapshot['count'], 2)
+        self.assertAlmostEqual(snapshot['mean_ms'], 2.0)
+        self.assertAlmostEqual(snapshot['max_ms'], 3.0)
+        self.assertAlmostEqual(snapshot['p50_ms'], 1.0, delta=1.0 / 64)
+        self.assertEqual(LatencyHistogram().snapshot(), {'count': 0})
+
+
+class TestLatencyTracer(unittest.TestCase):
+
+    def test_records_stage_pairs_and_spans(self):
+        tracer = LatencyTracer()
+        tracer.record({'exchange': 0, 'received': 100, 'decoded': 110, 'processed': 125})
+        snapshot = tracer.snapshot()
+        self.assertEqual(set(snapshot), {'end_to_end', 'internal', 'exchange->received',
+                                         'received->decoded', 'decoded->processed'})
+        self.assertEqual(tracer.histograms['end_to_end'].max, 125)
+        self.assertEqual(tracer.histograms['internal'].max, 25)
+        self.assertEqual(tracer.histograms['decoded->processed'].max, 15)
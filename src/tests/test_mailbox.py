@@ -0,0 +1,44 @@
+import threading
+import unittest
+
+from core.mailbox import LatestValueMailbox
+
+
+class TestLatestValueMailbox(unittest.TestCase):
+
+    def test_unread_values_are_conflated(self):
+        mailbox = LatestValueMailbox()
+        self.assertTrue(mailbox.put('BTC', 1))
+        self.assertFalse(mailbox.put('BTC', 2))
+        self.assertFalse(mailbox.put('BTC', 3))
+        self.assertTrue(mailbox.put('ETH', 1))
+        self.assertEqual(mailbox.take('BTC'), 3)
+        self.assertIsNone(mailbox.take('BTC'))
+        self.assertEqual(mailbox.stats(),
+                         {'depth': 1, 'puts': 4, 'takes': 1, 'conflated': 2, 'dropped': 0})
+
+    def test_take_all_empties_every_slot(self):
+        mailbox = LatestValueMailbox()
+        for i in range(5):
+            mailbox.put(i % 2, i)
+        self.assertEqual(mailbox.take_all(), {0: 4, 1: 3})
+        self.assertEqual(mailbox.depth, 0)
+        self.assertEqual((mailbox.takes, mailbox.conflated), (2, 3))
+
+    def test_discard_and_clear_count_dropped_values(self):
+        mailbox = LatestValueMailbox()
+        mailbox.put('BTC', 1)
+        mailbox.put('ETH', 1)
+        mailbox.put('SOL', 1)
+        mailbox.discard('BTC')
+        mailbox.discard('BTC')
+        mailbox.clear()
+        self.assertEqual(mailbox.stats()['dropped'], 3)
+
+    def test_wait_wakes_on_put(self):
+        mailbox = LatestValueMailbox()
+        self.assertFalse(mailbox.wait(timeout=0.01))
+        timer = threading.Timer(0.01, mailbox.put, ('BTC', 1))
+        timer.start()
+        self.assertTrue(mailbox.wait(timeout=5))
+        timer.join()
@@ -0,0 +1,33 @@
+import unittest
+
+import numpy as np
+
+from core.market_impact import AlmgrenChrissModel, _SERIES_LIMIT
+
+
+class TestAlmgrenChrissSolution(unittest.TestCase):
+
+    def setUp(self):
+        self.model = AlmgrenChrissModel(eta=0.1, gamma=0.1)
+        self.volatility = 0.02
+        self.horizon = 60.0
+
+    def variance(self, u: float) -> float:
+        """Unit variance at kappa * T = u"""
+        kappa = u / self.horizon
+        risk_aversion = kappa ** 2 * self.model.eta / self.volatility ** 2
+        _, _, _, variance = self.model._solve(np.array([risk_aversion]), np.array([self.horizon]),
+                                              self.volatility, 10, 1.0)
+        return float(variance[0, 0])
+
+    def test_variance_branches_agree_at_the_series_limit(self):
+        below = self.variance(_SERIES_LIMIT * (1 - 1e-9))
+        above = self.variance(_SERIES_LIMIT * (1 + 1e-9))
+        self.assertAlmostEqual(below / above, 1.0, delta=1e-9)
+
+    def test_variance_matches_the_closed_form_integral(self):
+        # sigma^2 * int_0^T (sinh(k (T - t)) / sinh(k T))^2 dt
+        for u in (1e-4, 0.5, 3.0):
+            kappa = u / self.horizon
+            expected = self.volatility ** 2 * (np.sinh(2 * u) / 4 - u / 2) / (kappa * np.sinh(u) ** 2)
+            self.assertAlmostEqual(self.variance(u) / expected, 1.0, delta=1e-6)
@@ -0,0 +1,76 @@
+import unittest
+
+from core.latency import LatencyHistogram
+from core.mailbox import LatestValueMailbox
+from core.metrics import (ClientCollector, MetricFamily, MetricsRegistry, render, summary_samples,
+                          mailbox_collector, processor_collector)
+from core.orderbook_processor import OrderbookProcessor
+from core.websocket_client import WebSocketClient
+
+
+class TestRender(unittest.TestCase):
+
+    def test_text_exposition_format(self):
+        text = render([
+            MetricFamily('tradesim_messages_total', 'counter', 'Book messages',
+                         [('', {'symbol': 'BTC-USDT'}, 3), ('', {'symbol': 'a"b\\c'}, 1)]),
+            MetricFamily('tradesim_empty', 'gauge', 'Skipped without samples', []),
+            MetricFamily('tradesim_ratio', 'gauge', 'Special values',
+                         [('', {'kind': 'nan'}, float('nan')), ('', {'kind': 'inf'}, float('inf')),
+                          ('', {}, 0.25)]),
+        ])
+        self.assertEqual(text, (
+            '# HELP tradesim_messages_total Book messages\n'
+            '# TYPE tradesim_messages_total counter\n'
+            'tradesim_messages_total{symbol="BTC-USDT"} 3\n'
+            'tradesim_messages_total{symbol="a\\"b\\\\c"} 1\n'
+            '# HELP tradesim_ratio Special values\n'
+            '# TYPE tradesim_ratio gauge\n'
+            'tradesim_ratio{kind="nan"} NaN\n'
+            'tradesim_ratio{kind="inf"} +Inf\n'
+            'tradesim_ratio 0.25\n'
+        ))
+
+    def test_summary_samples_in_seconds(self):
+        histogram = LatencyHistogram()
+        histogram.record(2_000_000)
+        samples = summary_samples(histogram, {'stage': 'decode'})
+        self.assertEqual(len(samples), 6)
+        self.assertEqual(samples[0][1], {'stage': 'decode', 'quantile': '0.5'})
+        self.assertAlmostEqual(samples[0][2], 0.002, delta=0.002 / 64)
+        self.assertEqual(samples[-2], ('_sum', {'stage': 'decode'}, 0.002))
+        self.assertEqual(samples[-1], ('_count', {'stage': 'decode'}, 1))
+        # An empty histogram still exports its sum and count
+        self.assertEqual([s[0] for s in summary_samples(LatencyHistogram(), {})], ['_sum', '_count'])
+
+    def test_registry_renders_collectors(self):
+        mailbox = LatestValueMailbox()
+        mailbox.put('BTC', 1)
+        mailbox.put('BTC', 2)
+        processor = OrderbookProcessor(quantity=1.0, fee_tier=0.001, calibrate=False)
+        registry = MetricsRegistry()
+        registry.register(mailbox_collector(lambda: {'books': mailbox}))
+        registry.register(processor_collector(lambda: {'BTC': processor}))
+        registry.register(lambda: 1 / 0)  # a failing collector is logged and skipped
+        with self.assertLogs('core.metrics', 'ERROR'):
+            text = registry.render()
+        self.assertIn('tradesim_conflated_updates_total{mailbox="books"} 1\n', text)
+        self.assertIn('tradesim_mailbox_depth{mailbox="books"} 1\n', text)
+        self.assertIn('tradesim_cache_hits_total{symbol="BTC"} 0\n', text)
+        self.assertIn('# TYPE tradesim_compute_latency_seconds summary\n', text)
+
+    def test_client_exports_counters_only(self):
+        client = WebSocketClient(['BTC-USDT'])
+        collector = ClientCollector(lambda: client)
+        self.assertEqual(ClientCollector(lambda: None)(), [])
+
+        client.message_counts['BTC-USDT'] = 5
+        first = render(collector())
+        client.message_counts['BTC-USDT'] = 8
+        # A scrape in between (a second scraper, a manual curl) changes nothing
+        render(collector())
+        second = render(collector())
+        self.assertIn('tradesim_messages_total{symbol="BTC-USDT"} 5\n', first)
+        self.assertIn('tradesim_messages_total{symbol="BTC-USDT"} 8\n', second)
+        self.assertEqual(second, render(collector()))
+        self.assertNotIn('per_second', second)
@@ -0,0 +1,57 @@
+import ast
+import os
+import unittest
+
+import numpy as np
+
+from core.book_walk import DepthLadder
+from core.maker_taker import update_from_ladders
+from core.order_flow import (OrderFlowFeatures, OnlineLogisticRegression, order_flow_imbalance,
+                             sigmoid)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestOrderFlow(unittest.TestCase):
+
+    def test_order_flow_imbalance(self):
+        # Unchanged prices: net change of the resting sizes
+        self.assertEqual(order_flow_imbalance((99, 1, 101, 1), (99, 3, 101, 2)), 2 - 1)
+        # Bid steps up: all of the new bid is buying pressure
+        self.assertEqual(order_flow_imbalance((99, 1, 101, 1), (100, 4, 101, 1)), 4)
+        # Ask steps down: all of the new ask is selling pressure
+        self.assertEqual(order_flow_imbalance((99, 1, 101, 1), (99, 1, 100, 5)), -5)
+
+    def test_ladders_and_levels_give_the_same_features(self):
+        rng = np.random.default_rng(0)
+        from_levels, from_ladders = OrderFlowFeatures(), OrderFlowFeatures()
+        for _ in range(50):
+            mid = 100 + rng.normal()
+            asks = [[mid + 0.05 + 0.1 * j, rng.exponential()] for j in range(10)]
+            bids = [[mid - 0.05 - 0.1 * j, rng.exponential()] for j in range(10)]
+            from_levels.update_book(asks, bids)
+            update_from_ladders(from_ladders, DepthLadder(asks, 'buy'), DepthLadder(bids, 'sell'))
+            side = 'buy' if rng.random() < 0.5 else 'sell'
+            from_levels.update_trade(side)
+            from_ladders.update_trade(side)
+            np.testing.assert_allclose(from_levels.values, from_ladders.values, rtol=1e-12, atol=1e-12)
+
+    def test_predictions_agree_and_never_overflow(self):
+        regression = OnlineLogisticRegression(2)
+        regression.weights[:] = [1.0, -2.0]
+        X = np.array([[1000.0, 0.0], [0.0, 1000.0], [0.3, 0.1]])
+        batch = regression.predict(X)
+        self.assertEqual(batch.tolist(), [regression.predict_proba(x) for x in X])
+        self.assertEqual(batch[0], 1.0)
+        self.assertEqual(batch[1], 0.0)
+        self.assertAlmostEqual(sigmoid(0.0), 0.5)
+
+    def test_trade_simulator_copy_matches(self):
+        def code(*path):
+            with open(os.path.join(ROOT, *path)) as f:
+                module = ast.parse(f.read())
+            # Everything but the module docstring
+            return [ast.dump(node) for node in module.body[1:]]
+
+        self.assertEqual(code('src', 'core', 'order_flow.py'),
+                         code('trade-simulator', 'src', 'models', 'order_flow.py'))
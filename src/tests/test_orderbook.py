@@ -0,0 +1,107 @@
+import unittest
+
+from core.orderbook import (OrderBook, BookOutOfSyncError, okx_checksum,
+                            parse_decimal, format_decimal)
+
+
+def snapshot(asks, bids, seq_id=10):
+    return {
+        'asks': [[price, size, "0", "1"] for price, size in asks],
+        'bids': [[price, size, "0", "1"] for price, size in bids],
+        'seqId': seq_id,
+        'prevSeqId': -1,
+        'ts': "1700000000000",
+        'checksum': okx_checksum(bids, asks)
+    }
+
+
+class TestOrderBook(unittest.TestCase):
+
+    def setUp(self):
+        self.asks = [["100.5", "1.2"], ["101", "3"], ["102.25", "0.5"]]
+        self.bids = [["100", "2"], ["99.5", "1"], ["98", "4.75"]]
+        self.book = OrderBook("BTC-USDT-SWAP")
+        self.book.apply('snapshot', snapshot(self.asks, self.bids))
+
+    def update(self, asks=(), bids=(), seq_id=11, prev_seq_id=10, checksum=None):
+        """Update payload; the checksum defaults to the expected book after applying it"""
+        data = {
+            'asks': [[price, size, "0", "1"] for price, size in asks],
+            'bids': [[price, size, "0", "1"] for price, size in bids],
+            'seqId': seq_id,
+            'prevSeqId': prev_seq_id,
+            'ts': "1700000000100"
+        }
+        if checksum is not None:
+            data['checksum'] = checksum
+        return data
+
+    def test_snapshot_sorts_levels_best_first(self):
+        self.assertTrue(self.book.is_synced)
+        self.assertEqual(self.book.seq_id, 10)
+        self.assertEqual(self.book.top_asks(), [[100.5, 1.2], [101.0, 3.0], [102.25, 0.5]])
+        self.assertEqual(self.book.top_bids(), [[100.0, 2.0], [99.5, 1.0], [98.0, 4.75]])
+        self.assertEqual(self.book.ask_array(2).tolist(), [[100.5, 1.2], [101.0, 3.0]])
+
+    def test_update_inserts_changes_and_deletes(self):
+        asks = [["100.5", "0.7"], ["101", "3"], ["101.5", "2"]]
+        bids = [["99.5", "1"], ["98", "4.75"]]
+        self.book.apply('update', self.update(
+            asks=[["100.5", "0.7"], ["101.5", "2"], ["102.25", "0"]],
+            bids=[["100", "0"]],
+            checksum=okx_checksum(bids, asks)
+        ))
+        self.assertTrue(self.book.is_synced)
+        self.assertEqual(self.book.seq_id, 11)
+        self.assertEqual(self.book.top_asks(), [[100.5, 0.7], [101.0, 3.0], [101.5, 2.0]])
+        self.assertEqual(self.book.top_bids(), [[99.5, 1.0], [98.0, 4.75]])
+        self.assertEqual(self.book.best_bid(), 99.5)
+
+    def test_deleting_a_missing_level_is_ignored(self):
+        self.book.apply('update', self.update(bids=[["97", "0"]]))
+        self.assertEqual(len(self.book.bids), 3)
+
+    def test_checksum_matches_the_levels_as_received(self):
+        self.assertEqual(self.book.checksum(), okx_checksum(self.bids, self.asks))
+
+    def test_checksum_mismatch_marks_the_book_out_of_sync(self):
+        with self.assertRaises(BookOutOfSyncError) as raised:
+            self.book.apply('update', self.update(asks=[["100.5", "1"]], checksum=12345))
+        self.assertEqual(raised.exception.reason, 'checksum')
+        self.assertFalse(self.book.is_synced)
+
+    def test_sequence_gap_marks_the_book_out_of_sync(self):
+        with self.assertRaises(BookOutOfSyncError) as raised:
+            self.book.apply('update', self.update(asks=[["100.5", "1"]], seq_id=13, prev_seq_id=12))
+        self.assertEqual(raised.exception.reason, 'sequence')
+        self.assertFalse(self.book.is_synced)
+        # Nothing of the rejected update was applied
+        self.assertEqual(self.book.top_asks(1), [[100.5, 1.2]])
+
+        with self.assertRaises(BookOutOfSyncError) as raised:
+            self.book.apply('update', self.update(seq_id=14, prev_seq_id=13))
+        self.assertEqual(raised.exception.reason, 'no_snapshot')
+
+    def test_snapshot_resyncs_after_a_gap(self):
+        with self.assertRaises(BookOutOfSyncError):
+            self.book.apply('update', self.update(seq_id=13, prev_seq_id=12))
+        self.book.apply('snapshot', snapshot(self.asks, self.bids, seq_id=20))
+        self.assertTrue(self.book.is_synced)
+        self.assertEqual(self.book.seq_id, 20)
+
+    def test_finer_decimals_rescale_the_side(self):
+        asks = [["100.5", "1.2"], ["100.625", "0.001"], ["101", "3"], ["102.25", "0.5"]]
+        self.book.apply('update', self.update(
+            asks=[["100.625", "0.001"]],
+            checksum=okx_checksum(self.bids, asks)
+        ))
+        self.assertEqual(self.book.asks.price_decimals, 3)
+        self.assertEqual(self.book.asks.size_decimals, 3)
+        self.assertEqual(self.book.top_asks(),
+                         [[100.5, 1.2], [100.625, 0.001], [101.0, 3.0], [102.25, 0.5]])
+        # Levels stored before the rescale still format as they were sent
+        self.assertEqual(self.book.asks.raw_top(4), asks)
+
+    def test_decimal_round_trip(self):
+        for text in ("0.00012", "30000.10", "42", "1.0"):
+            self.assertEqual(format_decimal(*parse_decimal(text)), text)
@@ -0,0 +1,38 @@
+import unittest
+from datetime import datetime
+
+from core.orderbook_processor import OrderbookProcessor
+
+
+class TestOrderQuantityUnits(unittest.TestCase):
+
+    def setUp(self):
+        self.asks = [[30000.0, 0.01], [30010.0, 0.5]]
+        self.bids = [[29990.0, 0.5]]
+        self.processor = OrderbookProcessor(quantity=600.0, fee_tier=0.001, calibrate=False)
+        self.results = self.processor.process_orderbook({
+            'timestamp': datetime.now(), 'asks': self.asks, 'bids': self.bids, 'seq_id': 1
+        })
+
+    def test_slippage_walks_the_usd_notional(self):
+        # 300 USD at the best ask and the other 300 one level up
+        average = 600.0 / (0.01 + 300.0 / 30010.0)
+        self.assertAlmostEqual(self.results['slippage'], (average - 30000.0) / 30000.0 * 600.0)
+        # The same walk in base units needs the converted size
+        base = self.processor.calculate_slippage([[30000.0, 1.0]], 600.0 / 30000.0)
+        self.assertEqual(base, 0.0)
+
+    def test_fees_and_impact_use_the_base_quantity(self):
+        self.assertAlmostEqual(self.results['fees'], 600.0 * 0.001)
+        model = self.processor.market_impact_model
+        self.assertAlmostEqual(self.results['market_impact'],
+                               model.calculate_impact(600.0 / 30000.0, 30000.0))
+
+    def test_net_cost_adds_usd_amounts(self):
+        average = 600.0 / (0.01 + 300.0 / 30010.0)
+        slippage_usd = (average - 30000.0) / 30000.0 * 600.0
+        impact = self.processor.market_impact_model.calculate_impact(600.0 / 30000.0, 30000.0)
+        self.assertAlmostEqual(self.results['net_cost'], slippage_usd + 600.0 * 0.001 + impact)
+
+    def test_order_beyond_the_book_is_infinite(self):
+        self.assertEqual(self.processor.calculate_slippage(self.asks, 1e6, notional=True), float('inf'))
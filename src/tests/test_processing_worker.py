@@ -0,0 +1,111 @@
+import collections
+import time
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from core.dispatcher import SymbolDispatcher
+from core.mailbox import LatestValueMailbox
+from core.orderbook_processor import OrderbookProcessor
+from core.processing_worker import HISTORY_FIELDS, ProcessingWorker
+from core.series import RingSeries
+
+
+def book(symbol: str, best_ask: float, seq_id: int) -> dict:
+    return {
+        'timestamp': datetime.fromtimestamp(1700000000 + seq_id),
+        'symbol': symbol,
+        'seq_id': seq_id,
+        'asks': np.array([[best_ask, 1.0], [best_ask + 1.0, 5.0]]),
+        'bids': np.array([[best_ask - 1.0, 1.0], [best_ask - 2.0, 5.0]])
+    }
+
+
+class TestProcessingWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.books = LatestValueMailbox()
+        self.trades = collections.deque()
+        self.results = LatestValueMailbox()
+        self.dispatcher = SymbolDispatcher(
+            lambda symbol: OrderbookProcessor(quantity=100.0, fee_tier=0.001, calibrate=False))
+        self.seen = []
+        self.history = RingSeries(HISTORY_FIELDS, capacity=64, block=4)
+        self.worker = ProcessingWorker(self.books, self.trades, self.dispatcher, self.results,
+                                       selected_symbol='A', history=self.history,
+                                       on_result=lambda symbol, data, results: self.seen.append(data['seq_id']),
+                                       poll_interval=0.01)
+
+    def wait_until(self, condition, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Timed out waiting for the worker")
+            time.sleep(0.005)
+
+    def test_start_processes_and_stop_joins(self):
+        self.worker.start()
+        self.books.put('A', book('A', 100.0, 1))
+        self.wait_until(lambda: self.worker.processed == 1)
+        self.worker.stop()
+        self.assertFalse(self.worker.is_alive())
+
+        snapshot = self.results.take('A')
+        self.assertEqual(snapshot['symbol'], 'A')
+        self.assertTrue(snapshot['labels']['net_cost'].startswith("Net Cost: "))
+        self.assertEqual(snapshot['values']['fees'], 100.0 * 0.001)
+        self.assertEqual(len(self.history), 1)
+
+    def test_conflates_to_the_newest_book(self):
+        for seq_id in range(1, 6):
+            self.books.put('A', book('A', 100.0 + seq_id, seq_id))
+        self.books.put('B', book('B', 50.0, 1))
+        self.worker.process_pending()
+        self.assertEqual(self.worker.processed, 2)
+        self.assertEqual(sorted(self.seen), [1, 5])
+        # Only the selected symbol is published
+        self.assertEqual(self.results.depth, 1)
+        self.assertEqual(self.results.take('A')['asks'][0, 0], 105.0)
+
+    def test_callback_error_is_reported_and_others_continue(self):
+        def on_result(symbol, data, results):
+            if symbol == 'A':
+                raise RuntimeError("store full")
+            self.seen.append(symbol)
+
+        self.worker.on_result = on_result
+        self.books.put('A', book('A', 100.0, 1))
+        self.books.put('B', book('B', 50.0, 1))
+        with self.assertLogs('core.processing_worker', level='ERROR') as logs:
+            self.worker.process_pending()
+        self.assertIn("store full", logs.output[0])
+        self.assertEqual(self.seen, ['B'])
+
+        # The worker keeps going with the next books
+        self.worker.on_result = None
+        self.books.put('A', book('A', 100.0, 2))
+        self.worker.process_pending()
+        self.assertEqual(self.results.take('A')['symbol'], 'A')
+
+    def test_select_restarts_the_history(self):
+        self.books.put('A', book('A', 100.0, 1))
+        self.worker.process_pending()
+        self.worker.select('B')
+        self.books.put('A', book('A', 100.0, 2))
+        self.books.put('B', book('B', 50.0, 2))
+        self.worker.process_pending()
+        self.assertEqual(len(self.history), 1)
+        self.assertIsNotNone(self.results.take('B'))
+
+    def test_trades_and_removals_apply_before_books(self):
+        self.books.put('A', book('A', 100.0, 1))
+        self.worker.process_pending()
+        model = self.dispatcher.processors['A'].maker_taker_model
+        self.trades.append({'symbol': 'A', 'size': 1.0, 'side': 'buy', 'price': 100.0})
+        self.worker.process_pending()
+        self.assertEqual(model.regression.samples_seen, 1)
+
+        self.worker.remove_symbols(['A'])
+        self.worker.process_pending()
+        self.assertNotIn('A', self.dispatcher.processors)
@@ -0,0 +1,120 @@
+import unittest
+
+import numpy as np
+
+from core.series import RingSeries, depth_curve, minmax_buckets
+
+NAN = np.nan
+
+
+def naive_buckets(t, lo, hi, t0, t1, width):
+    """minmax_buckets one bucket at a time"""
+    edges = np.linspace(t0, t1, width + 1)
+    out_lo = np.full((width, lo.shape[1]), np.nan)
+    out_hi = np.full((width, lo.shape[1]), np.nan)
+    for b in range(width):
+        upper = t <= edges[b + 1] if b == width - 1 else t < edges[b + 1]
+        mask = (t >= edges[b]) & upper
+        if mask.any():
+            out_lo[b] = lo[mask].min(axis=0)
+            out_hi[b] = hi[mask].max(axis=0)
+    return out_lo, out_hi
+
+
+class TestMinmaxBuckets(unittest.TestCase):
+
+    def test_matches_naive_buckets(self):
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            n = int(rng.integers(0, 60))
+            # Rounded times give repeated stamps and empty buckets
+            t = np.sort(np.round(rng.uniform(0, 10, n), 1))
+            lo = rng.normal(size=(n, 2))
+            hi = lo + rng.uniform(0, 1, (n, 2))
+            t0, t1 = sorted(rng.uniform(-1, 11, 2))
+            width = int(rng.integers(1, 40))
+            for got, expected in zip(minmax_buckets(t, lo, hi, t0, t1, width),
+                                     naive_buckets(t, lo, hi, t0, t1, width)):
+                np.testing.assert_array_equal(got, expected)
+
+    def test_sample_at_the_end_is_drawn(self):
+        t = np.array([0.0, 1.0, 2.0])
+        y = np.array([[1.0], [2.0], [3.0]])
+        lo, hi = minmax_buckets(t, y, y, 0.0, 2.0, 2)
+        np.testing.assert_array_equal(lo, [[1.0], [2.0]])
+        np.testing.assert_array_equal(hi, [[1.0], [3.0]])
+
+
+class TestRingSeries(unittest.TestCase):
+
+    def filled(self, n: int, capacity: int, block: int = 4):
+        rng = np.random.default_rng(n)
+        series = RingSeries(('a', 'b'), capacity=capacity, block=block)
+        values = rng.normal(size=(n, 2))
+        for i, row in enumerate(values):
+            series.append(float(i), row)
+        return series, np.arange(n, dtype=float), values
+
+    def test_wraps_around(self):
+        series, t, values = self.filled(80, capacity=32)
+        self.assertEqual(len(series), 32)
+        self.assertEqual(series.appended, 80)
+        self.assertEqual(series.time_range(), (48.0, 79.0))
+        np.testing.assert_array_equal(series.latest(), values[-1])
+
+        series.clear()
+        self.assertEqual(len(series), 0)
+        self.assertIsNone(series.time_range())
+        self.assertIsNone(series.envelope(10))
+
+    def test_capacity_rounds_up_to_whole_blocks(self):
+        self.assertEqual(RingSeries(('a',), capacity=30, block=4).capacity, 32)
+
+    def test_blocks_fold_min_and_max(self):
+        series, _, values = self.filled(12, capacity=32)
+        for b in range(3):
+            np.testing.assert_array_equal(series._block_lo[b], values[4 * b:4 * b + 4].min(axis=0))
+            np.testing.assert_array_equal(series._block_hi[b], values[4 * b:4 * b + 4].max(axis=0))
+            self.assertEqual(series._block_t[b], 4.0 * b)
+
+    def test_raw_envelope(self):
+        series, t, values = self.filled(20, capacity=32)
+        # 20 samples fit in block * width, so they are read raw
+        t0, t1, lo, hi = series.envelope(7)
+        self.assertEqual((t0, t1), (0.0, 19.0))
+        for got, expected in zip((lo, hi), naive_buckets(t, values, values, t0, t1, 7)):
+            np.testing.assert_array_equal(got, expected)
+
+    def test_block_envelope_with_open_block(self):
+        # Bucket edges on block boundaries make the block envelope exact;
+        # the two samples of the open block are read raw
+        series, t, values = self.filled(66, capacity=128)
+        _, _, lo, hi = series.envelope(3, 0.0, 72.0)
+        for got, expected in zip((lo, hi), naive_buckets(t, values, values, 0.0, 72.0, 3)):
+            np.testing.assert_array_equal(got, expected)
+
+    def test_block_envelope_after_wraparound(self):
+        series, t, values = self.filled(80, capacity=32)
+        t0, t1, lo, hi = series.envelope(2)
+        kept = slice(48, 80)
+        for got, expected in zip((lo, hi), naive_buckets(t[kept], values[kept], values[kept], t0, t1, 2)):
+            np.testing.assert_array_equal(got, expected)
+
+
+class TestDepthCurve(unittest.TestCase):
+
+    def test_cumulative_steps_on_the_grid(self):
+        asks = [[101.0, 1.0], [102.0, 2.0]]
+        bids = [[99.0, 1.0], [98.0, 3.0]]
+        prices, bid_curve, ask_curve = depth_curve(asks, bids, 5, span=2.0)
+        np.testing.assert_array_equal(prices, [98.0, 99.0, 100.0, 101.0, 102.0])
+        np.testing.assert_array_equal(bid_curve, [4.0, 1.0, 0.0, NAN, NAN])
+        np.testing.assert_array_equal(ask_curve, [NAN, NAN, 0.0, 1.0, 3.0])
+
+    def test_default_span_is_the_shallower_side(self):
+        prices, _, _ = depth_curve([[101.0, 1.0], [105.0, 1.0]], [[99.0, 1.0], [98.0, 1.0]], 3)
+        np.testing.assert_array_equal(prices, [98.0, 100.0, 102.0])
+
+    def test_empty_or_narrow(self):
+        self.assertIsNone(depth_curve([], [[99.0, 1.0]], 10))
+        self.assertIsNone(depth_curve([[101.0, 1.0]], [[99.0, 1.0]], 1))
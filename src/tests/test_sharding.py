@@ -0,0 +1,87 @@
+import json
+import os
+import queue
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from core.sharding import SharedBookTable, ShardedEngine, _worker_main, result_to_dict
+from core.stub_server import StubOKXServer
+from headless import parse_args, run_sharded
+
+SYMBOLS = ['SIM0-USDT', 'SIM1-USDT', 'SIM2-USDT', 'SIM3-USDT']
+
+
+class TestSharedBookTable(unittest.TestCase):
+
+    def test_publish_and_read_a_row(self):
+        table = SharedBookTable(2, depth=3)
+        self.addCleanup(table.close)
+        self.assertIsNone(table.read(1))
+        asks = np.array([[101.0, 1.0], [102.0, 2.0]])
+        bids = np.array([[99.0, 3.0]])
+        table.publish(1, asks, bids, seq_id=7, ts=1700000000000)
+        version, read_asks, read_bids, seq_id, ts = table.read(1)
+        self.assertEqual(version, 2)
+        self.assertEqual(read_asks.tolist(), asks.tolist())
+        self.assertEqual(read_bids.tolist(), bids.tolist())
+        self.assertEqual((seq_id, ts), (7, 1700000000000))
+
+    def test_round_robin_shards(self):
+        engine = ShardedEngine(SYMBOLS, quantity=100.0, fee_tier=0.001, workers=2)
+        self.assertEqual(engine.shards(), [[(0, SYMBOLS[0]), (2, SYMBOLS[2])],
+                                           [(1, SYMBOLS[1]), (3, SYMBOLS[3])]])
+
+
+class TestWorker(unittest.TestCase):
+
+    def test_books_without_seq_id_are_not_cached_as_one(self):
+        table = SharedBookTable(1, depth=3)
+        self.addCleanup(table.close)
+        results = queue.Queue()
+        stop = threading.Event()
+        worker = threading.Thread(target=_worker_main,
+                                  args=(table.name, 1, 3, [(0, SYMBOLS[0])], 150.0, 0.001, results, stop, 0.001))
+        worker.start()
+        self.addCleanup(worker.join)
+        self.addCleanup(stop.set)
+
+        bids = np.array([[99.0, 10.0]])
+        # Two books5-style pushes, both without a seqId
+        table.publish(0, np.array([[100.0, 1.0], [110.0, 10.0]]), bids, seq_id=0, ts=1700000000000)
+        first = result_to_dict(results.get(timeout=5))
+        table.publish(0, np.array([[100.0, 10.0]]), bids, seq_id=0, ts=1700000000001)
+        second = result_to_dict(results.get(timeout=5))
+
+        self.assertGreater(first['slippage'], 0.0)
+        self.assertEqual(second['slippage'], 0.0)
+        self.assertEqual(second['seq_id'], 0)
+
+
+class TestShardedHeadless(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = StubOKXServer(port=0, depth=50, update_rate=50, instruments=SYMBOLS, seed=6)
+        await self.server.start()
+        self.dir = tempfile.TemporaryDirectory()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+        self.dir.cleanup()
+
+    async def test_every_worker_reports_its_symbols(self):
+        output = os.path.join(self.dir.name, 'results.ndjson')
+        args = parse_args(['--symbols', *SYMBOLS, '--workers', '2', '--depth', '50',
+                           '--url', self.server.url, '--output', output, '--duration', '4'])
+        self.assertEqual(await run_sharded(args), 0)
+
+        with open(output) as f:
+            records = [json.loads(line) for line in f]
+        # Each worker owns two of the symbols, so results from both shards
+        # mean both workers ran
+        self.assertEqual({record['symbol'] for record in records}, set(SYMBOLS))
+        for record in records:
+            self.assertGreaterEqual(record['net_cost'], 0.0)
+            self.assertGreater(record['seq_id'], 0)
@@ -0,0 +1,53 @@
+import asyncio
+import io
+import json
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from core.sinks import NDJSONSink, ParquetSink, open_sink, result_record
+
+
+class TestResultRecord(unittest.TestCase):
+
+    def test_non_finite_values_become_null(self):
+        data = {'timestamp': datetime(2024, 1, 2, 3, 4, 5), 'symbol': 'BTC-USDT', 'seq_id': 7}
+        results = {'slippage': float('inf'), 'fees': np.float64(0.1), 'market_impact': float('nan'),
+                   'net_cost': float('inf'), 'maker_proportion': 0.25, 'taker_proportion': 0.75,
+                   'processing_latency': 0.5}
+        record = result_record(data, results)
+        self.assertEqual(record['timestamp'], '2024-01-02T03:04:05')
+        self.assertIsNone(record['slippage'])
+        self.assertIsNone(record['market_impact'])
+        self.assertEqual(record['fees'], 0.1)
+        self.assertIs(type(record['fees']), float)
+
+        sink = NDJSONSink(stream=io.StringIO())
+        sink.write(record)
+        line = sink.stream.getvalue()
+        self.assertNotIn('Infinity', line)
+        self.assertIsNone(json.loads(line)['net_cost'])
+
+    def test_raw_non_finite_values_are_rejected(self):
+        sink = NDJSONSink(stream=io.StringIO())
+        with self.assertRaises(ValueError):
+            sink.write({'slippage': float('inf')})
+
+
+class TestOpenSink(unittest.TestCase):
+
+    def test_format_from_extension(self):
+        self.assertIsInstance(open_sink('-'), NDJSONSink)
+        self.assertIsInstance(open_sink('costs.parquet'), ParquetSink)
+        with self.assertRaises(ValueError):
+            open_sink('costs.xlsx')
+
+    def test_parquet_without_pyarrow_fails_clearly(self):
+        try:
+            import pyarrow  # noqa: F401
+            self.skipTest("pyarrow is installed")
+        except ImportError:
+            pass
+        with self.assertRaisesRegex(RuntimeError, 'pyarrow'):
+            asyncio.run(ParquetSink('costs.parquet').open())
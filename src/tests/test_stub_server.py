@@ -0,0 +1,73 @@
+import asyncio
+import json
+import unittest
+
+import websockets
+
+from core.orderbook import OrderBook, okx_checksum
+from core.stub_server import SyntheticBook, StubOKXServer
+
+
+class TestSyntheticBook(unittest.TestCase):
+
+    def test_checksum_matches_the_levels_sent(self):
+        book = SyntheticBook('SIM-USDT', depth=50, seed=3)
+        snapshot = book.snapshot()
+        self.assertEqual(snapshot['checksum'], okx_checksum(snapshot['bids'], snapshot['asks']))
+
+    def test_client_book_follows_the_stream(self):
+        book = SyntheticBook('SIM-USDT', depth=50, seed=4)
+        client = OrderBook('SIM-USDT')
+        client.apply_snapshot(book.snapshot())
+        for _ in range(500):
+            # Raises on any sequence or checksum mismatch
+            client.apply_update(book.step(0.01))
+        self.assertAlmostEqual(client.top_asks(1)[0][0], min(book.asks) * book.tick_size)
+
+
+class TestStubKeepalive(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = StubOKXServer(port=0, seed=5)
+        await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+
+    async def test_plain_text_ping_pong(self):
+        async with websockets.connect(self.server.url) as websocket:
+            await websocket.send('ping')
+            self.assertEqual(await websocket.recv(), 'pong')
+
+
+class TestStubSubscribe(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = StubOKXServer(port=0, depth=50, update_rate=200, instruments=['SIM-USDT'], seed=6)
+        await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+
+    async def test_first_update_follows_the_snapshot(self):
+        async with websockets.connect(self.server.url) as websocket:
+            # Slow every server-side send down, so the stream keeps
+            # broadcasting while a subscription is being answered
+            connection, = self.server._connections
+            send = connection.send
+
+            async def slow_send(message):
+                await asyncio.sleep(0.05)
+                await send(message)
+
+            connection.send = slow_send
+            arg = {'channel': 'books', 'instId': 'SIM-USDT'}
+            await websocket.send(json.dumps({'op': 'subscribe', 'args': [arg]}))
+            pushes = []
+            while len(pushes) < 2:
+                message = json.loads(await websocket.recv())
+                if 'data' in message:
+                    pushes.append(message)
+        snapshot, update = pushes
+        self.assertEqual((snapshot['action'], update['action']), ('snapshot', 'update'))
+        self.assertEqual(update['data'][0]['prevSeqId'], snapshot['data'][0]['seqId'])
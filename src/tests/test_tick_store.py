@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+import numpy as np
+
+from core.tick_store import METRIC_COLUMNS, DayPartition, TickStore
+
+# 2024-01-01 23:59:59.000 UTC
+LATE = int(datetime(2024, 1, 1, 23, 59, 59, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def book(i, ts_ms):
+    data = {
+        'timestamp': ts_ms,
+        'seq_id': i,
+        'asks': [[100.0 + i + 0.1 * j, 1.0 + j] for j in range(3)],
+        'bids': [[99.0 + i - 0.1 * j, 2.0 + j] for j in range(3)]
+    }
+    results = {name: float(i) + k / 10 for k, name in enumerate(METRIC_COLUMNS)}
+    return data, results
+
+
+class TestTickStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.root = self.dir.name
+
+    def test_append_grows_past_the_preallocated_capacity(self):
+        store = TickStore(self.root, top_n=5, capacity=4, flush_every=3)
+        for i in range(10):
+            store.append('BTC-USDT', *book(i, LATE - 10_000 + i))
+        partition = store._current['BTC-USDT'][1]
+        self.assertEqual(partition.capacity, 16)
+        data = store.read('BTC-USDT')
+        self.assertEqual(data['seq_id'].tolist(), list(range(10)))
+        self.assertEqual(data['net_cost'].tolist(), [i + 0.3 for i in range(10)])
+        # Levels beyond the book's depth are NaN
+        self.assertEqual(data['ask_px'].shape, (10, 5))
+        self.assertEqual(data['ask_px'][9, :3].tolist(), [109.0, 109.1, 109.2])
+        self.assertTrue(np.isnan(data['bid_sz'][9, 3:]).all())
+        store.close()
+
+    def test_read_across_a_day_boundary(self):
+        store = TickStore(self.root, capacity=4)
+        stamps = [LATE + 400 * i for i in range(6)]     # crosses midnight after the third row
+        for i, ts in enumerate(stamps):
+            store.append('BTC-USDT', *book(i, ts))
+        store.close()
+
+        reader = TickStore(self.root, readonly=True)
+        self.assertEqual(reader.days('BTC-USDT'), ['2024-01-01', '2024-01-02'])
+        self.assertEqual(reader.read('BTC-USDT')['ts'].tolist(), stamps)
+        # Half-open range spanning both partitions
+        window = reader.read('BTC-USDT', stamps[1], stamps[4], columns=['ts', 'seq_id'])
+        self.assertEqual(set(window), {'ts', 'seq_id'})
+        self.assertEqual(window['seq_id'].tolist(), [1, 2, 3])
+        # A range inside the second day skips the first
+        self.assertEqual(reader.read('BTC-USDT', stamps[4])['seq_id'].tolist(), [4, 5])
+        self.assertEqual(len(reader.read('ETH-USDT')['ts']), 0)
+
+    def test_out_of_order_rows_fall_back_to_a_mask(self):
+        partition = DayPartition(os.path.join(self.root, 'part'), top_n=1, capacity=4)
+        for ts in (10, 30, 20):
+            partition.append(ts, None, [0.0] * len(METRIC_COLUMNS), [[1.0, 1.0]], [[0.5, 1.0]])
+        self.assertFalse(partition.sorted)
+        self.assertEqual(partition.select(15, 31).tolist(), [1, 2])
+        partition.close()
+
+        reopened = DayPartition(os.path.join(self.root, 'part'), readonly=True)
+        self.assertEqual(reopened.rows, 3)
+        self.assertEqual(reopened.columns['seq_id'].tolist(), [-1, -1, -1])
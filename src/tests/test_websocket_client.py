@@ -0,0 +1,108 @@
+import asyncio
+import time
+import unittest
+
+from core.dispatcher import SymbolDispatcher
+from core.orderbook_processor import OrderbookProcessor
+from core.stub_server import StubOKXServer
+from core.websocket_client import WebSocketClient
+
+SYMBOLS = ['SIMA-USDT', 'SIMB-USDT']
+
+
+class StubTestCase(unittest.IsolatedAsyncioTestCase):
+    """A client streaming SYMBOLS from a local stub server"""
+
+    async def asyncSetUp(self):
+        self.server = StubOKXServer(port=0, depth=50, update_rate=100, instruments=SYMBOLS, seed=9)
+        await self.server.start()
+        self.client = WebSocketClient(SYMBOLS, url=self.server.url, trades=False, initial_backoff=0.05)
+        self.books = {symbol: 0 for symbol in SYMBOLS}
+
+        async def on_book(data):
+            self.books[data['symbol']] += 1
+
+        self.client.add_callback(on_book)
+        self.task = asyncio.create_task(self.client.start())
+        await self.wait_until(lambda: all(self.books.values()))
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await asyncio.wait_for(self.task, 5)
+        await self.server.stop()
+
+    async def wait_until(self, condition, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Timed out waiting for the client")
+            await asyncio.sleep(0.01)
+
+    async def books_flow(self, symbols=SYMBOLS):
+        """Wait until every symbol has delivered more books"""
+        seen = dict(self.books)
+        await self.wait_until(lambda: all(self.books[s] > seen[s] + 5 for s in symbols))
+
+
+class TestReconnect(StubTestCase):
+
+    async def test_dropped_connection_reconnects_and_resyncs(self):
+        self.assertEqual(await self.server.drop_connections(), 1)
+        await self.wait_until(lambda: self.client.reconnects == 1)
+        await self.books_flow()
+
+        # Every book was reset and rebuilt from the new connection's snapshot
+        self.assertEqual(self.client.resync_latency.count, len(SYMBOLS))
+        self.assertEqual(self.client._resyncing, {})
+        self.assertEqual(self.client.book_gaps, {})
+        for book in self.client.books.values():
+            self.assertTrue(book.is_synced)
+
+    async def test_gap_resubscribes_the_affected_symbol_only(self):
+        sent = []
+        send_channel = self.client._send_channel
+
+        async def record(op, symbol, channel):
+            sent.append((op, symbol, channel))
+            await send_channel(op, symbol, channel)
+
+        self.client._send_channel = record
+        # Lose one update of the first instrument
+        self.server.books[SYMBOLS[0]].seq_id += 1
+        await self.wait_until(lambda: self.client.resync_latency.count == 1)
+        await self.books_flow()
+
+        self.assertEqual(self.client.book_gaps, {SYMBOLS[0]: 1})
+        self.assertEqual(sent, [('unsubscribe', SYMBOLS[0], 'books'), ('subscribe', SYMBOLS[0], 'books')])
+        self.assertEqual(self.client.reconnects, 0)
+
+
+class TestSymbols(StubTestCase):
+
+    async def test_instruments_come_and_go_on_one_connection(self):
+        dispatcher = SymbolDispatcher(lambda symbol: OrderbookProcessor(quantity=100.0, fee_tier=0.001))
+        processed = set()
+        dispatcher.add_callback(lambda symbol, results: processed.add(symbol))
+        self.client.add_callback(dispatcher)
+        await self.wait_until(lambda: processed == set(SYMBOLS))
+        self.assertEqual(set(dispatcher.processors), set(SYMBOLS))
+
+        kept, removed = SYMBOLS
+        await self.client.remove_symbols([removed])
+        dispatcher.remove([removed])
+        await self.wait_until(lambda: not self.server.subscribers['books'][removed])
+        count = self.books[removed]
+        await self.books_flow([kept])
+        self.assertEqual(self.books[removed], count)
+        self.assertNotIn(removed, self.client.books)
+        self.assertNotIn(removed, self.client.channels)
+        self.assertEqual(set(dispatcher.processors), {kept})
+        self.assertTrue(self.server.subscribers['books'][kept])
+
+        added = 'SIMC-USDT'
+        self.books[added] = 0
+        await self.client.add_symbols([added])
+        await self.books_flow([kept, added])
+        self.assertEqual(set(dispatcher.processors), {kept, added})
+        self.assertEqual(self.client.reconnects, 0)
+        self.assertEqual(self.client.book_gaps, {})
@@ -0,0 +1,179 @@
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox
+from PyQt6.QtGui import QPainter, QPen, QColor, QBrush, QPolygonF
+from PyQt6.QtCore import Qt, QPointF, QLineF, QRectF
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from core.series import RingSeries, depth_curve
+
+BID_COLOR = QColor(38, 166, 91)
+ASK_COLOR = QColor(214, 69, 65)
+LINE_COLOR = QColor(52, 120, 200)
+GRID_COLOR = QColor(220, 220, 220)
+TEXT_COLOR = QColor(90, 90, 90)
+
+# Book levels per side the depth chart needs to show a useful curve
+DEPTH_CHART_LEVELS = 20
+
+# Windows offered by the history panel, in seconds (None for everything held)
+HISTORY_WINDOWS = {'5 min': 300, '15 min': 900, '1 hour': 3600, 'All': None}
+
+
+def _to_pixels(values: np.ndarray, low: float, high: float, top: float, height: float) -> np.ndarray:
+    """Map values onto pixel rows, high at the top"""
+    span = high - low if high > low else 1.0
+    return top + height * (1.0 - (values - low) / span)
+
+
+class DepthChart(QWidget):
+    """
+    Cumulative bid and ask liquidity around the mid.
+
+    The curve is sampled once per pixel column when a book is set (on the
+    UI timer tick); paint events only draw the prepared polygons.
+    """
+
+    MARGIN = 6
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.setMinimumHeight(180)
+        self._bid_polygon = QPolygonF()
+        self._ask_polygon = QPolygonF()
+        self._caption = ""
+
+    def set_book(self, asks: np.ndarray, bids: np.ndarray):
+        width = max(self.width() - 2 * self.MARGIN, 2)
+        curve = depth_curve(asks, bids, width)
+        if curve is None:
+            return
+        prices, bid_curve, ask_curve = curve
+        height = self.height() - 2 * self.MARGIN - 14
+        peak = np.nanmax(np.concatenate((bid_curve, ask_curve)))
+        xs = self.MARGIN + np.arange(width, dtype=np.float64)
+        base = self.MARGIN + height
+
+        polygons = []
+        for cum in (bid_curve, ask_curve):
+            shown = ~np.isnan(cum)
+            x, y = xs[shown], _to_pixels(cum[shown], 0.0, peak, self.MARGIN, height)
+            # Close the area down to the axis
+            points = [QPointF(x[0], base)] if len(x) else []
+            points += [QPointF(px, py) for px, py in zip(x.tolist(), y.tolist())]
+            if len(x):
+                points.append(QPointF(x[-1], base))
+            polygons.append(QPolygonF(points))
+        self._bid_polygon, self._ask_polygon = polygons
+
+        mid = (prices[0] + prices[-1]) / 2
+        self._caption = (f"{prices[0]:.2f}    mid {mid:.2f}    {prices[-1]:.2f}    "
+                         f"max cumulative size {peak:.4g}")
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.GlobalColor.white)
+        painter.setPen(QPen(BID_COLOR, 1))
+        painter.setBrush(QBrush(QColor(BID_COLOR.red(), BID_COLOR.green(), BID_COLOR.blue(), 70)))
+        painter.drawPolygon(self._bid_polygon)
+        painter.setPen(QPen(ASK_COLOR, 1))
+        painter.setBrush(QBrush(QColor(ASK_COLOR.red(), ASK_COLOR.green(), ASK_COLOR.blue(), 70)))
+        painter.drawPolygon(self._ask_polygon)
+        painter.setPen(TEXT_COLOR)
+        painter.drawText(QRectF(0, self.height() - 16, self.width(), 16),
+                         Qt.AlignmentFlag.AlignCenter, self._caption)
+        painter.end()
+
+
+class TimeSeriesChart(QWidget):
+    """One field of a RingSeries drawn as a per-pixel min/max envelope"""
+
+    MARGIN = 6
+
+    def __init__(self, title: str, unit: str = "", parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.title = title
+        self.unit = unit
+        self.setMinimumHeight(90)
+        self._lines: List[QLineF] = []
+        self._caption = title
+
+    def plot_width(self) -> int:
+        return max(self.width() - 2 * self.MARGIN, 1)
+
+    def set_envelope(self, lo: np.ndarray, hi: np.ndarray, latest: Optional[float] = None):
+        """Prepare one vertical line per pixel column from its min to its max"""
+        shown = ~np.isnan(lo)
+        if not shown.any():
+            self._lines = []
+            self.update()
+            return
+        low, high = float(np.min(lo[shown])), float(np.max(hi[shown]))
+        height = self.height() - 2 * self.MARGIN
+        x = (self.MARGIN + np.flatnonzero(shown)).astype(np.float64)
+        y_lo = _to_pixels(lo[shown], low, high, self.MARGIN, height)
+        y_hi = _to_pixels(hi[shown], low, high, self.MARGIN, height)
+        # A flat bucket still needs one visible pixel
+        y_hi = np.minimum(y_hi, y_lo - 1.0)
+        self._lines = [QLineF(px, a, px, b) for px, a, b in zip(x.tolist(), y_lo.tolist(), y_hi.tolist())]
+
+        value = f"{latest:.4f}" if latest is not None else "--"
+        self._caption = f"{self.title}: {value} {self.unit}   [{low:.4g} .. {high:.4g}]"
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.GlobalColor.white)
+        painter.setPen(QPen(GRID_COLOR, 1))
+        painter.drawRect(self.rect().adjusted(0, 0, -1, -1))
+        painter.setPen(QPen(LINE_COLOR, 1))
+        if self._lines:
+            painter.drawLines(self._lines)
+        painter.setPen(TEXT_COLOR)
+        painter.drawText(QRectF(self.MARGIN, 2, self.width(), 14),
+                         Qt.AlignmentFlag.AlignLeft, self._caption)
+        painter.end()
+
+
+class CostHistoryPanel(QWidget):
+    """Stacked time-series charts of several RingSeries fields over a selectable window"""
+
+    def __init__(self, charts: Dict[str, Sequence[str]], parent: Optional[QWidget] = None):
+        """
+        Args:
+            charts: Field name -> (title, unit), in display order
+        """
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        window_layout = QHBoxLayout()
+        window_layout.addWidget(QLabel("History:"))
+        self.window_combo = QComboBox()
+        self.window_combo.addItems(list(HISTORY_WINDOWS))
+        window_layout.addWidget(self.window_combo)
+        window_layout.addStretch()
+        layout.addLayout(window_layout)
+
+        self.charts: Dict[str, TimeSeriesChart] = {}
+        for field, (title, unit) in charts.items():
+            chart = TimeSeriesChart(title, unit)
+            self.charts[field] = chart
+            layout.addWidget(chart)
+
+    def refresh(self, series: RingSeries):
+        """Recompute every envelope from the series; call on the UI timer tick"""
+        time_range = series.time_range()
+        if time_range is None:
+            return
+        window = HISTORY_WINDOWS[self.window_combo.currentText()]
+        t0 = time_range[1] - window if window else None
+        width = min(chart.plot_width() for chart in self.charts.values())
+        envelope = series.envelope(width, t0)
+        if envelope is None:
+            return
+        _, _, lo, hi = envelope
+        latest = series.latest()
+        for field, chart in self.charts.items():
+            i = series.fields.index(field)
+            chart.set_envelope(lo[:, i], hi[:, i], float(latest[i]) if latest is not None else None)
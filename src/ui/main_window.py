@@ -5,6 +5,17 @@ import logging
 from typing import Dict
 import json
 
+from .charts import DepthChart, CostHistoryPanel
+from core.series import RingSeries
+
+# Chart history fields with their titles and units
+HISTORY_CHARTS = {
+    'slippage': ("Slippage", "USD"),
+    'market_impact': ("Market Impact", "USD"),
+    'net_cost': ("Net Cost", "USD"),
+    'processing_latency': ("Processing Latency", "ms")
+}
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -29,9 +40,14 @@ class MainWindow(QMainWindow):
         right_panel = self.create_output_panel()
         main_layout.addWidget(right_panel)
         
+        # Create chart panel (Depth and cost history)
+        chart_panel = self.create_chart_panel()
+        main_layout.addWidget(chart_panel)
+        
         # Set layout proportions
         main_layout.setStretch(0, 1)  # Left panel
         main_layout.setStretch(1, 1)  # Right panel
+        main_layout.setStretch(2, 2)  # Chart panel
         
     def create_input_panel(self) -> QGroupBox:
         """Create the input parameters panel"""
@@ -105,6 +121,8 @@ class MainWindow(QMainWindow):
         self.net_cost_label = QLabel("Net Cost: --")
         self.maker_taker_label = QLabel("Maker/Taker Proportion: --")
         self.latency_label = QLabel("Internal Latency: --")
+        self.staleness_label = QLabel("End-to-End Latency: --")
+        self.connection_label = QLabel("Connection: --")
         
         # Add labels to layout
         layout.addWidget(self.slippage_label)
@@ -113,6 +131,8 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.net_cost_label)
         layout.addWidget(self.maker_taker_label)
         layout.addWidget(self.latency_label)
+        layout.addWidget(self.staleness_label)
+        layout.addWidget(self.connection_label)
         
         # Add stretch to push labels to the top
         layout.addStretch()
@@ -120,28 +140,72 @@ class MainWindow(QMainWindow):
         panel.setLayout(layout)
         return panel
         
-    def update_outputs(self, data: Dict):
-        """Update the output parameters with new data"""
+    def create_chart_panel(self) -> QGroupBox:
+        """Create the depth chart and cost history panel"""
+        panel = QGroupBox("Market View")
+        layout = QVBoxLayout()
+        
+        self.depth_chart = DepthChart()
+        self.history_panel = CostHistoryPanel(HISTORY_CHARTS)
+        layout.addWidget(self.depth_chart, 1)
+        layout.addWidget(self.history_panel, 2)
+        
+        panel.setLayout(layout)
+        return panel
+        
+    def update_outputs(self, snapshot: Dict):
+        """Update the output parameters from a snapshot formatted by the processing worker"""
         try:
-            self.slippage_label.setText(f"Expected Slippage: {data.get('slippage', 0):.4f}")
-            self.fees_label.setText(f"Expected Fees: {data.get('fees', 0):.4f}")
-            self.market_impact_label.setText(f"Expected Market Impact: {data.get('market_impact', 0):.4f}")
-            self.net_cost_label.setText(f"Net Cost: {data.get('net_cost', 0):.4f}")
+            labels = snapshot['labels']
+            self.slippage_label.setText(labels['slippage'])
+            self.fees_label.setText(labels['fees'])
+            self.market_impact_label.setText(labels['market_impact'])
+            self.net_cost_label.setText(labels['net_cost'])
+            self.maker_taker_label.setText(labels['maker_taker'])
             
-            maker_prop = data.get('maker_proportion', 0)
-            taker_prop = data.get('taker_proportion', 0)
-            self.maker_taker_label.setText(
-                f"Maker/Taker Proportion: {maker_prop:.2f}/{taker_prop:.2f}"
-            )
+        except Exception as e:
+            self.logger.error(f"Error updating outputs: {str(e)}")
             
-            latency = data.get('processing_latency', 0)
-            avg_latency = data.get('avg_processing_latency', 0)
+    def update_charts(self, snapshot: Dict, history: RingSeries):
+        """Redraw the depth chart from a snapshot (if any) and the history panel from its series"""
+        try:
+            if snapshot and snapshot.get('asks') is not None:
+                self.depth_chart.set_book(snapshot['asks'], snapshot['bids'])
+            self.history_panel.refresh(history)
+            
+        except Exception as e:
+            self.logger.error(f"Error updating charts: {str(e)}")
+            
+    @staticmethod
+    def _format_percentiles(stats: Dict) -> str:
+        """Format a latency histogram snapshot as p50/p99/p99.9/max"""
+        if not stats.get('count'):
+            return "--"
+        return (f"p50 {stats['p50_ms']:.2f} / p99 {stats['p99_ms']:.2f} / "
+                f"p99.9 {stats['p99.9_ms']:.2f} / max {stats['max_ms']:.2f} ms")
+            
+    def update_latency(self, latency: Dict):
+        """Update the latency labels from a LatencyTracer snapshot"""
+        try:
             self.latency_label.setText(
-                f"Internal Latency: {latency:.2f}ms (Avg: {avg_latency:.2f}ms)"
+                f"Internal Latency: {self._format_percentiles(latency.get('internal', {}))}"
+            )
+            self.staleness_label.setText(
+                f"End-to-End Latency: {self._format_percentiles(latency.get('end_to_end', {}))}"
             )
-            
         except Exception as e:
-            self.logger.error(f"Error updating outputs: {str(e)}")
+            self.logger.error(f"Error updating latency: {str(e)}")
+            
+    def update_connection(self, reconnects: int, gaps: int, resync_ms: float):
+        """Update the connection health label"""
+        self.connection_label.setText(
+            f"Connection: {reconnects} reconnects, {gaps} book gaps, "
+            f"resync p50 {resync_ms:.1f} ms" if reconnects or gaps else "Connection: OK"
+        )
+            
+    def show_error(self, message: str):
+        """Show an error in the status bar"""
+        self.statusBar().showMessage(f"Error: {message}", 10000)
             
     def get_input_parameters(self) -> Dict:
         """Get current input parameters"""
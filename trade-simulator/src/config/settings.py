@@ -8,11 +8,15 @@ DEFAULT_EXCHANGE = "OKX"
 DEFAULT_SPOT_ASSET = "BTC-USDT"
 DEFAULT_ORDER_TYPE = "market"
 DEFAULT_QUANTITY = 100  # USD equivalent
-DEFAULT_VOLATILITY = 0.02  # Example volatility
 DEFAULT_FEE_TIER = "standard"
 
 # Model parameters
 SLIPPAGE_MODEL_TYPE = "linear"  # Options: "linear", "quantile"
+SLIPPAGE_QUANTILE = 0.9  # Quantile fitted when SLIPPAGE_MODEL_TYPE is "quantile"
+SLIPPAGE_MODEL_PATH = "slippage_model.npz"  # Saved slippage coefficients, loaded at startup when present
+SLIPPAGE_TRAINING_SESSION = None  # Recording (see read_session) fitted at startup when no saved model exists
+MARKET_STATS_WINDOWS = (10, 60, 300)  # Seconds over which volatility, spread and depth are rolled
+IMPACT_HORIZON = 60.0  # Seconds over which market impact volatility is scaled
 MAKER_TAKER_MODEL_TYPE = "logistic"  # Options: "logistic", "other"
 
 # Logging settings
@@ -4,21 +4,32 @@ import json
 from ui.input_panel import InputPanel
 from ui.output_panel import OutputPanel
 from websocket.l2_orderbook import L2OrderBook
-from models.slippage_model import SlippageModel
+from models.slippage_model import load_or_train
 from models.fee_model import FeeModel
 from models.market_impact_model import MarketImpactModel
 from models.maker_taker_model import MakerTakerModel
-from utils.logger import Logger
+from models.market_stats import MarketStats
+from utils.logger import Logger, get_logger
 from utils.error_handler import ErrorHandler
+from config.settings import (SLIPPAGE_MODEL_TYPE, SLIPPAGE_QUANTILE, SLIPPAGE_MODEL_PATH, SLIPPAGE_TRAINING_SESSION,
+                             MARKET_STATS_WINDOWS, IMPACT_HORIZON)
+
+logger = get_logger(__name__)
 
 class TradeSimulator:
     def __init__(self):
         self.input_panel = InputPanel()
         self.output_panel = OutputPanel()
         self.order_book = L2OrderBook(self.process_order_book)
-        self.slippage_model = SlippageModel()
+        # One set of rolling market statistics, fed per book and read by the models
+        self.market_stats = MarketStats(windows=MARKET_STATS_WINDOWS)
+        self.slippage_model = load_or_train(SLIPPAGE_MODEL_PATH, SLIPPAGE_TRAINING_SESSION, SLIPPAGE_MODEL_TYPE,
+                                            quantile=SLIPPAGE_QUANTILE, stats=self.market_stats)
+        if not self.slippage_model.samples_seen:
+            logger.warning("Slippage model is untrained and will estimate 0; set SLIPPAGE_MODEL_PATH "
+                           "to saved coefficients or SLIPPAGE_TRAINING_SESSION to a recording")
         self.fee_model = FeeModel()
-        self.market_impact_model = MarketImpactModel()
+        self.market_impact_model = MarketImpactModel(self.market_stats, horizon=IMPACT_HORIZON)
         self.maker_taker_model = MakerTakerModel()
         self.logger = Logger()
         self.error_handler = ErrorHandler()
@@ -35,9 +46,13 @@ class TradeSimulator:
 
     def process_order_book(self, order_book_data):
         try:
-            slippage = self.slippage_model.estimate_slippage(self.input_panel.get_parameters())
+            self.market_stats.update(order_book_data['asks'], order_book_data['bids'],
+                                     order_book_data.get('timestamp'))
+            inputs = self.input_panel.get_inputs()
+            self.market_impact_model.volatility = inputs['volatility']
+            slippage = self.slippage_model.estimate_slippage(inputs['quantity'])
             fees = self.fee_model.calculate_fees(self.input_panel.get_parameters())
-            market_impact = self.market_impact_model.calculate_impact(order_book_data)
+            market_impact = self.market_impact_model.calculate_impact(inputs['quantity'])
             maker_taker_proportion = self.maker_taker_model.predict_proportion(order_book_data)
 
             net_cost = slippage + fees + market_impact
@@ -1,20 +1,95 @@
+import numpy as np
+
+from .order_flow import FEATURE_NAMES, OrderFlowFeatures, OnlineLogisticRegression
+
+
 class MakerTakerModel:
-    def __init__(self, historical_data):
-        self.historical_data = historical_data
+    """
+    Online logistic regression of who supplies liquidity on the next trade.
+
+    Trades are labelled by their taker side: a seller-initiated trade fills
+    resting bids, so a passive buy at the touch would have been a maker
+    fill. Each trade takes one AdaGrad step on the order-flow features of
+    the book it hit, and the maker proportion of a buy order on the current
+    book is one dot product. Until `min_samples` trades were seen the
+    proportion falls back to the bid share of the visible depth.
+    """
+
+    def __init__(self, historical_data=None, levels=5, halflife=50, learning_rate=0.1,
+                 l2=1e-4, min_samples=100):
+        self.features = OrderFlowFeatures(levels, halflife)
+        self.regression = OnlineLogisticRegression(len(FEATURE_NAMES), learning_rate, l2)
+        self.min_samples = min_samples
+        if historical_data is not None:
+            self.train(historical_data)
+
+    @property
+    def weights(self):
+        return self.regression.weights
+
+    @property
+    def samples_seen(self):
+        return self.regression.samples_seen
+
+    @property
+    def trained(self):
+        return self.samples_seen >= self.min_samples
+
+    def update_book(self, asks, bids):
+        """Refresh the order-flow features; call once per book message"""
+        self.features.update_book(asks, bids)
+
+    def observe_trade(self, side):
+        """Learn from a public trade against the current book, then count it in the flow"""
+        if self.features.books:
+            self.partial_fit(self.features.values, 1.0 if side == 'sell' else 0.0)
+        self.features.update_trade(side)
 
     def predict(self, features):
-        # Implement logistic regression prediction logic here
-        # features should include relevant parameters for prediction
-        pass
+        """Probability of a maker fill for each row of features (FEATURE_NAMES order)"""
+        return self.regression.predict(features)
+
+    def partial_fit(self, X, y):
+        """One AdaGrad step per row of X towards labels y (1 for maker)"""
+        self.regression.partial_fit(X, y)
+        return self
 
     def train(self, training_data):
-        # Implement training logic for logistic regression model here
-        pass
+        """
+        Replay a recorded session in order
+
+        Args:
+            training_data: Iterable of messages, books carrying asks and bids
+                and trades carrying the taker `side`
+        """
+        for message in training_data:
+            if 'side' in message:
+                self.observe_trade(message['side'])
+            else:
+                self.update_book(message['asks'], message['bids'])
+        return self
 
     def evaluate(self, test_data):
-        # Implement evaluation logic to assess model performance here
-        pass
+        """Log loss and accuracy on (features, labels)"""
+        X, y = test_data
+        y = np.asarray(y, dtype=float)
+        p = self.predict(X)
+        return {
+            'log_loss': self.regression.log_loss(X, y),
+            'accuracy': float(np.mean((p >= 0.5) == (y == 1)))
+        }
+
+    def predict_proportion(self, order_book_data=None):
+        """Maker proportion of a buy order, after folding in the book if one is given"""
+        if order_book_data is not None:
+            self.update_book(order_book_data['asks'], order_book_data['bids'])
+        if self.trained:
+            return float(self.predict(self.features.values)[0])
+        if not self.features.books:
+            return 0.5
+        return 0.5 * (1.0 + self.features.values[2])
 
-    def get_maker_taker_proportion(self, input_params):
-        # Use the trained model to predict the maker/taker proportion based on input parameters
-        pass
\ No newline at end of file
+    def get_maker_taker_proportion(self, input_params=None):
+        """(maker, taker) proportions on the current book"""
+        maker = self.predict_proportion()
+        return maker, 1.0 - maker
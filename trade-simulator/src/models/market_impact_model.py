@@ -1,18 +1,60 @@
+import math
+
+from .market_stats import MarketStats
+
+SECONDS_PER_DAY = 86400
+
+
 class MarketImpactModel:
-    def __init__(self, volatility, quantity, fee_tier):
+    """
+    Expected impact of a market order priced off live MarketStats.
+
+    The order pays half the spread, plus a square-root impact scaled by
+    the mid's volatility over the execution horizon and by the size of the
+    order relative to the visible depth within the widest DEPTH_BPS band.
+    Volatility comes from the stream unless a daily volatility is given.
+    """
+
+    def __init__(self, stats=None, volatility=None, impact_coefficient=1.0, horizon=60.0, window=None):
+        """
+        Args:
+            stats: MarketStats fed with every book update; a private one if omitted
+            volatility: Daily volatility overriding the measured one
+            impact_coefficient: Scale of the square-root term
+            horizon: Execution horizon in seconds
+            window: Realized volatility window in seconds, EW volatility if None
+        """
+        self.stats = stats if stats is not None else MarketStats()
         self.volatility = volatility
-        self.quantity = quantity
-        self.fee_tier = fee_tier
+        self.impact_coefficient = impact_coefficient
+        self.horizon = horizon
+        self.window = window
+
+    def update_book(self, asks, bids, timestamp=None):
+        """Feed a book to the private stats; skip when the stats are shared and fed elsewhere"""
+        self.stats.update(asks, bids, timestamp)
+
+    def current_volatility(self):
+        """Volatility per sqrt(second), relative to price"""
+        if self.volatility is not None:
+            return self.volatility / math.sqrt(SECONDS_PER_DAY)
+        return self.stats.volatility(self.window)
+
+    def impact_bps(self, quantity, side='buy'):
+        """Impact in bps of an order of `quantity` quote notional"""
+        depth = (self.stats.ask_depth if side == 'buy' else self.stats.bid_depth)[-1]
+        participation = quantity / depth if depth > 0 else 1.0
+        sigma_bps = self.current_volatility() * math.sqrt(self.horizon) * 1e4
+        return 0.5 * self.stats.spread_bps + self.impact_coefficient * sigma_bps * math.sqrt(participation)
 
-    def calculate_market_impact(self):
-        # Almgren-Chriss model implementation
-        # Placeholder for actual calculation logic
-        market_impact = self.volatility * self.quantity * self.fee_tier
-        return market_impact
+    def calculate_impact(self, quantity, side='buy'):
+        """Expected impact cost in quote currency"""
+        return self.impact_bps(quantity, side) * quantity / 1e4
 
     def get_parameters(self):
         return {
-            "volatility": self.volatility,
-            "quantity": self.quantity,
-            "fee_tier": self.fee_tier
-        }
\ No newline at end of file
+            "volatility": self.current_volatility(),
+            "impact_coefficient": self.impact_coefficient,
+            "horizon": self.horizon,
+            "window": self.window
+        }
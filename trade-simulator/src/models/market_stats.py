@@ -0,0 +1,276 @@
+import math
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Distances from the best price (in bps) at which visible depth is measured
+DEPTH_BPS = (5, 10, 25)
+
+# Windows (seconds) over which rolling statistics are kept
+WINDOWS = (10, 60, 300)
+
+
+def to_seconds(timestamp):
+    """Epoch seconds from a number or an ISO-8601 string such as '2025-05-04T10:39:13Z'"""
+    if timestamp is None or isinstance(timestamp, (int, float)):
+        return timestamp
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+
+
+class RingBuffer:
+    """
+    Fixed-capacity FIFO of float rows in one preallocated array.
+
+    Appending to a full buffer overwrites the oldest row and returns it, so
+    memory never grows whatever the update rate.
+    """
+
+    def __init__(self, capacity, width):
+        self._rows = np.zeros((capacity, width))
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return len(self._rows)
+
+    def append(self, row):
+        evicted = None
+        if self._size == len(self._rows):
+            evicted = self.popleft()
+        self._rows[(self._start + self._size) % len(self._rows)] = row
+        self._size += 1
+        return evicted
+
+    def peekleft(self):
+        return self._rows[self._start]
+
+    def popleft(self):
+        row = self._rows[self._start].copy()
+        self._start = (self._start + 1) % len(self._rows)
+        self._size -= 1
+        return row
+
+
+class RollingVolatility:
+    """
+    Realized volatility of log returns over the last `window` seconds.
+
+    Returns enter and leave a sliding Welford accumulator, so the mean and
+    sum of squares stay accurate without summing the window again; each
+    return is added once and removed once.
+    """
+
+    def __init__(self, window, capacity=32768):
+        self.window = window
+        self._buffer = RingBuffer(capacity, 3)  # (timestamp, return, dt)
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.elapsed = 0.0
+
+    def _add(self, r, dt):
+        self.count += 1
+        delta = r - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (r - self.mean)
+        self.elapsed += dt
+
+    def _remove(self, r, dt):
+        self.count -= 1
+        self.elapsed -= dt
+        if not self.count:
+            self.mean = self._m2 = self.elapsed = 0.0
+            return
+        delta = r - self.mean
+        self.mean -= delta / self.count
+        self._m2 = max(self._m2 - delta * (r - self.mean), 0.0)
+
+    def update(self, timestamp, r, dt):
+        evicted = self._buffer.append((timestamp, r, dt))
+        if evicted is not None:
+            self._remove(evicted[1], evicted[2])
+        self._add(r, dt)
+        horizon = timestamp - self.window
+        while len(self._buffer) and self._buffer.peekleft()[0] <= horizon:
+            _, old_r, old_dt = self._buffer.popleft()
+            self._remove(old_r, old_dt)
+
+    @property
+    def variance_rate(self):
+        """Sum of squared returns per second of the window"""
+        if self.elapsed <= 0:
+            return 0.0
+        return (self._m2 + self.count * self.mean * self.mean) / self.elapsed
+
+    @property
+    def volatility(self):
+        """Realized volatility per sqrt(second), relative to price"""
+        return math.sqrt(self.variance_rate)
+
+
+class TimeWeightedMean:
+    """
+    Time-weighted averages of a vector of values over the last `window` seconds.
+
+    Each value is weighted by how long it stood before the next update; the
+    running weighted sums move by one row in and whatever rows expire out.
+    """
+
+    def __init__(self, window, width, capacity=32768):
+        self.window = window
+        self._buffer = RingBuffer(capacity, width + 2)  # (end time, duration, values...)
+        self._sums = np.zeros(width)
+        self.duration = 0.0
+
+    def update(self, row):
+        """Add a (end time, duration, values...) row"""
+        evicted = self._buffer.append(row)
+        if evicted is not None:
+            self._expire(evicted)
+        self._sums += row[1] * row[2:]
+        self.duration += row[1]
+        horizon = row[0] - self.window
+        while len(self._buffer) and self._buffer.peekleft()[0] <= horizon:
+            self._expire(self._buffer.popleft())
+
+    def _expire(self, row):
+        self._sums -= row[1] * row[2:]
+        self.duration -= row[1]
+
+    @property
+    def mean(self):
+        if self.duration <= 0:
+            return None
+        return self._sums / self.duration
+
+
+class MarketStats:
+    """
+    Streaming statistics of one instrument, fed by every book update.
+
+    Keeps the current spread, depth within each DEPTH_BPS distance of the
+    best price and imbalance, plus per window in WINDOWS the realized mid
+    volatility and time-weighted averages of the book figures, and an
+    exponentially weighted volatility with a halflife in seconds. Each
+    update costs the same however long the session runs; rolling state
+    lives in fixed-size ring buffers.
+    """
+
+    def __init__(self, windows=WINDOWS, depth_bps=DEPTH_BPS, vol_halflife=60.0, capacity=32768):
+        self.windows = tuple(windows)
+        self.depth_bps = tuple(sorted(depth_bps))
+        self._bands = np.asarray(self.depth_bps, dtype=float) / 1e4
+        self.vol_halflife = vol_halflife
+        self.spread_bps = 0.0
+        self.imbalance = 0.0
+        self.ask_depth = [0.0] * len(self.depth_bps)  # Quote notional within each distance
+        self.bid_depth = [0.0] * len(self.depth_bps)
+        self.mid = None
+        self.timestamp = None
+        self.updates = 0
+
+        self._ew_variance_rate = 0.0
+        self._realized = {w: RollingVolatility(w, capacity) for w in self.windows}
+        # Averaged vector: spread, imbalance, ask depths, bid depths
+        self._averages = {w: TimeWeightedMean(w, 2 + 2 * len(self.depth_bps), capacity) for w in self.windows}
+        self._current = None
+
+    def _depth(self, prices, sizes, best, sign):
+        # Levels inside each limit, found on ascending distance from the best
+        limits = self._bands * best
+        inside = np.searchsorted(sign * (prices - best), limits, side='right')
+        # Only the levels up to the widest band are summed
+        n = inside[-1]
+        notional = np.cumsum(prices[:n] * sizes[:n])
+        return [float(notional[i - 1]) if i else 0.0 for i in inside.tolist()]
+
+    def update(self, asks, bids, timestamp=None):
+        """
+        Args:
+            asks: Best-first [price, size] ask levels
+            bids: Best-first [price, size] bid levels
+            timestamp: Book time (epoch seconds or ISO string), now if omitted
+        """
+        timestamp = time.time() if timestamp is None else to_seconds(timestamp)
+        asks = np.asarray(asks, dtype=float).reshape(-1, 2)
+        bids = np.asarray(bids, dtype=float).reshape(-1, 2)
+        if not len(asks) or not len(bids):
+            return
+
+        # The previous book stood until now
+        if self._current is not None:
+            held = timestamp - self.timestamp
+            if held > 0:
+                row = np.array([timestamp, held] + self._current)
+                for average in self._averages.values():
+                    average.update(row)
+
+        best_ask, best_bid = asks[0, 0], bids[0, 0]
+        mid = (best_ask + best_bid) / 2
+        self.spread_bps = (best_ask - best_bid) / mid * 1e4
+        self.ask_depth = self._depth(asks[:, 0], asks[:, 1], best_ask, 1)
+        self.bid_depth = self._depth(bids[:, 0], bids[:, 1], best_bid, -1)
+        near_bid, near_ask = self.bid_depth[0], self.ask_depth[0]
+        self.imbalance = (near_bid - near_ask) / (near_bid + near_ask) if near_bid + near_ask else 0.0
+        self._current = [self.spread_bps, self.imbalance] + self.ask_depth + self.bid_depth
+
+        if self.mid is not None:
+            dt = timestamp - self.timestamp
+            if dt > 0:
+                r = math.log(mid / self.mid)
+                decay = 0.5 ** (dt / self.vol_halflife)
+                self._ew_variance_rate = decay * self._ew_variance_rate + (1 - decay) * r * r / dt
+                for realized in self._realized.values():
+                    realized.update(timestamp, r, dt)
+        self.mid = mid
+        self.timestamp = timestamp
+        self.updates += 1
+
+    def volatility(self, window=None):
+        """Mid volatility per sqrt(second), relative to price; EW when no window is given"""
+        if window is None:
+            return math.sqrt(self._ew_variance_rate)
+        return self._realized[window].volatility
+
+    def volatility_bps(self, window=None):
+        return self.volatility(window) * 1e4
+
+    def _average(self, window, index):
+        mean = self._averages[window].mean
+        if mean is None:
+            return self._current[index] if self._current is not None else 0.0
+        return float(mean[index])
+
+    def average_spread_bps(self, window):
+        """Time-weighted spread over the window"""
+        return self._average(window, 0)
+
+    def average_imbalance(self, window):
+        return self._average(window, 1)
+
+    def average_depth(self, window, side='buy'):
+        """Time-weighted depth within each DEPTH_BPS distance on the side an order of `side` takes"""
+        offset = 2 if side == 'buy' else 2 + len(self.depth_bps)
+        return [self._average(window, offset + i) for i in range(len(self.depth_bps))]
+
+    def snapshot(self):
+        """All current statistics as a flat dict"""
+        stats = {
+            'mid': self.mid,
+            'spread_bps': self.spread_bps,
+            'imbalance': self.imbalance,
+            'volatility_bps': self.volatility_bps()
+        }
+        for bps, ask, bid in zip(self.depth_bps, self.ask_depth, self.bid_depth):
+            stats[f'ask_depth_{bps}bps'] = ask
+            stats[f'bid_depth_{bps}bps'] = bid
+        for window in self.windows:
+            stats[f'volatility_bps_{window}s'] = self.volatility_bps(window)
+            stats[f'spread_bps_{window}s'] = self.average_spread_bps(window)
+            stats[f'imbalance_{window}s'] = self.average_imbalance(window)
+        return stats
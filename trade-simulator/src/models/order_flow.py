@@ -0,0 +1,156 @@
+"""
+Order-flow features and the online logistic regression trained on them.
+
+The same module as the engine's core/order_flow.py, kept inside this
+package so MakerTakerModel computes the engine's features and takes the
+same AdaGrad steps; change the two together.
+"""
+import math
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+FEATURE_NAMES = ('bias', 'top_imbalance', 'depth_imbalance', 'spread', 'trade_sign', 'order_flow')
+
+# Best bid, bid size, best ask, ask size
+Top = Tuple[float, float, float, float]
+
+
+def imbalance(bid: float, ask: float) -> float:
+    """(bid - ask) / (bid + ask), 0 for an empty book"""
+    total = bid + ask
+    return (bid - ask) / total if total > 0 else 0.0
+
+
+def order_flow_imbalance(last: Top, top: Top) -> float:
+    """
+    Order flow imbalance of the best levels between two books
+
+    Cont, Kukanov and Stoikov: bid size added at a rising or unchanged bid
+    counts as buying pressure, size removed at a falling or unchanged bid as
+    selling pressure, and the mirror image on the ask.
+    """
+    last_bid, last_bid_size, last_ask, last_ask_size = last
+    bid, bid_size, ask, ask_size = top
+    flow = 0.0
+    if bid >= last_bid:
+        flow += bid_size
+    if bid <= last_bid:
+        flow -= last_bid_size
+    if ask <= last_ask:
+        flow -= ask_size
+    if ask >= last_ask:
+        flow += last_ask_size
+    return flow
+
+
+def sigmoid(z: float) -> float:
+    # exp of a non-positive argument never overflows
+    e = math.exp(-abs(z))
+    return (1.0 if z >= 0 else e) / (1.0 + e)
+
+
+class OrderFlowFeatures:
+    """
+    Order-flow state of one instrument, updated per book and per trade.
+
+    Imbalances of the best level and of the best `levels` levels, the
+    spread relative to its recent average, and exponentially weighted trade
+    signs and order flow imbalance of the best levels. All lie in [-1, 1],
+    so the logistic weights share a scale.
+    """
+
+    def __init__(self, levels: int = 5, halflife: float = 50.0):
+        """
+        Args:
+            levels: Best levels per side summed for the depth imbalance
+            halflife: Updates after which a past trade sign or flow weighs half
+        """
+        self.levels = levels
+        self.decay = 0.5 ** (1.0 / halflife)
+        self.values = np.zeros(len(FEATURE_NAMES))
+        self.values[0] = 1.0
+        self.trade_sign = 0.0
+        self._flow = 0.0            # EW order flow imbalance of the best levels
+        self._flow_scale = 0.0      # EW absolute flow, to normalise it
+        self._spread_mean = 0.0
+        self._last_top: Optional[Top] = None
+        self.books = 0
+
+    def update_top(self, bid: float, bid_size: float, ask: float, ask_size: float,
+                   bid_depth: float, ask_depth: float):
+        """Fold in a book given its best levels and the size of its best `levels` levels"""
+        d = self.decay
+        top = (bid, bid_size, ask, ask_size)
+        if self._last_top is not None:
+            flow = order_flow_imbalance(self._last_top, top)
+            self._flow = d * self._flow + (1 - d) * flow
+            self._flow_scale = d * self._flow_scale + (1 - d) * abs(flow)
+        self._last_top = top
+
+        # Spread relative to its own recent average, so instruments of any
+        # tick size land on the same scale
+        spread = (ask - bid) / (ask + bid) * 2.0
+        self._spread_mean = spread if not self.books else d * self._spread_mean + (1 - d) * spread
+        self.books += 1
+
+        values = self.values
+        values[1] = imbalance(bid_size, ask_size)
+        values[2] = imbalance(bid_depth, ask_depth)
+        values[3] = math.tanh(spread / self._spread_mean - 1.0) if self._spread_mean > 0 else 0.0
+        values[4] = self.trade_sign
+        values[5] = self._flow / self._flow_scale if self._flow_scale > 0 else 0.0
+
+    def update_book(self, asks: Sequence, bids: Sequence):
+        """
+        Args:
+            asks: Best-first [price, size] ask levels
+            bids: Best-first [price, size] bid levels
+        """
+        if not len(asks) or not len(bids):
+            return
+        self.update_top(float(bids[0][0]), float(bids[0][1]), float(asks[0][0]), float(asks[0][1]),
+                        sum(float(level[1]) for level in bids[:self.levels]),
+                        sum(float(level[1]) for level in asks[:self.levels]))
+
+    def update_trade(self, side: str):
+        """Fold a trade's taker side ('buy' lifted the ask) into the EW trade sign"""
+        sign = 1.0 if side == 'buy' else -1.0
+        self.trade_sign = self.decay * self.trade_sign + (1 - self.decay) * sign
+        self.values[4] = self.trade_sign
+
+
+class OnlineLogisticRegression:
+    """Logistic regression fitted by AdaGrad steps, one row at a time"""
+
+    def __init__(self, n_features: int, learning_rate: float = 0.1, l2: float = 1e-4):
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.weights = np.zeros(n_features)
+        self._grad_sq = np.full(n_features, 1e-8)
+        self.samples_seen = 0
+
+    def predict_proba(self, x: np.ndarray) -> float:
+        return sigmoid(float(self.weights @ x))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Probability for each row of X"""
+        z = np.atleast_2d(np.asarray(X, dtype=np.float64)) @ self.weights
+        # The sigmoid above, vectorised
+        e = np.exp(-np.abs(z))
+        return np.where(z >= 0, 1.0, e) / (1.0 + e)
+
+    def partial_fit(self, X: np.ndarray, y: np.ndarray) -> 'OnlineLogisticRegression':
+        """Take one step per row of X towards labels y in {0, 1}"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        for x, label in zip(X, np.atleast_1d(y)):
+            grad = (self.predict_proba(x) - label) * x + self.l2 * self.weights
+            self._grad_sq += grad * grad
+            self.weights -= self.learning_rate * grad / np.sqrt(self._grad_sq)
+            self.samples_seen += 1
+        return self
+
+    def log_loss(self, X: np.ndarray, y: np.ndarray) -> float:
+        p = np.clip(self.predict(X), 1e-12, 1 - 1e-12)
+        y = np.asarray(y, dtype=np.float64)
+        return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
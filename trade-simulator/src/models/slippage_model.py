@@ -1,13 +1,380 @@
+import gzip
+import json
+import math
+import os
+import struct
+
+import numpy as np
+
+from .market_stats import DEPTH_BPS, MarketStats
+
+# Frame header of the client's raw captures: receive time in ns, payload length
+_CAPTURE_HEADER = struct.Struct('<qI')
+
+FEATURE_NAMES = ('spread_bps', 'volatility_bps', 'imbalance') + tuple(f'size_to_depth_{n}bps' for n in DEPTH_BPS)
+
+
+def walk_slippage_bps(levels, notionals):
+    """
+    Slippage in bps versus the best price of filling each quote notional
+    against best-first [price, size] levels; inf beyond the visible depth.
+    """
+    book = np.asarray(levels, dtype=float).reshape(-1, 2)
+    notionals = np.asarray(notionals, dtype=float)
+    if not len(book):
+        return np.full(notionals.shape, np.inf)
+
+    prices, sizes = book[:, 0], book[:, 1]
+    cum_notional = np.cumsum(prices * sizes)
+    cum_size = np.cumsum(sizes)
+    idx = np.searchsorted(cum_notional, notionals)
+    fillable = idx < len(prices)
+    idx = np.minimum(idx, len(prices) - 1)
+
+    notional_before = np.where(idx > 0, cum_notional[idx - 1], 0.0)
+    size_before = np.where(idx > 0, cum_size[idx - 1], 0.0)
+    filled = size_before + (notionals - notional_before) / prices[idx]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_price = np.where(notionals > 0, notionals / filled, prices[0])
+    slippage = np.abs(avg_price - prices[0]) / prices[0] * 1e4
+    return np.where(fillable, slippage, np.inf)
+
+
+class BookFeatures:
+    """
+    Slippage features read off MarketStats: spread, depth within DEPTH_BPS
+    of the best price on each side, top imbalance and the exponentially
+    weighted mid volatility.
+
+    The stats may be shared with other models; whoever owns them feeds
+    every book update once.
+    """
+
+    def __init__(self, depth_bps=DEPTH_BPS, vol_halflife=60.0, stats=None):
+        self.stats = stats if stats is not None else MarketStats(depth_bps=depth_bps, vol_halflife=vol_halflife)
+
+    @property
+    def spread_bps(self):
+        return self.stats.spread_bps
+
+    @property
+    def imbalance(self):
+        return self.stats.imbalance
+
+    @property
+    def ask_depth(self):
+        return self.stats.ask_depth
+
+    @property
+    def bid_depth(self):
+        return self.stats.bid_depth
+
+    @property
+    def volatility_bps(self):
+        """Realized mid volatility per sqrt(second), in bps"""
+        return self.stats.volatility_bps()
+
+    @property
+    def updates(self):
+        return self.stats.updates
+
+    def update(self, asks, bids, timestamp=None):
+        """
+        Args:
+            asks: Best-first [price, size] ask levels
+            bids: Best-first [price, size] bid levels
+            timestamp: Book time (epoch seconds or ISO string), used for the volatility clock
+        """
+        self.stats.update(asks, bids, timestamp)
+
+    def vector(self, quantity, side='buy'):
+        """Feature values for an order of `quantity` quote notional, in FEATURE_NAMES order"""
+        depth = self.ask_depth if side == 'buy' else self.bid_depth
+        # Book pressure towards the price we trade at raises the cost
+        imbalance = self.imbalance if side == 'buy' else -self.imbalance
+        features = [self.spread_bps, self.volatility_bps, imbalance]
+        for d in depth:
+            features.append(quantity / d if d > 0 else quantity)
+        return features
+
+
 class SlippageModel:
-    def __init__(self, volatility, quantity):
-        self.volatility = volatility
-        self.quantity = quantity
-
-    def estimate_slippage(self):
-        # Implement linear or quantile regression model for slippage estimation
-        # Placeholder for regression logic
-        return self.volatility * self.quantity * 0.01  # Example calculation
-
-    def update_parameters(self, volatility, quantity):
-        self.volatility = volatility
-        self.quantity = quantity
\ No newline at end of file
+    """
+    Regression of walk-the-book slippage (bps) on book features and order size.
+
+    "linear" accumulates the normal equations, so incremental training is
+    exact least squares over everything seen. "quantile" runs stochastic
+    subgradient descent on the pinball loss of the chosen quantile over
+    standardized features. Either way `compile()` folds the fit into one
+    coefficient vector, and the per-tick `estimate_slippage` is a dot product
+    over six numbers. Being a regression on size-to-depth ratios, it also
+    prices orders larger than the visible book, where the walk gives inf.
+    """
+
+    def __init__(self, model_type='linear', quantile=0.5, depth_bps=DEPTH_BPS,
+                 ridge=1e-6, learning_rate=0.05, stats=None):
+        if model_type not in ('linear', 'quantile'):
+            raise ValueError(f"Unknown slippage model type: {model_type}")
+        self.model_type = model_type
+        self.quantile = quantile
+        self.ridge = ridge
+        self.learning_rate = learning_rate
+        self.features = BookFeatures(depth_bps, stats=stats)
+
+        n = len(FEATURE_NAMES) + 1  # Leading intercept column
+        # Linear: sufficient statistics of least squares
+        self._xtx = np.zeros((n, n))
+        self._xty = np.zeros(n)
+        # Quantile: running feature scale and weights in standardized space
+        self._count = 0
+        self._mean = np.zeros(n - 1)
+        self._m2 = np.zeros(n - 1)
+        self._weights = np.zeros(n)
+        self.samples_seen = 0
+
+        # Compiled predict path
+        self.intercept = 0.0
+        self.coefficients = (0.0,) * (n - 1)
+
+    def update_book(self, asks, bids, timestamp=None):
+        """Refresh the book features; call once per book message"""
+        self.features.update(asks, bids, timestamp)
+
+    def estimate_slippage(self, quantity, side='buy'):
+        """Expected slippage cost in quote currency of an order of `quantity` notional"""
+        return self.predict_bps(quantity, side) * quantity / 1e4
+
+    def predict_bps(self, quantity, side='buy'):
+        x = self.features.vector(quantity, side)
+        bps = self.intercept
+        for c, v in zip(self.coefficients, x):
+            bps += c * v
+        return bps if bps > 0 else 0.0
+
+    def _design(self, X):
+        X = np.asarray(X, dtype=float)
+        return np.hstack([np.ones((len(X), 1)), X])
+
+    def _update_scale(self, X):
+        # Chan et al. parallel variance update with a whole batch
+        n_b = len(X)
+        mean_b = X.mean(axis=0)
+        m2_b = ((X - mean_b) ** 2).sum(axis=0)
+        n = self._count + n_b
+        delta = mean_b - self._mean
+        self._mean += delta * n_b / n
+        self._m2 += m2_b + delta ** 2 * self._count * n_b / n
+        self._count = n
+
+    def _scale(self):
+        std = np.sqrt(self._m2 / max(self._count - 1, 1))
+        return np.where(std > 0, std, 1.0)
+
+    def partial_fit(self, X, y):
+        """Train on a batch of feature rows (FEATURE_NAMES order) and slippage labels in bps"""
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if not len(X):
+            return self
+        if self.model_type == 'linear':
+            A = self._design(X)
+            self._xtx += A.T @ A
+            self._xty += A.T @ y
+        else:
+            self._update_scale(X)
+            Z = self._design((X - self._mean) / self._scale())
+            for i, (z, target) in enumerate(zip(Z, y), start=self.samples_seen + 1):
+                residual = target - z @ self._weights
+                # Subgradient of the pinball loss
+                grad = -(self.quantile - (residual < 0)) * z
+                self._weights -= self.learning_rate / math.sqrt(i) * grad
+        self.samples_seen += len(X)
+        self.compile()
+        return self
+
+    def compile(self):
+        """Fold the current fit into the intercept and coefficients used per tick"""
+        if self.model_type == 'linear':
+            n = len(self._xty)
+            penalty = self.ridge * np.eye(n)
+            penalty[0, 0] = 0.0
+            w = np.linalg.lstsq(self._xtx + penalty, self._xty, rcond=None)[0]
+        else:
+            scale = self._scale()
+            w = np.empty_like(self._weights)
+            w[1:] = self._weights[1:] / scale
+            w[0] = self._weights[0] - np.sum(w[1:] * self._mean)
+        self.intercept = float(w[0])
+        self.coefficients = tuple(float(c) for c in w[1:])
+
+    def label_book(self, asks, bids, quantities):
+        """Feature rows and walk-the-book labels for both sides of the current book"""
+        X, y = [], []
+        for side, levels in (('buy', asks), ('sell', bids)):
+            labels = walk_slippage_bps(levels, quantities)
+            for quantity, label in zip(quantities, labels):
+                if np.isfinite(label):
+                    X.append(self.features.vector(quantity, side))
+                    y.append(label)
+        return X, y
+
+    def train_session(self, messages, quantities=None, batch_size=5000):
+        """
+        Incrementally train on a recorded session
+
+        Args:
+            messages: Iterable of L2 book messages (dicts with asks, bids and
+                an optional timestamp in seconds), e.g. from read_session
+            quantities: Quote notionals to label each book with; defaults to
+                fractions of the visible depth within the widest DEPTH_BPS band
+            batch_size: Samples per partial_fit call
+        """
+        X, y = [], []
+        for message in messages:
+            asks, bids = message['asks'], message['bids']
+            self.update_book(asks, bids, message.get('timestamp'))
+            sizes = quantities
+            if sizes is None:
+                visible = min(self.features.ask_depth[-1], self.features.bid_depth[-1])
+                sizes = np.geomspace(0.01, 2.0, 8) * visible if visible > 0 else ()
+            bx, by = self.label_book(asks, bids, sizes)
+            X.extend(bx)
+            y.extend(by)
+            if len(X) >= batch_size:
+                self.partial_fit(X, y)
+                X, y = [], []
+        if X:
+            self.partial_fit(X, y)
+        return self
+
+    def update_parameters(self, intercept, coefficients):
+        """Install coefficients trained elsewhere"""
+        if len(coefficients) != len(FEATURE_NAMES):
+            raise ValueError(f"Expected {len(FEATURE_NAMES)} coefficients")
+        self.intercept = float(intercept)
+        self.coefficients = tuple(float(c) for c in coefficients)
+
+    def save(self, path):
+        np.savez(path, model_type=self.model_type, quantile=self.quantile, xtx=self._xtx, xty=self._xty,
+                 count=self._count, mean=self._mean, m2=self._m2, weights=self._weights,
+                 samples_seen=self.samples_seen)
+
+    @classmethod
+    def load(cls, path):
+        state = np.load(path)
+        model = cls(model_type=str(state['model_type']), quantile=float(state['quantile']))
+        model._xtx, model._xty = state['xtx'], state['xty']
+        model._count = int(state['count'])
+        model._mean, model._m2, model._weights = state['mean'], state['m2'], state['weights']
+        model.samples_seen = int(state['samples_seen'])
+        model.compile()
+        return model
+
+
+def load_or_train(model_path=None, session_path=None, model_type='linear', quantile=0.5, stats=None):
+    """
+    Slippage model for live use: saved coefficients, else a fit to a recording
+
+    Args:
+        model_path: .npz written by SlippageModel.save; loaded when it exists,
+            otherwise a model trained on session_path is saved there
+        session_path: Recording to train on, see read_session
+        stats: MarketStats the live model reads its features from. Training
+            runs on the recording's own stats, so these start clean
+
+    Returns:
+        The model; its samples_seen is 0 when neither source was available
+    """
+    if model_path and os.path.exists(model_path):
+        model = SlippageModel.load(model_path)
+    else:
+        model = SlippageModel(model_type, quantile=quantile)
+        if session_path:
+            model.train_session(read_session(session_path))
+            if model_path:
+                model.save(model_path)
+    if stats is not None:
+        model.features = BookFeatures(stats=stats)
+    return model
+
+
+def read_session(path, trades=False):
+    """
+    Yield L2 book messages from a recording
+
+    Reads NDJSON book messages (optionally gzipped) and the raw frame
+    captures written by the client's `--record` option. Capture frames are
+    OKX channel pushes, so `books` snapshots and updates are merged into
+    full books here and every push yields the resulting book.
+
+    Args:
+        path: Recording file
+        trades: Also yield the capture's public trades, as dicts with the
+            taker `side`, e.g. for MakerTakerModel.train
+    """
+    if _is_capture(path):
+        yield from _read_capture(path, trades)
+        return
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _is_capture(path):
+    """Whether a file holds gzip'd length-prefixed frames rather than NDJSON"""
+    try:
+        with gzip.open(path, 'rb') as f:
+            head = f.read(_CAPTURE_HEADER.size + 1)
+    except OSError:
+        return False
+    if len(head) <= _CAPTURE_HEADER.size:
+        return False
+    _, length = _CAPTURE_HEADER.unpack_from(head)
+    # NDJSON text read as a length is far beyond any frame size
+    return 0 < length < 1 << 24 and head[_CAPTURE_HEADER.size:] == b'{'
+
+
+def _read_capture(path, trades):
+    books = {}
+    with gzip.open(path, 'rb') as f:
+        while True:
+            header = f.read(_CAPTURE_HEADER.size)
+            if len(header) < _CAPTURE_HEADER.size:
+                return
+            _, length = _CAPTURE_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                # Truncated tail from an interrupted recording
+                return
+            try:
+                frame = json.loads(payload)
+            except ValueError:
+                continue  # keepalive text frames
+            if not isinstance(frame, dict) or 'data' not in frame or 'arg' not in frame:
+                continue
+            arg = frame['arg']
+            channel, symbol = arg.get('channel'), arg.get('instId')
+            for data in frame['data']:
+                timestamp = int(data['ts']) / 1000.0
+                if channel == 'trades':
+                    if trades:
+                        yield {'timestamp': timestamp, 'symbol': symbol, 'side': data['side'],
+                               'price': float(data['px']), 'size': float(data['sz'])}
+                    continue
+                # Incremental channels send an action; the shallow ones always send full books
+                book = books.get(symbol)
+                if book is None or frame.get('action') != 'update':
+                    book = books[symbol] = ({}, {})
+                for levels, side in zip(book, (data.get('asks', ()), data.get('bids', ()))):
+                    for price, size, *_ in side:
+                        if float(size) > 0:
+                            levels[float(price)] = float(size)
+                        else:
+                            levels.pop(float(price), None)
+                asks, bids = book
+                yield {'timestamp': timestamp, 'symbol': symbol,
+                       'asks': [[p, asks[p]] for p in sorted(asks)],
+                       'bids': [[p, bids[p]] for p in sorted(bids, reverse=True)]}
@@ -12,7 +12,9 @@ class InputPanel:
         self.spot_asset = input("Enter Spot Asset: ")
         self.order_type = input("Enter Order Type (market): ")
         self.quantity = float(input("Enter Quantity (~100 USD equivalent): "))
-        self.volatility = float(input("Enter Volatility: "))
+        # Measured from the order book stream unless overridden
+        volatility = input("Enter Daily Volatility (blank to measure from the book): ")
+        self.volatility = float(volatility) if volatility.strip() else None
         self.fee_tier = input("Enter Fee Tier: ")
 
     def get_inputs(self):
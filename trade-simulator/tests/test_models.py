@@ -1,8 +1,15 @@
+import gzip
+import json
+import os
+import struct
+import tempfile
 import unittest
-from src.models.slippage_model import SlippageModel
+import numpy as np
+from src.models.slippage_model import SlippageModel, walk_slippage_bps, read_session, load_or_train
 from src.models.fee_model import FeeModel
 from src.models.market_impact_model import MarketImpactModel
 from src.models.maker_taker_model import MakerTakerModel
+from src.models.market_stats import MarketStats, RingBuffer
 
 class TestModels(unittest.TestCase):
 
@@ -41,5 +48,213 @@ class TestModels(unittest.TestCase):
         expected_proportion = self.maker_taker_model.predict_proportion(order_type)
         self.assertIsInstance(expected_proportion, float)
 
+class TestStreamingSlippageModel(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.messages = []
+        mid = 30000.0
+        for i in range(300):
+            mid *= np.exp(rng.normal(0, 2e-4))
+            scale = rng.uniform(0.5, 2)
+            asks = [[mid + 0.5 * (j + 0.5), rng.exponential(scale)] for j in range(50)]
+            bids = [[mid - 0.5 * (j + 0.5), rng.exponential(scale)] for j in range(50)]
+            self.messages.append({'asks': asks, 'bids': bids, 'timestamp': 1700000000 + i * 0.1})
+
+    def test_walk_beyond_depth_is_inf(self):
+        asks = [[100.0, 1.0], [101.0, 1.0]]
+        slippage = walk_slippage_bps(asks, [50.0, 150.5, 1000.0])
+        self.assertEqual(slippage[0], 0.0)
+        self.assertAlmostEqual(slippage[1], (150.5 / 1.5 - 100.0) / 100.0 * 1e4)
+        self.assertTrue(np.isinf(slippage[2]))
+
+    def test_linear_fit_tracks_book_walk(self):
+        model = SlippageModel('linear').train_session(self.messages)
+        last = self.messages[-1]
+        model.update_book(last['asks'], last['bids'], last['timestamp'])
+        quantity = 0.5 * model.features.ask_depth[-1]
+        walked = walk_slippage_bps(last['asks'], [quantity])[0]
+        self.assertAlmostEqual(model.predict_bps(quantity), walked, delta=0.5 * walked)
+
+    def test_prices_sizes_beyond_visible_depth(self):
+        for model_type in ('linear', 'quantile'):
+            model = SlippageModel(model_type, quantile=0.9).train_session(self.messages)
+            huge = 10 * model.features.ask_depth[-1]
+            self.assertTrue(np.isinf(walk_slippage_bps(self.messages[-1]['asks'], [huge])[0]))
+            estimate = model.estimate_slippage(huge)
+            self.assertTrue(np.isfinite(estimate))
+            self.assertGreater(estimate, 0.0)
+
+    def test_incremental_training_matches_batch(self):
+        batch = SlippageModel('linear').train_session(self.messages)
+        incremental = SlippageModel('linear')
+        incremental.train_session(self.messages[:150]).train_session(self.messages[150:])
+        for quantity in (1e3, 1e5, 1e6):
+            self.assertAlmostEqual(incremental.predict_bps(quantity), batch.predict_bps(quantity), places=6)
+    def test_load_or_train_saves_and_reloads(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            session = os.path.join(tmp, 'session.ndjson')
+            with open(session, 'w') as f:
+                for message in self.messages:
+                    f.write(json.dumps(message) + '\n')
+            model_path = os.path.join(tmp, 'slippage.npz')
+            stats = MarketStats()
+            trained = load_or_train(model_path, session, stats=stats)
+            self.assertEqual(trained.samples_seen, SlippageModel('linear').train_session(self.messages).samples_seen)
+            self.assertIs(trained.features.stats, stats)
+            self.assertEqual(stats.updates, 0)
+
+            # The saved fit is loaded rather than retrained
+            loaded = load_or_train(model_path, None)
+            self.assertEqual(loaded.coefficients, trained.coefficients)
+            self.assertEqual(loaded.intercept, trained.intercept)
+
+    def test_load_or_train_without_sources_is_untrained(self):
+        model = load_or_train(None, None)
+        self.assertEqual(model.samples_seen, 0)
+        self.assertEqual(model.estimate_slippage(1000.0), 0.0)
+
+
+class TestReadSession(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write_capture(self, frames):
+        """Frames in the client recorder's format: gzip'd ns stamp, length, payload"""
+        path = os.path.join(self.dir.name, 'capture.bin')
+        with gzip.open(path, 'ab') as f:
+            for i, frame in enumerate(frames):
+                payload = (frame if isinstance(frame, str) else json.dumps(frame)).encode()
+                f.write(struct.pack('<qI', 1700000000000000000 + i, len(payload)))
+                f.write(payload)
+        return path
+
+    def test_reads_ndjson(self):
+        path = os.path.join(self.dir.name, 'session.ndjson.gz')
+        with gzip.open(path, 'wt') as f:
+            f.write(json.dumps({'asks': [[101.0, 1.0]], 'bids': [[99.0, 2.0]], 'timestamp': 1.0}) + "\n")
+        self.assertEqual(list(read_session(path)),
+                         [{'asks': [[101.0, 1.0]], 'bids': [[99.0, 2.0]], 'timestamp': 1.0}])
+
+    def test_merges_capture_updates_into_books(self):
+        arg = {'channel': 'books', 'instId': 'BTC-USDT'}
+        path = self.write_capture([
+            {'event': 'subscribe', 'arg': arg},
+            {'arg': arg, 'action': 'snapshot', 'data': [{
+                'asks': [['101', '1', '0', '1'], ['102', '2', '0', '1']],
+                'bids': [['99', '3', '0', '1']], 'ts': '1700000000000'}]},
+            'pong',
+            {'arg': {'channel': 'trades', 'instId': 'BTC-USDT'}, 'data': [{
+                'side': 'sell', 'px': '99', 'sz': '0.5', 'ts': '1700000000050'}]},
+            {'arg': arg, 'action': 'update', 'data': [{
+                'asks': [['101', '0', '0', '0'], ['101.5', '4', '0', '1']],
+                'bids': [['99.5', '1', '0', '1']], 'ts': '1700000000100'}]},
+        ])
+        books = list(read_session(path))
+        self.assertEqual(len(books), 2)
+        self.assertEqual(books[1]['asks'], [[101.5, 4.0], [102.0, 2.0]])
+        self.assertEqual(books[1]['bids'], [[99.5, 1.0], [99.0, 3.0]])
+        self.assertEqual(books[1]['timestamp'], 1700000000.1)
+
+        messages = list(read_session(path, trades=True))
+        self.assertEqual(messages[1]['side'], 'sell')
+        MakerTakerModel(min_samples=1).train(messages)
+
+class TestOnlineMakerTakerModel(unittest.TestCase):
+
+    def setUp(self):
+        # Aggressors favour the heavier side of the touch, as on a real tape
+        rng = np.random.default_rng(1)
+        self.session = []
+        for i in range(2000):
+            bid_size, ask_size = rng.exponential(1.0, 2)
+            asks = [[100.05 + 0.1 * j, ask_size if j == 0 else 1.0] for j in range(10)]
+            bids = [[99.95 - 0.1 * j, bid_size if j == 0 else 1.0] for j in range(10)]
+            self.session.append({'asks': asks, 'bids': bids})
+            buy = rng.random() < bid_size / (bid_size + ask_size)
+            self.session.append({'side': 'buy' if buy else 'sell'})
+
+    def test_falls_back_to_depth_share_before_training(self):
+        model = MakerTakerModel()
+        self.assertEqual(model.predict_proportion(), 0.5)
+        proportion = model.predict_proportion({'asks': [[101.0, 1.0]], 'bids': [[99.0, 3.0]]})
+        self.assertAlmostEqual(proportion, 0.75)
+
+    def test_learns_imbalance_from_trades(self):
+        model = MakerTakerModel().train(self.session)
+        self.assertTrue(model.trained)
+        # Bid-heavy touch: buyers take, so a resting bid rarely fills
+        heavy_bid = {'asks': [[100.05, 0.1]], 'bids': [[99.95, 5.0]]}
+        heavy_ask = {'asks': [[100.05, 5.0]], 'bids': [[99.95, 0.1]]}
+        self.assertLess(model.predict_proportion(heavy_bid), 0.4)
+        self.assertGreater(model.predict_proportion(heavy_ask), 0.6)
+        maker, taker = model.get_maker_taker_proportion()
+        self.assertAlmostEqual(maker + taker, 1.0)
+
+    def test_beats_constant_prediction(self):
+        model = MakerTakerModel()
+        X, y = [], []
+        for message in self.session:
+            if 'side' in message:
+                X.append(model.features.values.copy())
+                y.append(1.0 if message['side'] == 'sell' else 0.0)
+                model.observe_trade(message['side'])
+            else:
+                model.update_book(message['asks'], message['bids'])
+        scores = model.evaluate((X[-500:], y[-500:]))
+        self.assertLess(scores['log_loss'], np.log(2))
+        self.assertGreater(scores['accuracy'], 0.6)
+
+class TestMarketStats(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.times = 1700000000 + np.cumsum(rng.uniform(0.05, 0.5, 3000))
+        self.mids = 30000.0 * np.exp(np.cumsum(rng.normal(0, 3e-4, 3000)))
+        self.spreads = rng.choice([0.5, 1.0, 2.0], 3000)
+
+    def feed(self, stats, n=3000):
+        for t, mid, spread in zip(self.times[:n], self.mids[:n], self.spreads[:n]):
+            asks = [[mid + spread / 2 + 0.5 * j, 1.0] for j in range(20)]
+            bids = [[mid - spread / 2 - 0.5 * j, 1.0] for j in range(20)]
+            stats.update(asks, bids, float(t))
+
+    def test_realized_volatility_matches_window(self):
+        stats = MarketStats(windows=(60,))
+        self.feed(stats)
+        now = self.times[-1]
+        returns = np.diff(np.log(self.mids))
+        inside = self.times[1:] > now - 60
+        expected = np.sqrt(np.sum(returns[inside] ** 2) / np.sum(np.diff(self.times)[inside]))
+        self.assertAlmostEqual(stats.volatility(60), expected, delta=1e-9)
+
+    def test_time_weighted_spread(self):
+        stats = MarketStats(windows=(30,))
+        self.feed(stats)
+        now = self.times[-1]
+        mids_spread = self.spreads / self.mids * 1e4
+        held = np.diff(self.times)
+        inside = self.times[1:] > now - 30
+        expected = np.sum(mids_spread[:-1][inside] * held[inside]) / np.sum(held[inside])
+        self.assertAlmostEqual(stats.average_spread_bps(30), expected, places=9)
+
+    def test_ring_buffer_keeps_fixed_capacity(self):
+        buffer = RingBuffer(4, 1)
+        evicted = [buffer.append((i,)) for i in range(6)]
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(float(evicted[4][0]), 0.0)
+        self.assertEqual(float(buffer.peekleft()[0]), 2.0)
+
+    def test_impact_uses_measured_volatility(self):
+        stats = MarketStats()
+        self.feed(stats, 500)
+        model = MarketImpactModel(stats)
+        measured = model.calculate_impact(1e5)
+        model.volatility = 10 * stats.volatility() * np.sqrt(86400)
+        self.assertGreater(model.calculate_impact(1e5), measured)
+        self.assertGreater(measured, 0.5 * stats.spread_bps * 1e5 / 1e4)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file